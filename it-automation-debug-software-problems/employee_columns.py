@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""employee_columns.py
+
+Columnar NumPy loader for the employees CSV used by start_date_report.py.
+
+Instead of a list of (date, name, department) tuples and a dict of lists,
+the data is held in a few flat arrays:
+- start dates as a sorted `datetime64[D]` array
+- names and departments as categorical int32 codes plus a category array
+
+That keeps memory per row to a few bytes plus the unique strings, and
+makes counts and range filters vectorized. Range queries return the same
+(date, [names]) entries as start_date_report, so print_report output is
+identical for the same query.
+
+Usage examples:
+
+    python3 employee_columns.py --counts month
+    python3 employee_columns.py --counts department 2019-01-01:2019-12-31
+    python3 employee_columns.py 2018-06-01 --department Sales
+"""
+
+import argparse
+import csv
+import datetime
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from start_date_report import EMPLOYEES_CSV_PATH, parse_date, read_query_file, run_query
+
+
+def _encode(values: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Dictionary-encode strings into (int32 codes, category array)."""
+    categories: Dict[str, int] = {}
+    codes = np.fromiter(
+        (categories.setdefault(v, len(categories)) for v in values),
+        dtype=np.int32,
+        count=len(values),
+    )
+    return codes, np.array(list(categories), dtype=object)
+
+
+# A column of complete YYYY-MM-DD dates, one per line. NumPy also accepts
+# partial dates ("2018-02", "2019") that parse_date rejects, so only
+# columns of this shape take the vectorized path.
+ISO_DATE_COLUMN_RE = re.compile(r"(?:[0-9]{4}-[0-9]{2}-[0-9]{2}\n)*")
+
+
+def _parse_dates(date_strs: List[str]) -> np.ndarray:
+    """Parse YYYY-MM-DD strings into datetime64[D]; invalid dates become NaT."""
+    if ISO_DATE_COLUMN_RE.fullmatch("\n".join(date_strs + [""])):
+        try:
+            parsed = np.array(date_strs, dtype="datetime64[D]")
+        except ValueError:
+            pass  # e.g. 2018-02-30
+        else:
+            if not len(parsed) or parsed.min() >= np.datetime64("0001-01-01"):
+                return parsed  # year 0000 is valid for NumPy only
+
+    # Non-ISO or invalid values somewhere in the column: fall back to the
+    # same per-row rules as load_employee_data.
+    parsed = np.empty(len(date_strs), dtype="datetime64[D]")
+    for i, date_str in enumerate(date_strs):
+        try:
+            parsed[i] = parse_date(date_str)
+        except ValueError:
+            parsed[i] = np.datetime64("NaT")
+    return parsed
+
+
+class EmployeeColumns:
+    """Employee start dates, names and departments as sorted columns."""
+
+    def __init__(
+        self,
+        dates: np.ndarray,
+        name_codes: np.ndarray,
+        names: np.ndarray,
+        dept_codes: np.ndarray,
+        departments: np.ndarray,
+    ):
+        self.dates = dates
+        self.name_codes = name_codes
+        self.names = names
+        self.dept_codes = dept_codes
+        self.departments = departments
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def select(self, department: Optional[str] = None) -> "EmployeeColumns":
+        """Return the rows for one department (all rows if department is None)."""
+        if department is None:
+            return self
+        matches = np.flatnonzero(self.departments == department)
+        mask = np.isin(self.dept_codes, matches)
+        return EmployeeColumns(
+            self.dates[mask],
+            self.name_codes[mask],
+            self.names,
+            self.dept_codes[mask],
+            self.departments,
+        )
+
+    def counts_per_date(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (unique dates, number of employees who started on each)."""
+        return np.unique(self.dates, return_counts=True)
+
+    def counts_per_month(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (unique datetime64[M] months, number of starters in each)."""
+        return np.unique(self.dates.astype("datetime64[M]"), return_counts=True)
+
+    def counts_per_department(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (departments, number of employees in each), skipping empty ones."""
+        counts = np.bincount(self.dept_codes, minlength=len(self.departments))
+        present = counts > 0
+        return self.departments[present], counts[present]
+
+    def _range(self, lo: int, hi: int) -> List[Tuple[datetime.date, List[str]]]:
+        """Group rows lo..hi-1 into (date, [names]) entries."""
+        dates = self.dates[lo:hi]
+        if not len(dates):
+            return []
+        unique_dates, starts = np.unique(dates, return_index=True)
+        groups = np.split(self.names[self.name_codes[lo:hi]], starts[1:])
+        return [
+            (d, group.tolist())
+            for d, group in zip(unique_dates.astype(object), groups)
+        ]
+
+    def same_or_newer(
+        self, query_date: datetime.date
+    ) -> List[Tuple[datetime.date, List[str]]]:
+        lo = np.searchsorted(self.dates, np.datetime64(query_date, "D"), side="left")
+        return self._range(lo, len(self.dates))
+
+    def older(self, query_date: datetime.date) -> List[Tuple[datetime.date, List[str]]]:
+        hi = np.searchsorted(self.dates, np.datetime64(query_date, "D"), side="left")
+        return self._range(0, hi)
+
+    def between(
+        self, start_date: datetime.date, end_date: datetime.date
+    ) -> List[Tuple[datetime.date, List[str]]]:
+        lo = np.searchsorted(self.dates, np.datetime64(start_date, "D"), side="left")
+        hi = np.searchsorted(self.dates, np.datetime64(end_date, "D"), side="right")
+        return self._range(lo, hi)
+
+
+def load_columns(
+    csv_path: str, department: Optional[str] = None
+) -> EmployeeColumns:
+    """Load the employees CSV into sorted columns.
+
+    Rows are skipped with the same rules as load_employee_data, and rows
+    sharing a start date keep their CSV order.
+    """
+    names: List[str] = []
+    date_strs: List[str] = []
+    departments: List[str] = []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            name = row.get("name", "").strip()
+            date_str = row.get("start_date", "").strip()
+            if not name or not date_str:
+                continue
+            names.append(name)
+            date_strs.append(date_str)
+            departments.append((row.get("department") or "").strip())
+
+    dates = _parse_dates(date_strs)
+    del date_strs
+    name_codes, name_categories = _encode(names)
+    del names
+    dept_codes, dept_categories = _encode(departments)
+    del departments
+
+    valid = ~np.isnat(dates)
+    order = np.argsort(dates[valid], kind="stable")
+    columns = EmployeeColumns(
+        dates[valid][order],
+        name_codes[valid][order],
+        name_categories,
+        dept_codes[valid][order],
+        dept_categories,
+    )
+    return columns.select(department)
+
+
+def print_counts(keys: np.ndarray, counts: np.ndarray, label: str) -> None:
+    """Print one "<label> <key>: <count>" line per group."""
+    if not len(keys):
+        print("No employees found.")
+        return
+    for key, count in zip(keys, counts):
+        if isinstance(key, np.datetime64):
+            key = np.datetime_as_string(key)
+        print(f"{label} {key}: {count}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Columnar (NumPy) employee start date reports."
+    )
+    parser.add_argument(
+        "dates",
+        nargs="*",
+        help="Query dates (YYYY-MM-DD) or inclusive ranges (START:END)",
+    )
+    parser.add_argument(
+        "--dates-file",
+        type=str,
+        help="File with one query date or START:END range per line",
+    )
+    parser.add_argument(
+        "--before",
+        action="store_true",
+        help="Report employees who started before each single query date",
+    )
+    parser.add_argument(
+        "--department",
+        type=str,
+        help="Only include employees from this department",
+    )
+    parser.add_argument(
+        "--counts",
+        choices=["date", "month", "department"],
+        help="Print the number of starters per date, month or department",
+    )
+    parser.add_argument(
+        "--csv",
+        type=str,
+        default=EMPLOYEES_CSV_PATH,
+        help=f"Employees CSV path (default: {EMPLOYEES_CSV_PATH})",
+    )
+    return parser.parse_intermixed_args()
+
+
+def main() -> None:
+    args = parse_args()
+    columns = load_columns(args.csv, department=args.department)
+
+    if args.counts == "date":
+        print_counts(*columns.counts_per_date(), label="Started on")
+    elif args.counts == "month":
+        print_counts(*columns.counts_per_month(), label="Started in")
+    elif args.counts == "department":
+        print_counts(*columns.counts_per_department(), label="Department")
+    if args.counts:
+        print()
+
+    specs = list(args.dates)
+    if args.dates_file:
+        specs.extend(read_query_file(args.dates_file))
+    for spec in specs:
+        run_query(spec, columns, before=args.before)
+
+
+if __name__ == "__main__":
+    main()
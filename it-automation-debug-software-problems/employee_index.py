@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""employee_index.py
+
+Persistent on-disk index for the employees CSV used by start_date_report.py.
+
+The index is a sidecar file (by default `<csv>.idx`) holding:
+- A header with the CSV size, mtime and a content fingerprint
+- A sorted column of start dates (int32 ordinals)
+- A column of department codes (uint16) plus the department names
+- Name offsets (uint64) into a UTF-8 blob of employee names
+
+On load the sidecar is memory-mapped and queried in place, so a warm start
+costs one mmap instead of a full CSV parse. If the CSV has only grown by
+appended rows since the index was written, only the new tail is parsed
+and merged; any other change (including a same-size edit in place)
+triggers a full rebuild.
+"""
+
+import array
+import bisect
+import csv
+import datetime
+import hashlib
+import heapq
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+
+MAGIC = b"EIDX"
+VERSION = 1
+
+# magic, version, csv_size, csv_mtime_ns, indexed_bytes, fingerprint,
+# row_count, dept_count, names_len
+HEADER = struct.Struct("<4sIQqQ20s4xQQQ")
+
+# Bytes hashed from the start and from the end of the indexed region
+FINGERPRINT_BLOCK = 64 * 1024
+
+# Name blobs larger than this are spooled to a temporary file while writing
+NAMES_MEMORY_LIMIT = 16 * 1024 * 1024
+
+Row = Tuple[int, str, str]  # (date ordinal, name, department)
+
+
+def default_index_path(csv_path: str) -> str:
+    return csv_path + ".idx"
+
+
+def _pad(length: int) -> int:
+    """Bytes needed to align length to 8."""
+    return -length % 8
+
+
+def fingerprint(csv_path: str, indexed_bytes: int) -> bytes:
+    """Hash the head and tail of the first indexed_bytes of the CSV.
+
+    Reading two fixed-size blocks keeps this cheap on multi-GB files while
+    still catching rewrites and truncations of the indexed region.
+    """
+    digest = hashlib.sha1()
+    with open(csv_path, "rb") as f:
+        digest.update(f.read(min(FINGERPRINT_BLOCK, indexed_bytes)))
+        tail_start = max(0, indexed_bytes - FINGERPRINT_BLOCK)
+        f.seek(tail_start)
+        digest.update(f.read(indexed_bytes - tail_start))
+    digest.update(str(indexed_bytes).encode())
+    return digest.digest()
+
+
+def _parse_ordinal(date_str: str) -> int:
+    y, m, d = map(int, date_str.split("-"))
+    return datetime.date(y, m, d).toordinal()
+
+
+def parse_csv_rows(csv_path: str, offset: int = 0) -> Tuple[List[Row], int]:
+    """Parse the CSV lines from byte offset onward.
+
+    Returns (rows, end) where end is the byte offset just past the last
+    complete line, so a later call can resume from there. A final line
+    without a newline is parsed too (as start_date_report does) but not
+    counted in end. Rows are skipped with the same rules as
+    start_date_report.load_employee_data.
+    """
+    with open(csv_path, "rb") as f:
+        header_line = f.readline()
+        columns = next(csv.reader([header_line.decode("utf-8-sig")]))
+        name_col = columns.index("name")
+        date_col = columns.index("start_date")
+        dept_col = columns.index("department") if "department" in columns else None
+
+        pos = max(offset, len(header_line))
+        f.seek(pos)
+
+        def lines() -> Iterator[str]:
+            nonlocal pos
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    # Unterminated last line: index it, but leave end before
+                    # it so refresh_index rebuilds if the line is completed
+                    yield raw.decode("utf-8", "replace")
+                    return
+                pos += len(raw)
+                yield raw.decode("utf-8")
+
+        rows: List[Row] = []
+        for fields in csv.reader(lines()):
+            try:
+                name = fields[name_col].strip()
+                date_str = fields[date_col].strip()
+            except IndexError:
+                continue
+            if not name or not date_str:
+                continue
+            try:
+                ordinal = _parse_ordinal(date_str)
+            except ValueError:
+                continue
+            department = ""
+            if dept_col is not None and dept_col < len(fields):
+                department = fields[dept_col].strip()
+            rows.append((ordinal, name, department))
+    return rows, pos
+
+
+def write_index(
+    index_path: str,
+    rows: Iterable[Row],
+    csv_size: int,
+    csv_mtime_ns: int,
+    indexed_bytes: int,
+    digest: bytes,
+) -> None:
+    """Write rows (already sorted by date) to index_path atomically.
+
+    rows may be a lazy iterator: it is consumed once into the packed
+    columns (a few bytes per row) and a name blob that is spooled to disk
+    when large, so no Python object is kept per row.
+    """
+    departments: List[str] = []
+    dept_codes = {}
+    dates = array.array("i")
+    depts = array.array("H")
+    offsets = array.array("Q", [0])
+
+    with tempfile.SpooledTemporaryFile(NAMES_MEMORY_LIMIT) as names:
+        for ordinal, name, department in rows:
+            code = dept_codes.get(department)
+            if code is None:
+                code = dept_codes[department] = len(departments)
+                departments.append(department)
+            dates.append(ordinal)
+            depts.append(code)
+            names.write(name.encode("utf-8"))
+            offsets.append(names.tell())
+
+        names_len = offsets[-1]
+        header = HEADER.pack(
+            MAGIC,
+            VERSION,
+            csv_size,
+            csv_mtime_ns,
+            indexed_bytes,
+            digest,
+            len(dates),
+            len(departments),
+            names_len,
+        )
+
+        tmp_path = f"{index_path}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            for column in (dates, depts, offsets):
+                nbytes = column.itemsize * len(column)
+                f.write(memoryview(column).cast("B"))
+                f.write(b"\0" * _pad(nbytes))
+            names.seek(0)
+            shutil.copyfileobj(names, f)
+            f.write(b"\0" * _pad(names_len))
+            f.write("\n".join(departments).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, index_path)
+
+
+class EmployeeIndex:
+    """Memory-mapped employee index with the same range queries as DateIndex.
+
+    Use load_index() to get one; it validates or refreshes the sidecar first.
+    """
+
+    def __init__(self, index_path: str, department: Optional[str] = None):
+        with open(index_path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mm)
+        (
+            magic,
+            version,
+            self.csv_size,
+            self.csv_mtime_ns,
+            self.indexed_bytes,
+            self.fingerprint,
+            count,
+            dept_count,
+            names_len,
+        ) = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            view.release()
+            self._mm.close()
+            raise ValueError(f"Not an employee index (or old version): {index_path}")
+
+        pos = HEADER.size
+        sections = []
+        for itemsize, fmt, length in ((4, "i", count), (2, "H", count), (8, "Q", count + 1)):
+            nbytes = itemsize * length
+            sections.append(view[pos:pos + nbytes].cast(fmt))
+            pos += nbytes + _pad(nbytes)
+        self._dates, self._depts, self._offsets = sections
+        self._names = view[pos:pos + names_len]
+        pos += names_len + _pad(names_len)
+        dept_blob = bytes(view[pos:]).decode("utf-8")
+        self.departments = dept_blob.split("\n") if dept_count else []
+
+        self._dept_code: Optional[int] = None
+        self.department = department
+        if department is not None:
+            # -1 matches nothing when the department is unknown
+            self._dept_code = (
+                self.departments.index(department)
+                if department in self.departments
+                else -1
+            )
+
+    def __len__(self) -> int:
+        return len(self._dates)
+
+    def __enter__(self) -> "EmployeeIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for view in (self._dates, self._depts, self._offsets, self._names):
+            view.release()
+        self._mm.close()
+
+    def rows(self) -> Iterator[Row]:
+        """Yield every (ordinal, name, department) row in index order."""
+        for i in range(len(self._dates)):
+            yield self._dates[i], self._name(i), self.departments[self._depts[i]]
+
+    def _name(self, i: int) -> str:
+        return bytes(self._names[self._offsets[i]:self._offsets[i + 1]]).decode("utf-8")
+
+    def _entries(self, lo: int, hi: int) -> List[Tuple[datetime.date, List[str]]]:
+        """Group rows lo..hi-1 into (date, [names]) entries."""
+        result: List[Tuple[datetime.date, List[str]]] = []
+        last_ordinal = None
+        for i in range(lo, hi):
+            if self._dept_code is not None and self._depts[i] != self._dept_code:
+                continue
+            ordinal = self._dates[i]
+            if ordinal != last_ordinal:
+                result.append((datetime.date.fromordinal(ordinal), []))
+                last_ordinal = ordinal
+            result[-1][1].append(self._name(i))
+        return result
+
+    def same_or_newer(
+        self, query_date: datetime.date
+    ) -> List[Tuple[datetime.date, List[str]]]:
+        lo = bisect.bisect_left(self._dates, query_date.toordinal())
+        return self._entries(lo, len(self._dates))
+
+    def older(self, query_date: datetime.date) -> List[Tuple[datetime.date, List[str]]]:
+        hi = bisect.bisect_left(self._dates, query_date.toordinal())
+        return self._entries(0, hi)
+
+    def between(
+        self, start_date: datetime.date, end_date: datetime.date
+    ) -> List[Tuple[datetime.date, List[str]]]:
+        lo = bisect.bisect_left(self._dates, start_date.toordinal())
+        hi = bisect.bisect_right(self._dates, end_date.toordinal())
+        return self._entries(lo, hi)
+
+
+def _read_header(index_path: str) -> Optional[tuple]:
+    try:
+        with open(index_path, "rb") as f:
+            fields = HEADER.unpack(f.read(HEADER.size))
+    except (OSError, struct.error):
+        return None
+    if fields[0] != MAGIC or fields[1] != VERSION:
+        return None
+    return fields
+
+
+def refresh_index(csv_path: str, index_path: Optional[str] = None) -> str:
+    """Make sure the sidecar index matches csv_path, rebuilding as little as possible.
+
+    Returns the index path. Three cases:
+    - Unchanged CSV (size, mtime and fingerprint match): nothing to do
+    - Rows appended (the CSV grew, the index covered it up to its last
+      newline and the indexed prefix still matches): parse only the new tail
+    - Anything else: full parse and rewrite. This includes a changed mtime
+      with no growth, since the fingerprint does not see edits in the
+      middle, and growth after an unterminated last line, which the index
+      already holds in its unfinished form
+    """
+    index_path = index_path or default_index_path(csv_path)
+    st = os.stat(csv_path)
+    header = _read_header(index_path)
+
+    if header is not None:
+        _, _, csv_size, csv_mtime_ns, indexed_bytes, digest, *_ = header
+        unchanged = st.st_size == csv_size and st.st_mtime_ns == csv_mtime_ns
+        appended = st.st_size > csv_size and indexed_bytes == csv_size
+        if (unchanged or appended) and fingerprint(csv_path, indexed_bytes) == digest:
+            if unchanged:
+                return index_path
+
+            new_rows, end = parse_csv_rows(csv_path, offset=indexed_bytes)
+            new_rows.sort(key=lambda row: row[0])
+            with EmployeeIndex(index_path) as existing:
+                # heapq.merge is stable: existing rows stay ahead of appended
+                # rows on the same date, matching CSV order. The merge is
+                # streamed from the mapped index into the new file, which
+                # replaces the old one only once it is complete.
+                merged = heapq.merge(existing.rows(), new_rows, key=lambda row: row[0])
+                write_index(
+                    index_path, merged, st.st_size, st.st_mtime_ns, end,
+                    fingerprint(csv_path, end),
+                )
+            return index_path
+
+    rows, end = parse_csv_rows(csv_path)
+    rows.sort(key=lambda row: row[0])
+    write_index(
+        index_path, rows, st.st_size, st.st_mtime_ns, end, fingerprint(csv_path, end)
+    )
+    return index_path
+
+
+def load_index(
+    csv_path: str,
+    index_path: Optional[str] = None,
+    department: Optional[str] = None,
+) -> EmployeeIndex:
+    """Refresh the sidecar index for csv_path if needed and memory-map it."""
+    return EmployeeIndex(refresh_index(csv_path, index_path), department=department)
@@ -11,12 +11,23 @@ Portfolio version of the Google IT Automation with Python lab:
 The script demonstrates:
 - Fixing a type error caused by `input()` returning strings
 - Improving performance by pre-processing the CSV once and reusing results
+
+Batch mode answers many queries from a single load of the CSV:
+
+    python3 start_date_report.py 2018-06-01 2019-01-01
+    python3 start_date_report.py --before 2018-06-01
+    python3 start_date_report.py 2018-03-01:2018-12-31 --department Sales
+    python3 start_date_report.py --dates-file audit_dates.txt
 """
 
+import argparse
+import bisect
 import csv
 import datetime
 from collections import defaultdict
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+import employee_index
 
 
 EMPLOYEES_CSV_PATH = "employees-with-date.csv"
@@ -38,36 +49,49 @@ def get_start_date() -> datetime.datetime:
     return datetime.datetime(year, month, day)
 
 
-def load_employee_data(csv_path: str) -> List[Tuple[datetime.date, str]]:
+def parse_date(date_str: str) -> datetime.date:
+    """Parse a YYYY-MM-DD string into a date (raises ValueError if invalid)."""
+    y, m, d = map(int, date_str.strip().split("-"))
+    return datetime.date(y, m, d)
+
+
+def load_employee_data(csv_path: str) -> List[Tuple[datetime.date, str, str]]:
     """Load employee data from CSV.
 
     Expects a CSV with headers:
       - name
       - start_date (YYYY-MM-DD)
+      - department (optional, empty string when missing)
     """
-    rows: List[Tuple[datetime.date, str]] = []
+    rows: List[Tuple[datetime.date, str, str]] = []
     with open(csv_path, newline="", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
             name = row.get("name", "").strip()
             date_str = row.get("start_date", "").strip()
+            department = (row.get("department") or "").strip()
             if not name or not date_str:
                 continue
             try:
-                y, m, d = map(int, date_str.split("-"))
-                start_date = datetime.date(y, m, d)
+                start_date = parse_date(date_str)
             except ValueError:
                 continue
-            rows.append((start_date, name))
+            rows.append((start_date, name, department))
     return rows
 
 
 def build_index(
-    rows: List[Tuple[datetime.date, str]]
+    rows: List[Tuple[datetime.date, str, str]],
+    department: Optional[str] = None,
 ) -> Tuple[Dict[datetime.date, List[str]], List[datetime.date]]:
-    """Build an index for fast lookup of employees by start date."""
+    """Build an index for fast lookup of employees by start date.
+
+    If department is given, only employees of that department are indexed.
+    """
     index: Dict[datetime.date, List[str]] = defaultdict(list)
-    for start_date, name in rows:
+    for start_date, name, *rest in rows:
+        if department is not None and (rest[0] if rest else "") != department:
+            continue
         index[start_date].append(name)
     sorted_dates = sorted(index.keys())
     return index, sorted_dates
@@ -79,17 +103,76 @@ def get_same_or_newer(
     sorted_dates: List[datetime.date],
 ) -> List[Tuple[datetime.date, List[str]]]:
     """Return all (date, [employees]) for dates >= query_date."""
-    result: List[Tuple[datetime.date, List[str]]] = []
-    for d in sorted_dates:
-        if d >= query_date:
-            result.append((d, index[d]))
-    return result
+    start = bisect.bisect_left(sorted_dates, query_date)
+    return [(d, index[d]) for d in sorted_dates[start:]]
+
+
+def get_older(
+    query_date: datetime.date,
+    index: Dict[datetime.date, List[str]],
+    sorted_dates: List[datetime.date],
+) -> List[Tuple[datetime.date, List[str]]]:
+    """Return all (date, [employees]) for dates < query_date."""
+    end = bisect.bisect_left(sorted_dates, query_date)
+    return [(d, index[d]) for d in sorted_dates[:end]]
+
+
+def get_between(
+    start_date: datetime.date,
+    end_date: datetime.date,
+    index: Dict[datetime.date, List[str]],
+    sorted_dates: List[datetime.date],
+) -> List[Tuple[datetime.date, List[str]]]:
+    """Return all (date, [employees]) for start_date <= date <= end_date."""
+    start = bisect.bisect_left(sorted_dates, start_date)
+    end = bisect.bisect_right(sorted_dates, end_date)
+    return [(d, index[d]) for d in sorted_dates[start:end]]
+
+
+class DateIndex:
+    """In-memory index (as returned by build_index) with range query methods.
+
+    Batch queries go through this interface so other index backends can be
+    swapped in without changing run_query.
+    """
 
+    def __init__(
+        self,
+        index: Dict[datetime.date, List[str]],
+        sorted_dates: List[datetime.date],
+    ):
+        self.index = index
+        self.sorted_dates = sorted_dates
 
-def print_report(entries: List[Tuple[datetime.date, List[str]]]) -> None:
+    @classmethod
+    def from_rows(
+        cls,
+        rows: List[Tuple[datetime.date, str, str]],
+        department: Optional[str] = None,
+    ) -> "DateIndex":
+        return cls(*build_index(rows, department=department))
+
+    def same_or_newer(
+        self, query_date: datetime.date
+    ) -> List[Tuple[datetime.date, List[str]]]:
+        return get_same_or_newer(query_date, self.index, self.sorted_dates)
+
+    def older(self, query_date: datetime.date) -> List[Tuple[datetime.date, List[str]]]:
+        return get_older(query_date, self.index, self.sorted_dates)
+
+    def between(
+        self, start_date: datetime.date, end_date: datetime.date
+    ) -> List[Tuple[datetime.date, List[str]]]:
+        return get_between(start_date, end_date, self.index, self.sorted_dates)
+
+
+def print_report(
+    entries: List[Tuple[datetime.date, List[str]]],
+    empty_message: str = "No employees found for the selected start date or later.",
+) -> None:
     """Print the report in a friendly format."""
     if not entries:
-        print("No employees found for the selected start date or later.")
+        print(empty_message)
         return
 
     for date_obj, names in entries:
@@ -97,15 +180,117 @@ def print_report(entries: List[Tuple[datetime.date, List[str]]]) -> None:
         print(f"Started on {formatted_date}: {names}")
 
 
+def read_query_file(path: str) -> List[str]:
+    """Read query specs from a file: one per line, blank lines and # comments ignored."""
+    specs: List[str] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                specs.append(line)
+    return specs
+
+
+def run_query(spec: str, date_index: DateIndex, before: bool = False) -> None:
+    """Answer one query spec and print its report.
+
+    A spec is either a single date (YYYY-MM-DD), answered as "on or after"
+    (or "before" when before=True), or a START:END range, answered inclusively.
+    """
+    try:
+        if ":" in spec:
+            start_str, end_str = spec.split(":", 1)
+            start_date, end_date = parse_date(start_str), parse_date(end_str)
+            label = (
+                f"between {start_date.strftime('%b %d, %Y')} "
+                f"and {end_date.strftime('%b %d, %Y')}"
+            )
+            entries = date_index.between(start_date, end_date)
+        else:
+            query_date = parse_date(spec)
+            if before:
+                label = f"before {query_date.strftime('%b %d, %Y')}"
+                entries = date_index.older(query_date)
+            else:
+                label = f"on or after {query_date.strftime('%b %d, %Y')}"
+                entries = date_index.same_or_newer(query_date)
+    except ValueError:
+        print(f"[WARN] Skipping invalid query: {spec!r}")
+        return
+
+    print(f"== Employees who started {label} ==")
+    print_report(entries, empty_message=f"No employees found who started {label}.")
+    print()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Report employees by start date. Without query dates, "
+        "prompts for a single date interactively."
+    )
+    parser.add_argument(
+        "dates",
+        nargs="*",
+        help="Query dates (YYYY-MM-DD) or inclusive ranges (START:END)",
+    )
+    parser.add_argument(
+        "--dates-file",
+        type=str,
+        help="File with one query date or START:END range per line",
+    )
+    parser.add_argument(
+        "--before",
+        action="store_true",
+        help="Report employees who started before each single query date",
+    )
+    parser.add_argument(
+        "--department",
+        type=str,
+        help="Only report employees from this department",
+    )
+    parser.add_argument(
+        "--csv",
+        type=str,
+        default=EMPLOYEES_CSV_PATH,
+        help=f"Employees CSV path (default: {EMPLOYEES_CSV_PATH})",
+    )
+    parser.add_argument(
+        "--index-cache",
+        action="store_true",
+        help="Use (and maintain) a memory-mapped sidecar index next to the CSV "
+        "instead of parsing it on every run",
+    )
+    return parser.parse_intermixed_args()
+
+
+def load_date_index(args: argparse.Namespace):
+    """Return a DateIndex, or a memory-mapped EmployeeIndex with --index-cache."""
+    if args.index_cache:
+        return employee_index.load_index(args.csv, department=args.department)
+    return DateIndex.from_rows(load_employee_data(args.csv), department=args.department)
+
+
 def main():
-    start_dt = get_start_date()
-    query_date = start_dt.date()
+    args = parse_args()
+
+    specs = list(args.dates)
+    if args.dates_file:
+        specs.extend(read_query_file(args.dates_file))
 
-    rows = load_employee_data(EMPLOYEES_CSV_PATH)
-    index, sorted_dates = build_index(rows)
+    if not specs:
+        # Interactive mode: a single query, as in the original lab
+        start_dt = get_start_date()
+        query_date = start_dt.date()
+
+        date_index = load_date_index(args)
+        newer_entries = date_index.same_or_newer(query_date)
+        print_report(newer_entries)
+        return
 
-    newer_entries = get_same_or_newer(query_date, index, sorted_dates)
-    print_report(newer_entries)
+    # Batch mode: load and index once, answer every query from the index
+    date_index = load_date_index(args)
+    for spec in specs:
+        run_query(spec, date_index, before=args.before)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""benchmark_upload.py
+
+Offline benchmark for run.py against the local stub server.
+
+Generates synthetic feedback files in a temporary directory, then uploads
+them to stub_server.py:
+- "baseline": one bare requests.post per file, sequentially (the original
+  run.py behaviour)
+- "pooled xN": run.upload_all with a pooled Session and N workers
+- "batch B xN": the same, sending B feedback dicts per request
+
+Usage example:
+
+    python3 benchmark_upload.py --files 2000 --delay 0.005 --concurrency 1 8 32
+    python3 benchmark_upload.py --files 20000 --batch-size 100 --skip-baseline
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from typing import List
+
+import requests
+
+import run
+import stub_server
+
+
+def write_feedback_files(directory: str, count: int) -> None:
+    """Write count synthetic feedback .txt files into directory."""
+    for i in range(count):
+        with open(os.path.join(directory, f"{i:06d}.txt"), "w", encoding="utf-8") as f:
+            f.write(f"Feedback title {i}\nCustomer {i}\n2020-01-15\n")
+            f.write("The staff were friendly and explained all the options clearly.\n")
+
+
+def bench_baseline(directory: str, url: str) -> float:
+    start = time.perf_counter()
+    for feedback in run.load_feedback_from_dir(directory):
+        requests.post(url, data=feedback)
+    return time.perf_counter() - start
+
+
+def bench_pooled(directory: str, url: str, concurrency: int, batch_size: int = 0) -> float:
+    start = time.perf_counter()
+    latencies: List[float] = []
+    failed = 0
+    for result in run.upload_all(
+        run.load_feedback_from_dir(directory),
+        url,
+        concurrency=concurrency,
+        batch_size=batch_size,
+    ):
+        latencies.append(result.latency)
+        failed += not result.ok
+    elapsed = time.perf_counter() - start
+    run.print_upload_report(latencies, failed, elapsed)
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark feedback uploads offline.")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument(
+        "--delay", type=float, default=0.005, help="Stub server latency per request (s)"
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        nargs="*",
+        default=[],
+        help="Also run batched uploads with these batch sizes",
+    )
+    parser.add_argument(
+        "--skip-baseline", action="store_true", help="Skip the bare requests.post run"
+    )
+    args = parser.parse_args()
+
+    server = stub_server.start_in_thread(delay=args.delay)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            write_feedback_files(directory, args.files)
+            print(f"[INFO] {args.files} files, stub latency {args.delay * 1000:.1f} ms")
+
+            results = []
+            if not args.skip_baseline:
+                results.append(("baseline", bench_baseline(directory, server.url)))
+            for concurrency in args.concurrency:
+                label = f"pooled x{concurrency}"
+                results.append((label, bench_pooled(directory, server.url, concurrency)))
+                for batch_size in args.batch_size:
+                    label = f"batch {batch_size} x{concurrency}"
+                    elapsed = bench_pooled(directory, server.url, concurrency, batch_size)
+                    results.append((label, elapsed))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print(f"\n{'mode':<18}{'seconds':>10}{'items/s':>12}")
+    for label, elapsed in results:
+        print(f"{label:<18}{elapsed:>10.2f}{args.files / elapsed:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""feedback_scanner.py
+
+Directory scanning and parsing helpers for run.py, tuned for directories
+with hundreds of thousands of small .txt files (e.g. on NFS):
+
+- os.scandir walk (optionally recursive) that never builds the full
+  listing in memory
+- deterministic sharding by relative path, so several processes or hosts
+  can split one directory between them
+- an ordered, bounded-prefetch worker pool, so file opens and reads
+  overlap while at most `prefetch` parsed files wait for the upload stage
+"""
+
+import os
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def split_lines(text: str) -> List[str]:
+    """Split text into lines like file.readlines() with universal newlines."""
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+    return lines
+
+
+def parse_feedback(lines: List[str]) -> Optional[Dict[str, str]]:
+    """Turn the lines of one feedback file into a dict.
+
+    Returns None if the file has fewer than the 4 expected lines.
+    """
+    if len(lines) < 4:
+        return None
+
+    title = lines[0].strip()
+    name = lines[1].strip()
+    date = lines[2].strip()
+    # join remaining lines as one feedback string
+    feedback = " ".join(line.strip() for line in lines[3:])
+
+    return {
+        "title": title,
+        "name": name,
+        "date": date,
+        "feedback": feedback,
+    }
+
+
+def scan_feedback_files(
+    directory: str,
+    recursive: bool = False,
+    shard_index: int = 0,
+    shard_count: int = 1,
+) -> Iterator[os.DirEntry]:
+    """Yield DirEntry objects for .txt files under directory.
+
+    Subdirectories are only entered when recursive is True. With
+    shard_count > 1, only files whose relative path hashes (crc32) to
+    shard_index are yielded.
+    """
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        with os.scandir(current) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        stack.append(entry.path)
+                    continue
+                if not entry.name.endswith(".txt") or not entry.is_file():
+                    continue
+                if shard_count > 1:
+                    rel = os.path.relpath(entry.path, directory)
+                    if zlib.crc32(rel.encode("utf-8", "surrogateescape")) % shard_count != shard_index:
+                        continue
+                yield entry
+
+
+def prefetch_map(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    workers: int = 8,
+    prefetch: int = 64,
+) -> Iterator[R]:
+    """Like map(fn, items), but run fn in a thread pool with bounded read-ahead.
+
+    Results come back in input order. At most `prefetch` calls are queued
+    or finished-but-unconsumed at any time, so memory stays bounded even
+    when items is an unbounded generator. With workers <= 1, fn runs
+    inline and nothing is prefetched.
+    """
+    if workers <= 1:
+        yield from map(fn, items)
+        return
+
+    prefetch = max(prefetch, workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        queue = deque()
+        for item in items:
+            if len(queue) >= prefetch:
+                yield queue.popleft().result()
+            queue.append(executor.submit(fn, item))
+        while queue:
+            yield queue.popleft().result()
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """Parse an "INDEX/COUNT" shard spec such as "0/4"."""
+    index, count = (int(part) for part in spec.split("/", 1))
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {spec!r}: expected INDEX/COUNT with 0 <= INDEX < COUNT")
+    return index, count
@@ -12,13 +12,56 @@ Scenario:
     * Read all .txt feedback files from a directory
     * Convert each file into a Python dictionary
     * Upload each dictionary to a Django-based web service via HTTP POST
+
+Uploads go through one pooled requests.Session with a bounded number of
+concurrent requests, per-request timeouts, and exponential backoff on 5xx
+responses and connection errors. A throughput/latency report is printed
+at the end.
+
+Optionally, feedback dicts are grouped into batches and sent as a JSON
+array or NDJSON body per request, falling back to single posts when the
+endpoint rejects a batch.
+
+Every file that gets a 201 is recorded in an fsync'd checkpoint journal
+(see upload_journal.py), so rerunning after a crash skips files that were
+already uploaded instead of posting duplicates.
 """
 
+import hashlib
+import json
 import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from feedback_scanner import (
+    parse_feedback,
+    parse_shard,
+    prefetch_map,
+    scan_feedback_files,
+    split_lines,
+)
+from upload_journal import FileState, UploadJournal
 
 
-def load_feedback_from_dir(directory: str):
+def _read_feedback(entry: os.DirEntry) -> Tuple[str, Optional[Dict[str, str]]]:
+    """Read and parse one feedback file (runs in the scanner's worker pool)."""
+    with open(entry.path, "r", encoding="utf-8") as f:
+        return entry.name, parse_feedback(split_lines(f.read()))
+
+
+def load_feedback_from_dir(
+    directory: str,
+    recursive: bool = False,
+    workers: int = 1,
+    prefetch: int = 64,
+    shard_index: int = 0,
+    shard_count: int = 1,
+):
     """Read all .txt files in a directory and yield feedback dictionaries.
 
     Each file is expected to have the following format:
@@ -27,35 +70,339 @@ def load_feedback_from_dir(directory: str):
         line 3: date
         line 4+: feedback text (can be multiple lines)
 
+    Files are found with an os.scandir walk (see feedback_scanner). With
+    workers > 1 they are read and parsed in a thread pool, keeping at most
+    `prefetch` parsed files buffered ahead of the consumer.
+
     Returns:
         Generator of dicts with keys: title, name, date, feedback
-    """"
-    for filename in os.listdir(directory):
-        if not filename.endswith(".txt"):
-            continue
-        filepath = os.path.join(directory, filename)
-        with open(filepath, "r", encoding="utf-8") as f:
-            lines = [line.strip() for line in f.readlines()]
-
-        if len(lines) < 4:
+    """
+    entries = scan_feedback_files(directory, recursive, shard_index, shard_count)
+    for filename, feedback_dict in prefetch_map(_read_feedback, entries, workers, prefetch):
+        if feedback_dict is None:
             # Skip files that don't meet the expected format
             print(f"[WARN] Skipping {filename}: not enough lines")
             continue
-
-        title = lines[0]
-        name = lines[1]
-        date = lines[2]
-        feedback = " ".join(lines[3:])  # join remaining lines as one feedback string
-
-        feedback_dict = {
-            "title": title,
-            "name": name,
-            "date": date,
-            "feedback": feedback,
-        }
         yield feedback_dict
 
 
+def load_new_feedback(
+    directory: str,
+    journal: UploadJournal,
+    recursive: bool = False,
+    workers: int = 1,
+    prefetch: int = 64,
+    shard_index: int = 0,
+    shard_count: int = 1,
+) -> Iterator[Tuple[FileState, Dict[str, str]]]:
+    """Like load_feedback_from_dir, but skip files already in the journal.
+
+    Files whose path, size and mtime match a journal entry are skipped
+    without being opened. Other files are read and hashed; if the content
+    was uploaded before (e.g. the file was touched or renamed), the new
+    identity is recorded and the file is skipped.
+
+    Yields:
+        (FileState, feedback dict) for each file that still needs uploading
+    """
+
+    def read_new(entry: os.DirEntry):
+        """Return (filename, state, feedback dict, already uploaded)."""
+        st = entry.stat()
+        path = os.path.abspath(entry.path)
+        if journal.has_file(path, st.st_size, st.st_mtime_ns):
+            return entry.name, None, None, True
+        with open(entry.path, "rb") as f:
+            data = f.read()
+        state = FileState(path, st.st_size, st.st_mtime_ns, hashlib.sha256(data).hexdigest())
+        if journal.has_content(state.digest):
+            return entry.name, state, None, True
+        return entry.name, state, parse_feedback(split_lines(data.decode("utf-8"))), False
+
+    skipped = 0
+    entries = scan_feedback_files(directory, recursive, shard_index, shard_count)
+    results = prefetch_map(read_new, entries, workers, prefetch)
+    for filename, state, feedback_dict, uploaded in results:
+        if uploaded:
+            if state is not None:
+                # Same content under a new path/mtime: remember the new identity
+                journal.record(state)
+            skipped += 1
+        elif feedback_dict is None:
+            print(f"[WARN] Skipping {filename}: not enough lines")
+        else:
+            yield state, feedback_dict
+
+    if skipped:
+        print(f"[INFO] Skipped {skipped} file(s) already uploaded (journal: {journal.path})")
+
+
+class UploadResult(NamedTuple):
+    """Outcome of uploading one feedback dict (after any retries)."""
+
+    feedback: Dict[str, str]
+    ok: bool
+    status_code: Optional[int]
+    latency: float  # seconds, including retries and backoff
+    attempts: int
+    error: str
+
+
+def make_session(pool_size: int) -> requests.Session:
+    """Create a Session whose connection pool can serve pool_size threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _post(
+    session: requests.Session,
+    url: str,
+    timeout: float,
+    retries: int,
+    backoff: float,
+    **kwargs,
+) -> Tuple[Optional[requests.Response], int, str]:
+    """POST with retries on 5xx responses and connection errors.
+
+    The delay before retry n is backoff * 2**(n-1), plus up to 10% jitter so
+    parallel workers don't retry in lockstep. Responses below 500 are final,
+    and so are other request errors (e.g. a malformed URL).
+
+    Returns:
+        (last response or None if no response was received, attempts, error text)
+    """
+    response = None
+    error = ""
+    for attempt in range(1, retries + 2):
+        try:
+            response = session.post(url, timeout=timeout, **kwargs)
+            if response.status_code < 500:
+                return response, attempt, ""
+            error = response.text
+        except (requests.ConnectionError, requests.Timeout) as e:
+            response = None
+            error = str(e)
+        except requests.RequestException as e:
+            # Bad URL, redirect loop, broken response body...: not retryable
+            return None, attempt, str(e)
+
+        if attempt <= retries:
+            delay = backoff * 2 ** (attempt - 1)
+            time.sleep(delay + random.uniform(0, delay * 0.1))
+
+    return response, attempt, error
+
+
+def post_with_retry(
+    session: requests.Session,
+    url: str,
+    feedback: Dict[str, str],
+    timeout: float = 10.0,
+    retries: int = 3,
+    backoff: float = 0.5,
+) -> UploadResult:
+    """POST one feedback dict, retrying 5xx responses and connection errors."""
+    start = time.perf_counter()
+    response, attempts, error = _post(
+        session, url, timeout, retries, backoff, data=feedback
+    )
+    latency = time.perf_counter() - start
+    if response is None:
+        return UploadResult(feedback, False, None, latency, attempts, error)
+    ok = response.status_code == 201
+    return UploadResult(
+        feedback, ok, response.status_code, latency, attempts,
+        "" if ok else (error or response.text),
+    )
+
+
+def iter_batches(
+    feedback_items: Iterable[Dict[str, str]],
+    max_items: int,
+    max_bytes: int,
+) -> Iterator[List[Dict[str, str]]]:
+    """Group feedback dicts into batches of at most max_items and ~max_bytes.
+
+    Size is measured as the JSON encoding of each item. An item larger than
+    max_bytes on its own is sent as a batch of one.
+    """
+    batch: List[Dict[str, str]] = []
+    batch_bytes = 0
+    for feedback in feedback_items:
+        size = len(json.dumps(feedback).encode("utf-8")) + 1
+        if batch and (len(batch) >= max_items or batch_bytes + size > max_bytes):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(feedback)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+
+def encode_batch(batch: List[Dict[str, str]], batch_format: str) -> Tuple[bytes, str]:
+    """Encode a batch as a JSON array or NDJSON; returns (body, content type)."""
+    if batch_format == "ndjson":
+        body = "".join(json.dumps(feedback) + "\n" for feedback in batch)
+        return body.encode("utf-8"), "application/x-ndjson"
+    return json.dumps(batch).encode("utf-8"), "application/json"
+
+
+def _item_statuses(response: requests.Response, count: int) -> List[int]:
+    """Per-item statuses from a batch response.
+
+    The endpoint may answer with a JSON array (one status code, or one
+    object with a "status" key, per item). Any other body means the whole
+    batch was accepted.
+    """
+    try:
+        items = response.json()
+    except ValueError:
+        items = None
+    if not isinstance(items, list) or len(items) != count:
+        return [201] * count
+    statuses = []
+    for item in items:
+        if isinstance(item, dict):
+            item = item.get("status", 0)
+        statuses.append(item if isinstance(item, int) else 0)
+    return statuses
+
+
+def post_batch(
+    session: requests.Session,
+    url: str,
+    batch: List[Dict[str, str]],
+    batch_format: str = "json",
+    timeout: float = 10.0,
+    retries: int = 3,
+    backoff: float = 0.5,
+    item_url: Optional[str] = None,
+) -> List[UploadResult]:
+    """POST a batch of feedback dicts in one request and return per-item results.
+
+    - 5xx / connection errors are retried like single uploads; if they
+      persist, every item in the batch is reported as failed.
+    - Any other non-2xx answer means the endpoint rejected the batch, so
+      each item is posted individually to item_url (default: url).
+    - Items marked as failed in a per-item batch response are retried
+      individually, so partial failures are not lost.
+    """
+    item_url = item_url or url
+    start = time.perf_counter()
+    body, content_type = encode_batch(batch, batch_format)
+    response, attempts, error = _post(
+        session, url, timeout, retries, backoff,
+        data=body, headers={"Content-Type": content_type},
+    )
+    latency = time.perf_counter() - start
+
+    if response is None or response.status_code >= 500:
+        status_code = response.status_code if response is not None else None
+        return [
+            UploadResult(feedback, False, status_code, latency, attempts, error)
+            for feedback in batch
+        ]
+
+    if response.status_code not in (200, 201):
+        return [
+            post_with_retry(session, item_url, feedback, timeout, retries, backoff)
+            for feedback in batch
+        ]
+
+    results = []
+    for feedback, status in zip(batch, _item_statuses(response, len(batch))):
+        if status in (200, 201):
+            results.append(UploadResult(feedback, True, status, latency, attempts, ""))
+        else:
+            results.append(
+                post_with_retry(session, item_url, feedback, timeout, retries, backoff)
+            )
+    return results
+
+
+def upload_all(
+    feedback_items: Iterable[Dict[str, str]],
+    url: str,
+    concurrency: int = 8,
+    timeout: float = 10.0,
+    retries: int = 3,
+    backoff: float = 0.5,
+    batch_size: int = 0,
+    batch_bytes: int = 1024 * 1024,
+    batch_format: str = "json",
+    batch_url: Optional[str] = None,
+) -> Iterator[UploadResult]:
+    """Upload feedback dicts concurrently and yield results as they finish.
+
+    With batch_size > 1, items are grouped by iter_batches and each group is
+    sent with post_batch to batch_url (default: url); results are still
+    yielded per item.
+
+    At most 2 * concurrency uploads (items or batches) are read ahead, so
+    memory stays bounded however many files the input generator produces.
+    """
+    session = make_session(concurrency)
+    max_pending = concurrency * 2
+
+    if batch_size > 1:
+        units = iter_batches(feedback_items, batch_size, batch_bytes)
+
+        def upload(batch):
+            return post_batch(
+                session, batch_url or url, batch, batch_format,
+                timeout, retries, backoff, item_url=url,
+            )
+    else:
+        units = feedback_items
+
+        def upload(feedback):
+            return [post_with_retry(session, url, feedback, timeout, retries, backoff)]
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending = set()
+            for unit in units:
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from future.result()
+                pending.add(executor.submit(upload, unit))
+            for future in wait(pending).done:
+                yield from future.result()
+    finally:
+        session.close()
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def print_upload_report(latencies: List[float], failed: int, elapsed: float) -> None:
+    """Print throughput and latency statistics for an upload run."""
+    total = len(latencies)
+    latencies = sorted(latencies)
+    rate = total / elapsed if elapsed > 0 else 0.0
+    print(
+        f"\n[SUMMARY] Uploaded {total - failed}/{total} feedback item(s) "
+        f"in {elapsed:.2f}s ({rate:.1f} items/s), {failed} failed."
+    )
+    if latencies:
+        print(
+            "[SUMMARY] Latency (ms): "
+            f"p50={percentile(latencies, 50) * 1000:.1f} "
+            f"p95={percentile(latencies, 95) * 1000:.1f} "
+            f"p99={percentile(latencies, 99) * 1000:.1f} "
+            f"max={latencies[-1] * 1000:.1f}"
+        )
+
+
 def main():
     # In the Google lab, the feedback files live in /data/feedback.
     # For this standalone project, we use a local 'feedback' directory by default.
@@ -65,22 +412,85 @@ def main():
     # For portability, use an environment variable, with a placeholder default.
     url = os.environ.get("FEEDBACK_ENDPOINT", "http://localhost/feedback/")
 
+    # Upload tuning: parallel requests, per-request timeout (s), retries
+    # on 5xx/connection errors, and the first backoff delay (s).
+    concurrency = int(os.environ.get("FEEDBACK_CONCURRENCY", "8"))
+    timeout = float(os.environ.get("FEEDBACK_TIMEOUT", "10"))
+    retries = int(os.environ.get("FEEDBACK_RETRIES", "3"))
+    backoff = float(os.environ.get("FEEDBACK_BACKOFF", "0.5"))
+
+    # Batch mode: send up to FEEDBACK_BATCH_SIZE items (and ~FEEDBACK_BATCH_BYTES)
+    # per request as a JSON array or NDJSON body. 0 or 1 disables batching.
+    batch_size = int(os.environ.get("FEEDBACK_BATCH_SIZE", "0"))
+    batch_bytes = int(os.environ.get("FEEDBACK_BATCH_BYTES", str(1024 * 1024)))
+    batch_format = os.environ.get("FEEDBACK_BATCH_FORMAT", "json")
+    batch_url = os.environ.get("FEEDBACK_BATCH_ENDPOINT", url)
+
+    # Checkpoint journal of uploaded files; set to "" to always upload everything.
+    journal_path = os.environ.get("FEEDBACK_JOURNAL", ".feedback_upload.journal")
+
+    # Scanning: recurse into subdirectories, only take shard INDEX/COUNT of
+    # the files, and read/parse files in a thread pool with bounded prefetch.
+    scan_options = {
+        "recursive": os.environ.get("FEEDBACK_RECURSIVE", "0") == "1",
+        "workers": int(os.environ.get("FEEDBACK_READ_WORKERS", "8")),
+        "prefetch": int(os.environ.get("FEEDBACK_PREFETCH", "64")),
+    }
+    scan_options["shard_index"], scan_options["shard_count"] = parse_shard(
+        os.environ.get("FEEDBACK_SHARD", "0/1")
+    )
+
     if not os.path.isdir(feedback_dir):
         print(f"[ERROR] Feedback directory not found: {feedback_dir}")
         return
 
-    for feedback in load_feedback_from_dir(feedback_dir):
-        try:
-            response = requests.post(url, data=feedback)
-            if response.status_code == 201:
-                print(f"[OK] Uploaded feedback: {feedback['title']}")
-            else:
-                print(
-                    f"[WARN] Failed to upload '{feedback['title']}'. "
-                    f"Status code: {response.status_code}, Response: {response.text}"
-                )
-        except Exception as e:
-            print(f"[ERROR] Exception while uploading '{feedback['title']}': {e}")
+    journal = UploadJournal(journal_path) if journal_path else None
+    # FileState of each feedback dict still in flight, keyed by id(dict)
+    in_flight: Dict[int, FileState] = {}
+
+    def feedback_items():
+        if journal is None:
+            yield from load_feedback_from_dir(feedback_dir, **scan_options)
+            return
+        for state, feedback in load_new_feedback(feedback_dir, journal, **scan_options):
+            in_flight[id(feedback)] = state
+            yield feedback
+
+    latencies: List[float] = []
+    failed = 0
+    start = time.perf_counter()
+    for result in upload_all(
+        feedback_items(),
+        url,
+        concurrency=concurrency,
+        timeout=timeout,
+        retries=retries,
+        backoff=backoff,
+        batch_size=batch_size,
+        batch_bytes=batch_bytes,
+        batch_format=batch_format,
+        batch_url=batch_url,
+    ):
+        latencies.append(result.latency)
+        title = result.feedback["title"]
+        state = in_flight.pop(id(result.feedback), None)
+        if result.ok:
+            if state is not None:
+                journal.record(state)
+            print(f"[OK] Uploaded feedback: {title}")
+        elif result.status_code is not None:
+            failed += 1
+            print(
+                f"[WARN] Failed to upload '{title}'. "
+                f"Status code: {result.status_code}, Response: {result.error}"
+            )
+        else:
+            failed += 1
+            print(f"[ERROR] Exception while uploading '{title}': {result.error}")
+
+    if journal is not None:
+        journal.close()
+    print_upload_report(latencies, failed, time.perf_counter() - start)
 
 
 if __name__ == "__main__":
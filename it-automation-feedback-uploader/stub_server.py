@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""stub_server.py
+
+A tiny local stand-in for the Django /feedback/ endpoint, so run.py can be
+tried and benchmarked offline.
+
+- Answers POST requests with 201 Created (and counts them)
+- Optional artificial latency per request to mimic a remote server
+- Optional failure rate that answers 503, to exercise retry/backoff
+- Batch bodies (JSON array or NDJSON) answered with per-item statuses,
+  or rejected with 415 when started with --no-batch
+
+Usage example:
+
+    python3 stub_server.py --port 8000 --delay 0.02 --fail-rate 0.1
+    FEEDBACK_ENDPOINT=http://127.0.0.1:8000/feedback/ python3 run.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+
+class FeedbackHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between requests
+    protocol_version = "HTTP/1.1"
+    # Send headers and body in one segment; with Nagle's algorithm and
+    # delayed ACKs, split writes add ~40 ms to every keep-alive request.
+    disable_nagle_algorithm = True
+    wbufsize = 64 * 1024
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+
+        server = self.server
+        if server.delay:
+            time.sleep(server.delay)
+
+        content_type = self.headers.get("Content-Type", "").split(";")[0].strip()
+        if content_type in ("application/json", "application/x-ndjson"):
+            self._handle_batch(body, content_type)
+            return
+
+        if server.fail_rate and random.random() < server.fail_rate:
+            self._reply(503, b"Service Unavailable")
+            return
+
+        with server.lock:
+            server.received += 1
+            server.received_bytes += len(body)
+        self._reply(201, b"Created")
+
+    def _handle_batch(self, body: bytes, content_type: str) -> None:
+        server = self.server
+        if not server.accept_batches:
+            self._reply(415, b"Unsupported Media Type")
+            return
+        try:
+            if content_type == "application/x-ndjson":
+                items = [json.loads(line) for line in body.splitlines() if line.strip()]
+            else:
+                items = json.loads(body)
+        except ValueError:
+            self._reply(400, b"Bad Request")
+            return
+
+        statuses = []
+        for _ in items:
+            if server.fail_rate and random.random() < server.fail_rate:
+                statuses.append({"status": 503})
+            else:
+                statuses.append({"status": 201})
+        accepted = sum(1 for status in statuses if status["status"] == 201)
+        with server.lock:
+            server.received += accepted
+            server.received_bytes += len(body)
+        self._reply(201, json.dumps(statuses).encode("utf-8"), "application/json")
+
+    def _reply(self, status: int, body: bytes, content_type: str = "text/plain") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        delay: float = 0.0,
+        fail_rate: float = 0.0,
+        accept_batches: bool = True,
+    ):
+        super().__init__(address, FeedbackHandler)
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.accept_batches = accept_batches
+        self.lock = threading.Lock()
+        self.received = 0
+        self.received_bytes = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/feedback/"
+
+
+def start_in_thread(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    delay: float = 0.0,
+    fail_rate: float = 0.0,
+    accept_batches: bool = True,
+) -> StubServer:
+    """Start a StubServer on a background thread (port 0 picks a free port)."""
+    server = StubServer(
+        (host, port), delay=delay, fail_rate=fail_rate, accept_batches=accept_batches
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stub /feedback/ endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--delay", type=float, default=0.0, help="Seconds to wait before each reply"
+    )
+    parser.add_argument(
+        "--fail-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of requests answered with 503 (default: 0)",
+    )
+    parser.add_argument(
+        "--no-batch",
+        action="store_true",
+        help="Reject JSON/NDJSON batch bodies with 415",
+    )
+    args = parser.parse_args()
+
+    server = StubServer(
+        (args.host, args.port),
+        delay=args.delay,
+        fail_rate=args.fail_rate,
+        accept_batches=not args.no_batch,
+    )
+    print(f"[INFO] Stub feedback endpoint listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"[INFO] Received {server.received} feedback item(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""upload_journal.py
+
+Append-only checkpoint journal for run.py, so an interrupted upload can be
+resumed without re-posting feedback that the server already accepted.
+
+Each line records one file whose upload got a 201:
+
+    <sha256 of content>\t<size>\t<mtime_ns>\t<absolute path>\n
+
+- Appends are flushed and fsync'd, so a crash loses at most the line being
+  written; a torn last line is dropped when the journal is next opened.
+- On startup the journal is compacted (torn lines and duplicates removed)
+  and only 64-bit keys are kept in memory, in sorted arrays:
+    * a stat key (path, size, mtime_ns): unchanged files are skipped
+      without being opened
+    * a content key (sha256 prefix): touched or renamed files with the
+      same content are recognised after hashing, without re-uploading
+  That is 16 bytes per uploaded file rather than a dict of full records.
+"""
+
+import array
+import bisect
+import hashlib
+import os
+from typing import Iterator, NamedTuple, Tuple
+
+
+class FileState(NamedTuple):
+    """Identity of one feedback file at the time it was read."""
+
+    path: str  # absolute path
+    size: int
+    mtime_ns: int
+    digest: str  # sha256 hex of the file content
+
+
+def stat_key(path: str, size: int, mtime_ns: int) -> int:
+    """64-bit key for a (path, size, mtime_ns) triple."""
+    raw = f"{path}\0{size}\0{mtime_ns}".encode("utf-8", "surrogateescape")
+    return int.from_bytes(hashlib.blake2b(raw, digest_size=8).digest(), "little")
+
+
+def content_key(digest: str) -> int:
+    """64-bit key from the first 16 hex digits of a sha256 digest."""
+    return int(digest[:16], 16)
+
+
+def _parse_line(line: bytes) -> FileState:
+    """Parse one journal line; raises ValueError if it is torn or corrupt."""
+    if not line.endswith(b"\n"):
+        raise ValueError("incomplete line")
+    digest, size, mtime_ns, path = line[:-1].decode("utf-8", "surrogateescape").split("\t", 3)
+    if len(digest) != 64:
+        raise ValueError("bad digest")
+    int(digest, 16)
+    return FileState(path, int(size), int(mtime_ns), digest)
+
+
+def _format_line(state: FileState) -> bytes:
+    return (
+        f"{state.digest}\t{state.size}\t{state.mtime_ns}\t{state.path}\n"
+    ).encode("utf-8", "surrogateescape")
+
+
+def _iter_journal(path: str) -> Iterator[Tuple[bytes, FileState]]:
+    """Yield (raw line, state) for every valid line in the journal."""
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                yield line, _parse_line(line)
+            except ValueError:
+                continue
+
+
+def _sorted_unique(keys: array.array) -> array.array:
+    result = array.array("Q")
+    last = None
+    for key in sorted(keys):
+        if key != last:
+            result.append(key)
+            last = key
+    return result
+
+
+def _contains(keys: array.array, key: int) -> bool:
+    i = bisect.bisect_left(keys, key)
+    return i < len(keys) and keys[i] == key
+
+
+class UploadJournal:
+    """Checkpoint journal of successfully uploaded feedback files."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._stat_keys = array.array("Q")
+        self._content_keys = array.array("Q")
+        if os.path.exists(path):
+            self._compact()
+        self._file = open(path, "ab")
+
+    def __len__(self) -> int:
+        return len(self._stat_keys)
+
+    def __enter__(self) -> "UploadJournal":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def _compact(self) -> None:
+        """Load keys, and rewrite the journal without torn or duplicate lines.
+
+        Two streaming passes: the first collects keys, the second writes each
+        stat key's first line once, tracked with a one-byte-per-key bitmap.
+        The rewrite is skipped when the journal is already clean.
+        """
+        stat_keys = array.array("Q")
+        content_keys = array.array("Q")
+        line_count = 0
+        valid_bytes = 0
+        for line, state in _iter_journal(self.path):
+            stat_keys.append(stat_key(state.path, state.size, state.mtime_ns))
+            content_keys.append(content_key(state.digest))
+            line_count += 1
+            valid_bytes += len(line)
+
+        self._stat_keys = _sorted_unique(stat_keys)
+        self._content_keys = _sorted_unique(content_keys)
+        del stat_keys, content_keys
+
+        clean = (
+            len(self._stat_keys) == line_count
+            and valid_bytes == os.path.getsize(self.path)
+        )
+        if clean:
+            return
+
+        written = bytearray(len(self._stat_keys))
+        tmp_path = f"{self.path}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as out:
+            for line, state in _iter_journal(self.path):
+                key = stat_key(state.path, state.size, state.mtime_ns)
+                i = bisect.bisect_left(self._stat_keys, key)
+                if written[i]:
+                    continue
+                written[i] = 1
+                out.write(line)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, self.path)
+
+    def has_file(self, path: str, size: int, mtime_ns: int) -> bool:
+        """True if this exact (path, size, mtime) was uploaded before."""
+        return _contains(self._stat_keys, stat_key(path, size, mtime_ns))
+
+    def has_content(self, digest: str) -> bool:
+        """True if a file with this content hash was uploaded before."""
+        return _contains(self._content_keys, content_key(digest))
+
+    def record(self, state: FileState) -> None:
+        """Durably append a successfully uploaded file to the journal.
+
+        Keys recorded during this run only go to disk; the in-memory arrays
+        describe earlier runs, which is all a single scan needs.
+        """
+        self._file.write(_format_line(state))
+        self._file.flush()
+        os.fsync(self._file.fileno())
@@ -14,11 +14,31 @@ Usage examples:
 
     # Analyze multiple users from a CSV file
     python analyze_logins.py --csv sample_logins.csv --threshold 3.0
+
+    # Quiet batch mode for large files: only flagged users, sorted by ratio
+    python analyze_logins.py --csv sample_logins.csv --quiet
+    python analyze_logins.py --csv sample_logins.csv --format json --output flagged.json
+
+    # Same, parsed and scored on 8 processes (identical output)
+    python analyze_logins.py --csv sample_logins.csv --quiet --workers 8
 """
 
 import argparse
 import csv
-from typing import Optional
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; batch mode falls back to pure Python
+    np = None
+
+
+# Rows parsed and scored at a time in batch mode
+DEFAULT_CHUNK_SIZE = 100_000
 
 
 def analyze_logins(
@@ -113,6 +133,331 @@ def analyze_from_csv(csv_path: str, threshold: float) -> None:
     )
 
 
+class FlaggedUser(NamedTuple):
+    username: str
+    current_day_logins: int
+    average_day_logins: float
+    ratio: float
+
+
+class BatchResult(NamedTuple):
+    """Outcome of a batch run: flagged users plus summary counts."""
+
+    flagged: List[FlaggedUser]  # sorted by ratio, highest first
+    total_count: int  # rows with valid numbers (same as analyze_from_csv)
+    invalid_count: int  # rows skipped because of invalid numbers
+    no_average_count: int  # rows with average_day_logins <= 0 or NaN
+
+
+def _score_chunk_python(
+    usernames: List[str],
+    currents: List[str],
+    averages: List[str],
+    threshold: float,
+) -> Tuple[List[FlaggedUser], int, int, int]:
+    """Score one chunk row by row with the same rules as analyze_logins."""
+    flagged: List[FlaggedUser] = []
+    checked = invalid = no_average = 0
+    for username, current_str, average_str in zip(usernames, currents, averages):
+        try:
+            current = int(current_str)
+            average = float(average_str)
+        except ValueError:
+            invalid += 1
+            continue
+        checked += 1
+        if not average > 0:  # also catches NaN, as the NumPy path does
+            no_average += 1
+            continue
+        ratio = current / average
+        if ratio >= threshold:
+            flagged.append(FlaggedUser(username, current, average, ratio))
+    return flagged, checked, invalid, no_average
+
+
+def _score_chunk_numpy(
+    usernames: List[str],
+    currents: List[str],
+    averages: List[str],
+    threshold: float,
+) -> Tuple[List[FlaggedUser], int, int, int]:
+    """Vectorized version of _score_chunk_python.
+
+    Falls back to the row-by-row path if any value in the chunk does not
+    convert cleanly, so invalid-row handling stays identical.
+    """
+    try:
+        current = np.array(currents).astype(np.int64)
+        average = np.array(averages).astype(np.float64)
+    except (ValueError, OverflowError):
+        return _score_chunk_python(usernames, currents, averages, threshold)
+
+    positive = average > 0
+    ratio = np.zeros_like(average)
+    np.divide(current, average, out=ratio, where=positive)
+    hits = np.flatnonzero(positive & (ratio >= threshold))
+    flagged = [
+        FlaggedUser(usernames[i], int(current[i]), float(average[i]), float(ratio[i]))
+        for i in hits
+    ]
+    return flagged, len(usernames), 0, int(len(usernames) - positive.sum())
+
+
+def score_chunk(
+    usernames: List[str],
+    currents: List[str],
+    averages: List[str],
+    threshold: float,
+) -> Tuple[List[FlaggedUser], int, int, int]:
+    """Score one chunk of rows.
+
+    Returns:
+        (flagged users in input order, checked, invalid, no_average) counts
+    """
+    if np is not None and usernames:
+        return _score_chunk_numpy(usernames, currents, averages, threshold)
+    return _score_chunk_python(usernames, currents, averages, threshold)
+
+
+BATCH_COLUMNS = ("username", "current_day_logins", "average_day_logins")
+
+
+def check_batch_header(header: List[str]) -> bool:
+    """Return False for an empty CSV; raise ValueError if a column is missing."""
+    if not header:
+        return False
+    missing = [column for column in BATCH_COLUMNS if column not in header]
+    if missing:
+        raise ValueError(f"CSV header is missing column(s): {', '.join(missing)}")
+    return True
+
+
+def iter_chunks(
+    rows: Iterable[List[str]], header: List[str], chunk_size: int
+) -> Iterator[Tuple[List[str], List[str], List[str]]]:
+    """Split CSV rows into (usernames, currents, averages) column chunks."""
+    user_col = header.index("username")
+    current_col = header.index("current_day_logins")
+    average_col = header.index("average_day_logins")
+    width = max(user_col, current_col, average_col) + 1
+
+    usernames: List[str] = []
+    currents: List[str] = []
+    averages: List[str] = []
+    for row in rows:
+        if not row:
+            continue  # blank line: skipped, like csv.DictReader does
+        if len(row) < width:
+            # Short row: treated as invalid numbers, like analyze_from_csv
+            row = row + [""] * (width - len(row))
+        usernames.append(row[user_col].strip())
+        currents.append(row[current_col])
+        averages.append(row[average_col])
+        if len(usernames) >= chunk_size:
+            yield usernames, currents, averages
+            usernames, currents, averages = [], [], []
+    if usernames:
+        yield usernames, currents, averages
+
+
+def merge_results(
+    parts: Iterable[Tuple[List[FlaggedUser], int, int, int]]
+) -> BatchResult:
+    """Combine per-chunk results (in file order) into one BatchResult."""
+    flagged: List[FlaggedUser] = []
+    total = invalid = no_average = 0
+    for part_flagged, checked, part_invalid, part_no_average in parts:
+        flagged.extend(part_flagged)
+        total += checked
+        invalid += part_invalid
+        no_average += part_no_average
+    # Stable sort: users with equal ratios stay in file order
+    flagged.sort(key=lambda user: user.ratio, reverse=True)
+    return BatchResult(flagged, total, invalid, no_average)
+
+
+def analyze_csv_batch(
+    csv_path: str, threshold: float, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> BatchResult:
+    """Analyze a login CSV in chunks without per-user output.
+
+    Uses the same rules as analyze_from_csv, but scores whole chunks at a
+    time (vectorized with NumPy when it is installed) and only keeps the
+    users whose ratio reaches the threshold.
+
+    Raises ValueError if the CSV header lacks one of BATCH_COLUMNS.
+    """
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        if not check_batch_header(header):
+            return BatchResult([], 0, 0, 0)
+        return merge_results(
+            score_chunk(usernames, currents, averages, threshold)
+            for usernames, currents, averages in iter_chunks(reader, header, chunk_size)
+        )
+
+
+def split_byte_ranges(csv_path: str, parts: int) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """Split the data rows of a CSV into about `parts` line-aligned byte ranges.
+
+    Each boundary is moved forward to just after the next newline, so no
+    line is split between ranges. Assumes fields do not contain embedded
+    newlines (true for the username,current_day_logins,average_day_logins
+    format).
+
+    Returns:
+        (parsed header, [(start, end), ...] in file order)
+    """
+    size = os.path.getsize(csv_path)
+    with open(csv_path, "rb") as f:
+        header_line = f.readline()
+        header = next(csv.reader([header_line.decode("utf-8")]), [])
+        data_start = len(header_line)
+
+        boundaries = [data_start]
+        step = max(1, (size - data_start) // max(parts, 1))
+        for i in range(1, parts):
+            target = data_start + i * step
+            if target <= boundaries[-1] or target >= size:
+                continue
+            f.seek(target - 1)
+            f.readline()
+            aligned = f.tell()
+            if boundaries[-1] < aligned < size:
+                boundaries.append(aligned)
+        boundaries.append(size)
+
+    return header, list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _score_byte_range(
+    csv_path: str,
+    start: int,
+    end: int,
+    header: List[str],
+    threshold: float,
+    chunk_size: int,
+) -> Tuple[List[FlaggedUser], int, int, int]:
+    """Parse and score the rows in [start, end) of csv_path (runs in a worker)."""
+    with open(csv_path, "rb") as f:
+        f.seek(start)
+
+        def lines() -> Iterator[str]:
+            pos = start
+            for raw in f:
+                if pos >= end:
+                    break
+                pos += len(raw)
+                yield raw.decode("utf-8")
+
+        parts = [
+            score_chunk(usernames, currents, averages, threshold)
+            for usernames, currents, averages in iter_chunks(
+                csv.reader(lines()), header, chunk_size
+            )
+        ]
+
+    flagged: List[FlaggedUser] = []
+    checked = invalid = no_average = 0
+    for part_flagged, part_checked, part_invalid, part_no_average in parts:
+        flagged.extend(part_flagged)
+        checked += part_checked
+        invalid += part_invalid
+        no_average += part_no_average
+    return flagged, checked, invalid, no_average
+
+
+def analyze_csv_parallel(
+    csv_path: str,
+    threshold: float,
+    workers: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> BatchResult:
+    """Multi-core version of analyze_csv_batch.
+
+    The file is split into line-aligned byte ranges (a few per worker, for
+    load balancing) that a process pool parses and scores independently.
+    Partial results are merged in file order, so the result is identical
+    to analyze_csv_batch on the same file.
+    """
+    header, ranges = split_byte_ranges(csv_path, workers * 4)
+    if not check_batch_header(header):
+        return BatchResult([], 0, 0, 0)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parts = executor.map(
+            _score_byte_range,
+            *zip(
+                *[
+                    (csv_path, start, end, header, threshold, chunk_size)
+                    for start, end in ranges
+                ]
+            ),
+        )
+        return merge_results(parts)
+
+
+def print_batch_result(result: BatchResult, threshold: float, out: TextIO) -> None:
+    """Human-readable report: flagged users by ratio, then the summary."""
+    for user in result.flagged:
+        print(
+            f"[ALERT] {user.username}: {user.current_day_logins} logins "
+            f"(average: {user.average_day_logins:.2f}, ratio: {user.ratio:.2f}x)",
+            file=out,
+        )
+    if result.invalid_count:
+        print(f"[WARN] Skipped {result.invalid_count} row(s) with invalid numbers.", file=out)
+    if result.no_average_count:
+        print(
+            f"[WARN] {result.no_average_count} user(s) had average_day_logins <= 0 or NaN "
+            f"and could not be analyzed.",
+            file=out,
+        )
+    print(
+        f"\n[SUMMARY] Checked {result.total_count} user(s). "
+        f"Suspicious activity detected for {len(result.flagged)} user(s) "
+        f"(threshold={threshold}).",
+        file=out,
+    )
+
+
+def write_batch_json(result: BatchResult, threshold: float, out: TextIO) -> None:
+    json.dump(
+        {
+            "threshold": threshold,
+            "checked": result.total_count,
+            "suspicious": len(result.flagged),
+            "invalid_rows": result.invalid_count,
+            "no_average": result.no_average_count,
+            "flagged": [user._asdict() for user in result.flagged],
+        },
+        out,
+        indent=2,
+    )
+    out.write("\n")
+
+
+def write_batch_csv(result: BatchResult, threshold: float, out: TextIO) -> None:
+    writer = csv.writer(out)
+    writer.writerow(FlaggedUser._fields)
+    for user in result.flagged:
+        writer.writerow(
+            [
+                user.username,
+                user.current_day_logins,
+                user.average_day_logins,
+                f"{user.ratio:.6f}",
+            ]
+        )
+
+
+BATCH_WRITERS = {
+    "text": print_batch_result,
+    "json": write_batch_json,
+    "csv": write_batch_csv,
+}
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Analyze login activity and flag potential anomalies."
@@ -145,12 +490,61 @@ def parse_args() -> argparse.Namespace:
         help="Ratio above which logins are considered suspicious (default: 3.0)",
     )
 
+    # Batch options for --csv
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Batch mode: only report flagged users, sorted by ratio, plus the summary",
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(BATCH_WRITERS),
+        help="Batch output format (implies --quiet; default: text)",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="Write batch output to this file instead of stdout",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Batch mode: parse and score the CSV on this many processes (default: 1)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"Rows scored at a time in batch mode (default: {DEFAULT_CHUNK_SIZE})",
+    )
+
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
 
+    if args.csv and (args.quiet or args.format):
+        # Batch mode: chunked scoring, only flagged users are reported
+        try:
+            if args.workers > 1:
+                result = analyze_csv_parallel(
+                    args.csv, args.threshold, args.workers, args.chunk_size
+                )
+            else:
+                result = analyze_csv_batch(args.csv, args.threshold, args.chunk_size)
+        except ValueError as e:
+            print(f"[ERROR] Cannot analyze {args.csv}: {e}", file=sys.stderr)
+            sys.exit(1)
+        write = BATCH_WRITERS[args.format or "text"]
+        if args.output:
+            with open(args.output, "w", newline="", encoding="utf-8") as out:
+                write(result, args.threshold, out)
+        else:
+            write(result, args.threshold, sys.stdout)
+        return
+
     if args.csv:
         # Analyze multiple users from a CSV file
         analyze_from_csv(args.csv, args.threshold)
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Login Baselines
+
+Builds the `current_day_logins` / `average_day_logins` numbers that
+analyze_logins.py expects directly from raw authentication events, instead
+of relying on a precomputed CSV.
+
+Supported inputs:
+- sshd lines from auth.log / secure (classic syslog or ISO 8601 timestamps),
+  counting "Accepted ..." and "Failed ..." login attempts
+- a simple CSV event log with header: timestamp,username
+  (timestamp in ISO 8601, e.g. 2024-01-05T10:00:00)
+
+State is persisted in a JSON file between runs:
+- per-user daily counts for a rolling window of N days plus today
+- the byte offset reached in every input file, so each run only reads the
+  events appended since the last run (a rotated or truncated file is read
+  again from the start)
+
+"Today" is the most recent day seen in the events, and the average is
+taken over the previous N days (or fewer, if the store has less history).
+
+Usage examples:
+
+    python login_baselines.py --auth-log /var/log/auth.log --state logins_state.json
+    python login_baselines.py --events-csv events.csv --days 14 --quiet
+    python login_baselines.py --auth-log auth.log --export-csv sample_logins.csv
+"""
+
+import argparse
+import csv
+import datetime
+import functools
+import io
+import json
+import os
+import re
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from analyze_logins import BATCH_WRITERS, analyze_logins, merge_results, score_chunk
+
+
+STATE_VERSION = 1
+DEFAULT_WINDOW_DAYS = 7
+
+SSHD_EVENT_RE = re.compile(
+    r"sshd\[\d+\]: (?:Accepted|Failed) \S+ for (?:invalid user )?(?P<user>\S+) from "
+)
+
+
+@functools.lru_cache(maxsize=64)
+def parse_syslog_day(stamp: str, today: datetime.date) -> datetime.date:
+    """Parse the "Mon DD" part of a classic syslog stamp, which has no year.
+
+    Dates after `today` are assumed to belong to the previous year (e.g.
+    December lines read in January). Cached, since a log has few distinct
+    days and this runs once per line.
+    """
+    parsed = datetime.datetime.strptime(f"{today.year} {stamp}", "%Y %b %d").date()
+    if parsed > today:
+        parsed = parsed.replace(year=today.year - 1)
+    return parsed
+
+
+def parse_auth_line(
+    line: str, today: datetime.date
+) -> Optional[Tuple[str, datetime.date]]:
+    """Return (username, day) for an sshd login attempt line, else None."""
+    if "sshd[" not in line or ("Accepted " not in line and "Failed " not in line):
+        return None
+    match = SSHD_EVENT_RE.search(line)
+    if not match:
+        return None
+    try:
+        if line[:4].isdigit():
+            # ISO 8601 / RFC 3339 timestamp (rsyslog high-precision format)
+            day = datetime.datetime.fromisoformat(line.split(" ", 1)[0]).date()
+        else:
+            day = parse_syslog_day(line[:6], today)
+    except ValueError:
+        return None
+    return match.group("user"), day
+
+
+def parse_event_csv_line(
+    line: str, columns: Tuple[int, int]
+) -> Optional[Tuple[str, datetime.date]]:
+    """Return (username, day) for one line of the CSV event format, else None."""
+    time_col, user_col = columns
+    try:
+        fields = next(csv.reader([line]))
+        username = fields[user_col].strip()
+        day = datetime.datetime.fromisoformat(fields[time_col].strip()).date()
+    except (IndexError, ValueError, StopIteration):
+        return None
+    if not username:
+        return None
+    return username, day
+
+
+class LoginStore:
+    """Per-user daily login counts for a rolling window, persisted as JSON.
+
+    Each user maps to a list of window_days + 1 counts; the last slot is
+    `last_day` ("today") and slot 0 is window_days days earlier.
+    """
+
+    def __init__(self, window_days: int = DEFAULT_WINDOW_DAYS):
+        self.window_days = window_days
+        self.first_day: Optional[int] = None  # date ordinals
+        self.last_day: Optional[int] = None
+        self.counts: Dict[str, List[int]] = {}
+        # path -> {"inode": int, "offset": int}
+        self.sources: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def load(cls, path: str, window_days: int = DEFAULT_WINDOW_DAYS) -> "LoginStore":
+        if not os.path.exists(path):
+            return cls(window_days)
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != STATE_VERSION:
+            raise ValueError(f"Unsupported state file version in {path}")
+        store = cls(data["window_days"])
+        if store.window_days != window_days:
+            print(
+                f"[WARN] {path} was built with a {store.window_days}-day window; "
+                f"keeping it (requested {window_days})."
+            )
+        store.first_day = data["first_day"]
+        store.last_day = data["last_day"]
+        store.counts = data["counts"]
+        store.sources = data["sources"]
+        return store
+
+    def save(self, path: str) -> None:
+        """Write the state atomically (temp file + rename)."""
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": STATE_VERSION,
+                    "window_days": self.window_days,
+                    "first_day": self.first_day,
+                    "last_day": self.last_day,
+                    "sources": self.sources,
+                    "counts": self.counts,
+                },
+                f,
+                separators=(",", ":"),
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _advance(self, day: int) -> None:
+        """Move "today" forward to day, shifting every user's window."""
+        shift = day - self.last_day
+        size = self.window_days + 1
+        for username in list(self.counts):
+            days = self.counts[username]
+            if shift >= size:
+                del self.counts[username]
+                continue
+            days[:] = days[shift:] + [0] * shift
+            if not any(days):
+                # Nothing left in the window: drop the user to stay compact
+                del self.counts[username]
+        self.last_day = day
+
+    def add(self, username: str, day: datetime.date) -> None:
+        """Count one login attempt for username on day."""
+        ordinal = day.toordinal()
+        if self.last_day is None:
+            self.first_day = self.last_day = ordinal
+        elif ordinal > self.last_day:
+            self._advance(ordinal)
+        if ordinal < self.first_day:
+            self.first_day = ordinal
+
+        slot = self.window_days - (self.last_day - ordinal)
+        if slot < 0:
+            return  # older than the window
+        days = self.counts.get(username)
+        if days is None:
+            days = self.counts[username] = [0] * (self.window_days + 1)
+        days[slot] += 1
+
+    def history_days(self) -> int:
+        """Number of complete days before today that the averages cover."""
+        if self.last_day is None:
+            return 0
+        return min(self.window_days, self.last_day - self.first_day)
+
+    def rows(self) -> Iterator[Tuple[str, int, float]]:
+        """Yield (username, current_day_logins, average_day_logins) per user."""
+        history = self.history_days()
+        for username, days in self.counts.items():
+            history_total = sum(days[self.window_days - history:self.window_days])
+            average = history_total / history if history else 0.0
+            yield username, days[self.window_days], average
+
+
+def _read_new_lines(path: str, store: LoginStore) -> Iterator[str]:
+    """Yield complete lines appended to path since the last run.
+
+    The stored offset is reset when the file's inode changed (rotation) or
+    it shrank (truncation). A partial last line is left for the next run.
+    """
+    st = os.stat(path)
+    source = store.sources.get(path)
+    offset = 0
+    if source and source["inode"] == st.st_ino and source["offset"] <= st.st_size:
+        offset = source["offset"]
+
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            offset += len(raw)
+            yield raw.decode("utf-8", "replace")
+    store.sources[path] = {"inode": st.st_ino, "offset": offset}
+
+
+def ingest_auth_log(path: str, store: LoginStore, today: Optional[datetime.date] = None) -> int:
+    """Add new sshd login attempts from an auth.log file; returns events added."""
+    today = today or datetime.date.today()
+    added = 0
+    for line in _read_new_lines(path, store):
+        event = parse_auth_line(line, today)
+        if event:
+            store.add(*event)
+            added += 1
+    return added
+
+
+def ingest_event_csv(path: str, store: LoginStore) -> int:
+    """Add new events from a timestamp,username CSV file; returns events added."""
+    with open(path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(io.StringIO(f.readline())), [])
+    try:
+        columns = (header.index("timestamp"), header.index("username"))
+    except ValueError:
+        print(f"[ERROR] {path}: expected a header with timestamp,username")
+        return 0
+
+    added = 0
+    for line in _read_new_lines(path, store):
+        event = parse_event_csv_line(line, columns)
+        if event:
+            store.add(*event)
+            added += 1
+    return added
+
+
+def export_csv(store: LoginStore, path: str) -> None:
+    """Write the store as an analyze_logins.py --csv input file."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["username", "current_day_logins", "average_day_logins"])
+        for username, current, average in store.rows():
+            writer.writerow([username, current, f"{average:.4f}"])
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Build login baselines from raw auth events and flag anomalies."
+    )
+    parser.add_argument(
+        "--auth-log",
+        action="append",
+        default=[],
+        help="sshd auth log to ingest (can be repeated)",
+    )
+    parser.add_argument(
+        "--events-csv",
+        action="append",
+        default=[],
+        help="CSV event log with timestamp,username columns (can be repeated)",
+    )
+    parser.add_argument(
+        "--state",
+        default="login_baselines_state.json",
+        help="Persisted state file (default: login_baselines_state.json)",
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=DEFAULT_WINDOW_DAYS,
+        help=f"Days of history in the rolling average (default: {DEFAULT_WINDOW_DAYS})",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=3.0,
+        help="Ratio above which logins are considered suspicious (default: 3.0)",
+    )
+    parser.add_argument(
+        "--export-csv",
+        help="Also write username,current_day_logins,average_day_logins to this file",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Only report flagged users, sorted by ratio, plus the summary",
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(BATCH_WRITERS),
+        help="Output format for flagged users (implies --quiet; default: text)",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    store = LoginStore.load(args.state, args.days)
+
+    for path in args.auth_log:
+        added = ingest_auth_log(path, store)
+        print(f"[INFO] {path}: {added} new login event(s).", file=sys.stderr)
+    for path in args.events_csv:
+        added = ingest_event_csv(path, store)
+        print(f"[INFO] {path}: {added} new login event(s).", file=sys.stderr)
+    store.save(args.state)
+
+    if args.export_csv:
+        export_csv(store, args.export_csv)
+
+    if store.last_day is None:
+        print("[INFO] No login events recorded yet.")
+        return
+    today = datetime.date.fromordinal(store.last_day)
+    print(
+        f"[INFO] Analyzing {today} against the previous {store.history_days()} day(s).",
+        file=sys.stderr,
+    )
+
+    if args.quiet or args.format:
+        usernames, currents, averages = [], [], []
+        for username, current, average in store.rows():
+            usernames.append(username)
+            currents.append(current)
+            averages.append(average)
+        result = merge_results([score_chunk(usernames, currents, averages, args.threshold)])
+        BATCH_WRITERS[args.format or "text"](result, args.threshold, sys.stdout)
+        return
+
+    suspicious_count = 0
+    total_count = 0
+    for username, current, average in store.rows():
+        total_count += 1
+        if analyze_logins(username, current, average, args.threshold):
+            suspicious_count += 1
+        print("-" * 60)
+    print(
+        f"\n[SUMMARY] Checked {total_count} user(s). "
+        f"Suspicious activity detected for {suspicious_count} user(s)."
+    )
+
+
+if __name__ == "__main__":
+    main()
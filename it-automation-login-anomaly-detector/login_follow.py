@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Login Follow Mode
+
+Real-time version of the login anomaly detector: tails a growing auth log
+(or reads events from stdin) and flags a user as soon as today's login
+count reaches `threshold` times their usual daily count.
+
+- Per-user state is a small __slots__ object: the current day, today's
+  counter, an EWMA of previous daily counts and the day of the last alert,
+  so memory per user stays constant however many events arrive
+- A user is alerted at most once per day
+- Users idle for longer than the EWMA horizon (the days after which their
+  baseline has decayed below 1%) are dropped, and the number of tracked
+  users is capped, so username spraying cannot grow memory without bound
+- Log rotation (new inode) and truncation are detected while following;
+  the rest of the old file is drained before switching to the new one
+- Baselines can be seeded from a login_baselines.py state file, so users
+  are analyzable from the first event instead of after a full day
+
+Usage examples:
+
+    python login_follow.py --follow /var/log/auth.log
+    python login_follow.py --follow /var/log/auth.log --baseline-state logins_state.json
+    tail -F events.csv | python login_follow.py --input-format csv --follow -
+    python login_follow.py --benchmark 1000000
+"""
+
+import argparse
+import datetime
+import heapq
+import math
+import os
+import random
+import sys
+import time
+from typing import Dict, Iterator, Optional
+
+from login_baselines import LoginStore, parse_auth_line, parse_event_csv_line
+
+DEFAULT_MAX_USERS = 1_000_000
+
+
+class UserState:
+    """Rolling login state for one user."""
+
+    __slots__ = ("day", "today", "ewma", "alerted_day")
+
+    def __init__(self, day: int, ewma: float = 0.0):
+        self.day = day  # date ordinal that `today` counts
+        self.today = 0
+        self.ewma = ewma  # smoothed logins per completed day
+        self.alerted_day = 0
+
+
+class FollowDetector:
+    """Feeds login events through per-user EWMA baselines and raises alerts."""
+
+    def __init__(
+        self,
+        threshold: float = 3.0,
+        alpha: float = 0.25,
+        max_users: int = DEFAULT_MAX_USERS,
+    ):
+        self.threshold = threshold
+        self.alpha = alpha
+        self.max_users = max_users
+        # Days after which an idle user's baseline is below 1% of its value
+        self.horizon = math.ceil(math.log(0.01) / math.log(1 - alpha)) if 0 < alpha < 1 else 1
+        self.users: Dict[str, UserState] = {}
+        self.latest_day = 0
+        self.events = 0
+        self.alerts = 0
+        self.evicted = 0
+
+    def _evict_idle(self) -> None:
+        """Drop users not seen within the EWMA horizon (once per new day)."""
+        cutoff = self.latest_day - self.horizon
+        idle = [name for name, state in self.users.items() if state.day < cutoff]
+        for name in idle:
+            del self.users[name]
+        self.evicted += len(idle)
+
+    def _evict_oldest(self) -> None:
+        """Over max_users: drop the least recently active tenth of the users."""
+        excess = len(self.users) - self.max_users + self.max_users // 10
+        oldest = heapq.nsmallest(excess, self.users.items(), key=lambda item: item[1].day)
+        for name, _ in oldest:
+            del self.users[name]
+        self.evicted += len(oldest)
+
+    def seed(self, store: LoginStore) -> None:
+        """Start each user's EWMA from the averages in a login_baselines store.
+
+        The store's "today" counts are carried over too, so a user who is
+        already over the threshold today alerts on their next event.
+        """
+        if store.last_day is None:
+            return
+        for username, current, average in store.rows():
+            state = UserState(store.last_day, average)
+            state.today = current
+            self.users[username] = state
+        self.latest_day = max(self.latest_day, store.last_day)
+
+    def _roll(self, state: UserState, day: int) -> None:
+        """Close out state.day and move the user to a later day."""
+        if state.ewma > 0:
+            state.ewma = self.alpha * state.today + (1 - self.alpha) * state.ewma
+        else:
+            state.ewma = float(state.today)
+        # Days without any logins pull the baseline down
+        state.ewma *= (1 - self.alpha) ** (day - state.day - 1)
+        state.day = day
+        state.today = 0
+
+    def add(self, username: str, day: datetime.date) -> Optional[float]:
+        """Count one login; return the ratio if this event triggers an alert."""
+        self.events += 1
+        ordinal = day.toordinal()
+        if ordinal > self.latest_day:
+            self.latest_day = ordinal
+            self._evict_idle()
+        state = self.users.get(username)
+        if state is None:
+            if len(self.users) >= self.max_users:
+                self._evict_oldest()
+            state = self.users[username] = UserState(ordinal)
+        elif ordinal > state.day:
+            self._roll(state, ordinal)
+        elif ordinal < state.day:
+            return None  # late event for a day already closed
+
+        state.today += 1
+        if state.ewma <= 0 or state.alerted_day == ordinal:
+            return None
+        ratio = state.today / state.ewma
+        if ratio >= self.threshold:
+            state.alerted_day = ordinal
+            self.alerts += 1
+            return ratio
+        return None
+
+
+def follow_file(
+    path: str, poll_interval: float = 0.2, from_start: bool = False
+) -> Iterator[str]:
+    """Yield complete lines appended to path, forever (like `tail -F`).
+
+    Rotation is detected by a change of inode at path, truncation by the
+    file shrinking below the read position.
+    """
+    f = open(path, "rb")
+    if not from_start:
+        f.seek(0, os.SEEK_END)
+    partial = b""
+    try:
+        while True:
+            chunk = f.readline()
+            if chunk:
+                partial += chunk
+                if partial.endswith(b"\n"):
+                    yield partial.decode("utf-8", "replace")
+                    partial = b""
+                continue
+
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                # Between rotate and create: keep waiting for the new file
+                time.sleep(poll_interval)
+                continue
+            if st.st_ino != os.fstat(f.fileno()).st_ino:
+                # Rotated: the old file is fully drained, switch to the new one
+                f.close()
+                f = open(path, "rb")
+                partial = b""
+                continue
+            if st.st_size < f.tell():
+                # Truncated in place (copytruncate): start over from the top
+                f.seek(0)
+                partial = b""
+                continue
+            time.sleep(poll_interval)
+    finally:
+        f.close()
+
+
+def parse_event(line: str, input_format: str, today: datetime.date):
+    """Return (username, day) for one input line, or None if it is not an event."""
+    if input_format == "csv":
+        return parse_event_csv_line(line, (0, 1))
+    return parse_auth_line(line, today)
+
+
+def _next_midnight(today: datetime.date) -> float:
+    """Epoch time at which the local date moves past today."""
+    tomorrow = today + datetime.timedelta(days=1)
+    return datetime.datetime.combine(tomorrow, datetime.time()).timestamp()
+
+
+def run_follow(
+    lines: Iterator[str],
+    detector: FollowDetector,
+    input_format: str,
+    quiet: bool = False,
+) -> None:
+    """Process lines as they arrive and print alerts immediately (unless quiet)."""
+    today = datetime.date.today()
+    midnight = _next_midnight(today)
+    for line in lines:
+        if time.time() >= midnight:
+            # Syslog stamps have no year; they are resolved against the
+            # current date, so it must follow the wall clock past midnight
+            today = datetime.date.today()
+            midnight = _next_midnight(today)
+        event = parse_event(line, input_format, today)
+        if event is None:
+            continue
+        username, day = event
+        ratio = detector.add(username, day)
+        if ratio is not None and not quiet:
+            state = detector.users[username]
+            print(
+                f"[ALERT] Potential suspicious activity detected for {username}: "
+                f"{state.today} logins on {day} are {ratio:.2f}x the usual "
+                f"{state.ewma:.2f}/day (threshold={detector.threshold}).",
+                flush=True,
+            )
+
+
+def benchmark(events: int, users: int, threshold: float, alpha: float) -> None:
+    """Measure sustained events/sec for parse + detect on a synthetic sshd feed."""
+    rng = random.Random(42)
+    base = datetime.date.today() - datetime.timedelta(days=6)
+    lines = []
+    per_day = events // 7 or 1
+    for i in range(events):
+        day = base + datetime.timedelta(days=min(i // per_day, 6))
+        stamp = day.strftime("%b %d") + " 10:00:00"
+        user = f"user{rng.randrange(users)}"
+        lines.append(
+            f"{stamp} host sshd[4242]: Accepted password for {user} from 10.0.0.1 port 22 ssh2\n"
+        )
+
+    detector = FollowDetector(threshold, alpha)
+    start = time.perf_counter()
+    run_follow(iter(lines), detector, "auth", quiet=True)
+    elapsed = time.perf_counter() - start
+    print(
+        f"[BENCH] {events} events, {len(detector.users)} users: {elapsed:.2f}s "
+        f"({events / elapsed:,.0f} events/s), {detector.alerts} alert(s)."
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Follow a login event stream and flag anomalies in real time."
+    )
+    parser.add_argument(
+        "--follow",
+        metavar="PATH",
+        help="Log file to tail, or - for stdin",
+    )
+    parser.add_argument(
+        "--input-format",
+        choices=["auth", "csv"],
+        default="auth",
+        help="sshd auth log lines, or timestamp,username CSV lines (default: auth)",
+    )
+    parser.add_argument(
+        "--from-start",
+        action="store_true",
+        help="Process the existing file content before following",
+    )
+    parser.add_argument(
+        "--baseline-state",
+        help="login_baselines.py state file used to seed per-user baselines",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=3.0,
+        help="Ratio above which logins are considered suspicious (default: 3.0)",
+    )
+    parser.add_argument(
+        "--alpha",
+        type=float,
+        default=0.25,
+        help="EWMA weight of the most recent day (default: 0.25, about a 7-day window)",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=0.2,
+        help="Seconds between checks for new data when following (default: 0.2)",
+    )
+    parser.add_argument(
+        "--max-users",
+        type=int,
+        default=DEFAULT_MAX_USERS,
+        help=f"Most users tracked at once; the least recently active are dropped "
+        f"(default: {DEFAULT_MAX_USERS})",
+    )
+    parser.add_argument(
+        "--benchmark",
+        type=int,
+        metavar="EVENTS",
+        help="Measure events/sec on a synthetic feed instead of following",
+    )
+    parser.add_argument(
+        "--benchmark-users",
+        type=int,
+        default=100_000,
+        help="Distinct usernames in the synthetic feed (default: 100000)",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark, args.benchmark_users, args.threshold, args.alpha)
+        return
+
+    if not args.follow:
+        print("[ERROR] You must provide --follow PATH (or - for stdin) or --benchmark N.")
+        return
+
+    detector = FollowDetector(args.threshold, args.alpha, args.max_users)
+    if args.baseline_state:
+        detector.seed(LoginStore.load(args.baseline_state))
+
+    if args.follow == "-":
+        lines = iter(sys.stdin.readline, "")
+    else:
+        lines = follow_file(args.follow, args.poll_interval, args.from_start)
+    try:
+        run_follow(lines, detector, args.input_format)
+    except KeyboardInterrupt:
+        pass
+    print(
+        f"\n[SUMMARY] Processed {detector.events} event(s) for {len(detector.users)} "
+        f"user(s) ({detector.evicted} idle user(s) dropped). Alerts raised: {detector.alerts}."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""benchmark_sales.py
+
+Measures how sales aggregation scales with the number of worker processes.
+
+Writes a synthetic sales CSV (or a set of daily files with --files), then
+aggregates it by category and by region x category with 1, 2, 4, ... up to
+--max-workers processes. Each run is checked against the single-process
+result, so the output also shows that totals do not depend on the worker
+count.
+
+Usage:
+
+    python3 benchmark_sales.py --rows 2000000 --max-workers 8
+    python3 benchmark_sales.py --rows 2000000 --files 30
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import List
+
+from sales_summary import aggregate_inputs
+
+GROUPINGS = [("category",), ("region", "category")]
+REGIONS = ["North", "South", "East", "West", "Central"]
+CATEGORIES = ["Electronics", "Books", "Home", "Toys", "Garden", "Sports"]
+
+
+def write_synthetic_sales(directory: str, rows: int, files: int, seed: int = 42) -> List[str]:
+    """Write `rows` random sales rows spread over `files` daily CSVs."""
+    rng = random.Random(seed)
+    paths = []
+    per_file = rows // files
+    for i in range(files):
+        day = f"2024-{1 + i // 28 % 12:02d}-{1 + i % 28:02d}"
+        path = os.path.join(directory, f"sales-{i:04d}.csv")
+        count = per_file if i < files - 1 else rows - per_file * (files - 1)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("date,region,category,product,quantity,price\n")
+            lines = []
+            for _ in range(count):
+                lines.append(
+                    f"{day},{rng.choice(REGIONS)},{rng.choice(CATEGORIES)},"
+                    f"P{rng.randrange(500)},{rng.randint(1, 20)},{rng.randint(99, 99999) / 100}\n"
+                )
+                if len(lines) >= 100_000:
+                    f.writelines(lines)
+                    lines.clear()
+            f.writelines(lines)
+        paths.append(path)
+    return paths
+
+
+def snapshot(results):
+    """Comparable form of an aggregation result."""
+    return {
+        grouping: {
+            key: (acc.quantity, acc.revenue_cents, acc.count, acc.min_price, acc.max_price)
+            for key, acc in groups.items()
+        }
+        for grouping, groups in results.items()
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark parallel sales aggregation.")
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Synthetic rows (default: 2000000)")
+    parser.add_argument("--files", type=int, default=1, help="Split the rows over N daily files (default: 1)")
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Largest worker count to try (default: CPU count)",
+    )
+    args = parser.parse_args()
+
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= args.max_workers:
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != args.max_workers:
+        worker_counts.append(args.max_workers)
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        paths = write_synthetic_sales(directory, args.rows, args.files)
+        size_mb = sum(os.path.getsize(path) for path in paths) / (1024 * 1024)
+        print(
+            f"[INFO] Wrote {args.rows:,} rows ({size_mb:.1f} MB in {len(paths)} file(s)) "
+            f"in {time.perf_counter() - start:.1f}s; {os.cpu_count()} CPU(s) available."
+        )
+
+        baseline_time = None
+        baseline = None
+        for workers in worker_counts:
+            start = time.perf_counter()
+            results = aggregate_inputs(paths, GROUPINGS, workers)
+            elapsed = time.perf_counter() - start
+            current = snapshot(results)
+            if baseline is None:
+                baseline, baseline_time = current, elapsed
+            print(
+                f"[BENCH] workers={workers:<3} {elapsed:6.2f}s  "
+                f"{args.rows / elapsed:>12,.0f} rows/s  speedup={baseline_time / elapsed:4.2f}x  "
+                f"identical={'yes' if current == baseline else 'NO'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
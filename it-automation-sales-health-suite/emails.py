@@ -3,12 +3,46 @@
 """emails.py
 
 Helper functions to create and send emails, with or without attachments.
+
+send_email() opens a new SMTP connection per message. To send several
+messages, use SMTPMailer, which keeps one connection open and reconnects
+when the server drops it, or BackgroundMailer, which sends from a worker
+thread so callers (including asyncio code, via send_async) never wait on
+SMTP round-trips:
+
+    with SMTPMailer("localhost") as mailer:
+        for message in messages:
+            mailer.send(message)
+
+    with BackgroundMailer(SMTPMailer("localhost")) as mailer:
+        future = mailer.send(message)   # returns immediately
+
+To send the same email (e.g. a PDF report) to many recipients, build a
+FanOutMessage: the attachment is streamed from disk and base64-encoded
+once, and each recipient gets the shared serialized bytes behind their own
+headers:
+
+    with FanOutMessage(sender, subject, body, "/tmp/report.pdf") as fanout, \
+            SMTPMailer("localhost") as mailer:
+        errors = mailer.send_fanout(fanout, recipients)
 """
 
+import asyncio
+import binascii
+import email
+import email.policy
+import functools
 import os
 import mimetypes
+import queue
+import re
 import smtplib
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
 from email.message import EmailMessage
+from typing import Callable, Iterable, Iterator, List, Optional
 
 
 def generate_email(sender: str,
@@ -51,3 +85,361 @@ def send_email(message: EmailMessage, smtp_server: str = "localhost") -> None:
     """
     with smtplib.SMTP(smtp_server) as server:
         server.send_message(message)
+
+
+# 57 input bytes encode to one full 76-character base64 line
+_ENCODE_BLOCK = 57 * 1024
+_READ_BLOCK = 64 * 1024
+_PLACEHOLDER = "@@FANOUT-ATTACHMENT@@"
+_LEADING_DOT = re.compile(rb"(?m)^\.")
+
+
+class FanOutMessage:
+    """One email, serialized once and sent to many recipients.
+
+    The text part and the MIME headers are rendered once. The attachment
+    is read from disk in blocks and base64-encoded once into a buffer
+    that every recipient's copy reuses; encoded attachments larger than
+    memory_limit bytes are spooled to a temporary file instead of being
+    kept in memory. Only the To header differs between recipients.
+    """
+
+    def __init__(self,
+                 sender: str,
+                 subject: str,
+                 body: str,
+                 attachment_path: str = None,
+                 memory_limit: int = 8 * 1024 * 1024):
+        self.sender = sender
+        template = EmailMessage()
+        template["From"] = sender
+        template["Subject"] = subject
+        template.set_content(body)
+        if attachment_path:
+            mime_type, _ = mimetypes.guess_type(attachment_path)
+            if mime_type is None:
+                mime_type = "application/octet-stream"
+            maintype, subtype = mime_type.split("/", 1)
+            template.add_attachment(b"",
+                                    maintype=maintype,
+                                    subtype=subtype,
+                                    filename=os.path.basename(attachment_path))
+            # Serialize a marker where the encoded file will be streamed in
+            template.get_payload()[-1].set_payload(_PLACEHOLDER)
+
+        raw = template.as_bytes(policy=email.policy.SMTP)
+        headers, _, rest = raw.partition(b"\r\n\r\n")
+        self._headers = headers + b"\r\n"
+        # Every recipient's copy is sent as-is in DATA, so dot-stuff once
+        head, _, tail = (b"\r\n" + rest).partition(_PLACEHOLDER.encode("ascii"))
+        self._head = _LEADING_DOT.sub(b"..", head)
+        self._tail = _LEADING_DOT.sub(b"..", tail)
+
+        self._encoded: Optional[bytes] = None
+        self._spool_path: Optional[str] = None
+        if attachment_path:
+            self._encode(attachment_path, memory_limit)
+
+    def _encode(self, attachment_path: str, memory_limit: int) -> None:
+        chunks: List[bytes] = []
+        size = 0
+        spool = None
+        with open(attachment_path, "rb") as f:
+            for block in iter(functools.partial(f.read, _ENCODE_BLOCK), b""):
+                encoded = binascii.b2a_base64(block, newline=False)
+                lines = [encoded[i:i + 76] for i in range(0, len(encoded), 76)]
+                chunk = b"\r\n".join(lines) + b"\r\n"
+                size += len(chunk)
+                if spool is None and size > memory_limit:
+                    fd, self._spool_path = tempfile.mkstemp(prefix="fanout-", suffix=".b64")
+                    spool = os.fdopen(fd, "wb")
+                    spool.writelines(chunks)
+                    chunks = []
+                if spool is None:
+                    chunks.append(chunk)
+                else:
+                    spool.write(chunk)
+        if spool is None:
+            self._encoded = b"".join(chunks)
+        else:
+            spool.close()
+
+    def __enter__(self) -> "FanOutMessage":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Remove the spooled attachment, if there is one."""
+        if self._spool_path:
+            os.remove(self._spool_path)
+            self._spool_path = None
+
+    def _attachment_chunks(self) -> Iterator[bytes]:
+        if self._encoded is not None:
+            yield self._encoded
+        elif self._spool_path:
+            with open(self._spool_path, "rb") as f:
+                yield from iter(functools.partial(f.read, _READ_BLOCK), b"")
+
+    def data_chunks(self, recipient: str) -> Iterator[bytes]:
+        """The dot-stuffed DATA for one recipient, in blocks."""
+        to_header = email.policy.SMTP.fold("To", recipient).encode("ascii")
+        yield _LEADING_DOT.sub(b"..", to_header + self._headers)
+        yield self._head
+        yield from self._attachment_chunks()
+        yield self._tail
+
+    def as_bytes(self, recipient: str) -> bytes:
+        """The complete message for one recipient (held in memory)."""
+        data = b"".join(self.data_chunks(recipient))
+        return re.sub(rb"(?m)^\.\.", b".", data)
+
+    def as_message(self, recipient: str) -> EmailMessage:
+        """The message for one recipient as an EmailMessage."""
+        return email.message_from_bytes(self.as_bytes(recipient), policy=email.policy.default)
+
+
+def _send_data(smtp: smtplib.SMTP, sender: str, recipient: str,
+               chunks: Iterable[bytes]) -> None:
+    """Run one SMTP transaction, writing already dot-stuffed DATA in blocks."""
+    smtp.ehlo_or_helo_if_needed()
+    code, response = smtp.mail(sender)
+    if code != 250:
+        smtp.rset()
+        raise smtplib.SMTPSenderRefused(code, response, sender)
+    code, response = smtp.rcpt(recipient)
+    if code not in (250, 251):
+        smtp.rset()
+        raise smtplib.SMTPRecipientsRefused({recipient: (code, response)})
+    code, response = smtp.docmd("data")
+    if code != 354:
+        smtp.rset()
+        raise smtplib.SMTPDataError(code, response)
+    # Coalesce small blocks: separate tiny writes (e.g. the final ".")
+    # stall on Nagle's algorithm and delayed ACKs for ~40 ms per message
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) >= _READ_BLOCK:
+            smtp.send(bytes(buffer))
+            buffer.clear()
+    buffer += b".\r\n"
+    smtp.send(bytes(buffer))
+    code, response = smtp.getreply()
+    if code != 250:
+        smtp.rset()
+        raise smtplib.SMTPDataError(code, response)
+
+
+def is_transient(exc: Exception) -> bool:
+    """True for errors worth retrying on a fresh connection.
+
+    Dropped or refused connections, timeouts and 4xx replies are transient;
+    5xx replies and refused recipients are not.
+    """
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return False
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    return isinstance(exc, OSError)
+
+
+class SMTPMailer:
+    """Sends many messages over one SMTP connection.
+
+    The connection is opened on first use and reused; it is re-opened after
+    a transient failure (with exponential backoff between attempts), after
+    idle_timeout seconds without use, or after max_per_connection messages.
+    """
+
+    def __init__(
+        self,
+        smtp_server: str = "localhost",
+        port: int = 0,
+        timeout: float = 30.0,
+        retries: int = 2,
+        backoff: float = 0.5,
+        max_per_connection: int = 100,
+        idle_timeout: float = 30.0,
+    ):
+        self.smtp_server = smtp_server
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_per_connection = max_per_connection
+        self.idle_timeout = idle_timeout
+        self.connections = 0  # connections opened so far
+        self.sent = 0
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._count = 0  # messages sent on the current connection
+        self._last_used = 0.0
+
+    def __enter__(self) -> "SMTPMailer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _connection(self) -> smtplib.SMTP:
+        stale = (
+            self._count >= self.max_per_connection
+            or time.monotonic() - self._last_used > self.idle_timeout
+        )
+        if self._smtp is not None and stale:
+            self.close()
+        if self._smtp is None:
+            self._smtp = smtplib.SMTP(self.smtp_server, self.port, timeout=self.timeout)
+            self.connections += 1
+            self._count = 0
+        return self._smtp
+
+    def send(self, message: EmailMessage) -> None:
+        """Send one message, reconnecting and retrying on transient errors."""
+        self._deliver(lambda smtp: smtp.send_message(message))
+
+    def send_fanout(self, fanout: FanOutMessage,
+                    recipients: Iterable[str]) -> List[Optional[Exception]]:
+        """Send fanout to each recipient in its own envelope.
+
+        Returns None or the exception for each recipient, in order.
+        """
+        errors: List[Optional[Exception]] = []
+        for recipient in recipients:
+            try:
+                self.send_to(fanout, recipient)
+                errors.append(None)
+            except (smtplib.SMTPException, OSError) as exc:
+                errors.append(exc)
+        return errors
+
+    def send_to(self, fanout: FanOutMessage, recipient: str) -> None:
+        """Send fanout's shared bytes to one recipient."""
+        self._deliver(
+            lambda smtp: _send_data(smtp, fanout.sender, recipient, fanout.data_chunks(recipient))
+        )
+
+    def _deliver(self, transaction: Callable[[smtplib.SMTP], object]) -> None:
+        for attempt in range(self.retries + 1):
+            try:
+                transaction(self._connection())
+            except Exception as exc:
+                if not is_transient(exc):
+                    raise
+                self.close()
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+            self._count += 1
+            self.sent += 1
+            self._last_used = time.monotonic()
+            return
+
+    def send_many(self, messages: Iterable[EmailMessage]) -> List[Optional[Exception]]:
+        """Send messages in order; returns None or the exception for each one."""
+        errors: List[Optional[Exception]] = []
+        for message in messages:
+            try:
+                self.send(message)
+                errors.append(None)
+            except (smtplib.SMTPException, OSError) as exc:
+                errors.append(exc)
+        return errors
+
+    def close(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        finally:
+            self._smtp = None
+
+
+class BackgroundMailer:
+    """Queues messages and sends them from a worker thread via an SMTPMailer.
+
+    send() returns a concurrent.futures.Future at once; send_async() is the
+    awaitable version. The connection is closed whenever the queue has been
+    empty for the mailer's idle_timeout. Failures are printed and set on the
+    message's future.
+    """
+
+    def __init__(self, mailer: Optional[SMTPMailer] = None, max_queue: int = 10000):
+        self.mailer = mailer or SMTPMailer()
+        self._queue: queue.Queue = queue.Queue(max_queue)
+        self._thread = threading.Thread(target=self._run, name="smtp-mailer", daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> "BackgroundMailer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def send(self, message: EmailMessage) -> Future:
+        return self._submit(functools.partial(self.mailer.send, message), message["Subject"])
+
+    def send_fanout(self, fanout: FanOutMessage, recipients: Iterable[str]) -> List[Future]:
+        """Queue fanout for each recipient; returns one future per recipient."""
+        return [
+            self._submit(functools.partial(self.mailer.send_to, fanout, recipient),
+                         f"message to {recipient}")
+            for recipient in recipients
+        ]
+
+    def _submit(self, job: Callable[[], None], label: str) -> Future:
+        future: Future = Future()
+        self._queue.put((job, label, future))
+        return future
+
+    async def send_async(self, message: EmailMessage) -> None:
+        await asyncio.wrap_future(self.send(message))
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=self.mailer.idle_timeout)
+            except queue.Empty:
+                self.mailer.close()
+                continue
+            try:
+                if item is None:
+                    break
+                job, label, future = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    job()
+                except Exception as exc:
+                    print(f"[ERROR] Could not send '{label}': {exc}")
+                    future.set_exception(exc)
+                else:
+                    future.set_result(None)
+            finally:
+                self._queue.task_done()
+        self.mailer.close()
+
+    def flush(self) -> None:
+        """Block until every queued message has been handled."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Send what is queued, then stop the worker and close the connection."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+
+def send_emails(messages: Iterable[EmailMessage],
+                smtp_server: str = "localhost") -> List[Optional[Exception]]:
+    """Send several messages over a single SMTP connection.
+
+    Returns None or the exception for each message, in order.
+    """
+    with SMTPMailer(smtp_server) as mailer:
+        return mailer.send_many(messages)
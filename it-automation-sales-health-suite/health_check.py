@@ -1,4 +1,3 @@
-
 #!/usr/bin/env python3
 """health_check.py
 
@@ -7,13 +6,52 @@ Checks system health and sends alert emails on failure:
 - Available disk space less than 20%
 - Available memory less than 100MB
 - 'localhost' hostname not resolving to 127.0.0.1
+
+Run without options it checks once (e.g. from cron). With --daemon it keeps
+running and samples every --interval seconds instead:
+- CPU usage is measured over the interval between samples, so sampling
+  never blocks
+- a check only alerts after failing --window samples in a row, and
+  recovers after passing --window samples in a row
+- one alert per incident, a reminder at most every --repeat-after seconds
+  while it lasts, and at most --max-alerts-per-hour alert emails overall
+- a recovery notice is sent when a check that alerted clears
+
+With --metrics-port, the daemon keeps every measured value in a fixed-size
+ring buffer and serves them, with check durations and alert counts, in
+Prometheus text format at http://127.0.0.1:PORT/metrics (health_metrics.py).
+--scrape-check runs a few samples, scrapes the endpoint once and validates it.
+
+Checks run concurrently, each in its own thread with a --timeout; a check
+that hangs (e.g. a resolver that never answers) counts as failed instead
+of holding up the others. Every run reports how long each check took.
+Checks come from a registry (CHECK_REGISTRY) and are selected with
+--checks; new ones are added with @register_check. "partitions" checks
+the free space of every mounted partition rather than only "/".
+
+    python3 health_check.py --checks cpu,partitions,memory,localhost --timeout 3
+    python3 health_check.py --daemon --interval 15 --window 3
+    python3 health_check.py --daemon --dry-run --interval 1 --iterations 10 --verbose
+    python3 health_check.py --daemon --metrics-port 9109
+    python3 health_check.py --scrape-check
 """
 
+import argparse
+import functools
+import re
 import shutil
 import psutil
 import socket
+import sys
+import threading
+import time
+import urllib.request
+from collections import deque
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
 
 import emails
+from outbox import Outbox, OutboxWorker
+from health_metrics import CONTENT_TYPE, MetricsRegistry, MetricsServer
 
 
 def check_cpu(threshold: float = 80.0) -> bool:
@@ -41,10 +79,26 @@ def check_localhost() -> bool:
         return False
 
 
-def send_error(subject: str):
+def sample_cpu() -> float:
+    """CPU % since the previous call (non-blocking; the first call primes it)."""
+    return psutil.cpu_percent(interval=None)
+
+
+def sample_disk_free(path: str = "/") -> float:
+    du = shutil.disk_usage(path)
+    return du.free / du.total * 100
+
+
+def sample_memory_mb() -> float:
+    return psutil.virtual_memory().available / (1024 * 1024)
+
+
+def send_error(subject: str, body: Optional[str] = None, mailer=None):
+    """Email an alert, over mailer's open connection if one is given."""
     sender = "automation@example.com"
     recipient = "student@example.com"
-    body = "Please check your system and resolve the issue as soon as possible."
+    if body is None:
+        body = "Please check your system and resolve the issue as soon as possible."
 
     message = emails.generate_email(
         sender=sender,
@@ -53,18 +107,535 @@ def send_error(subject: str):
         body=body,
         attachment_path=None,
     )
-    emails.send_email(message)
+    if mailer is None:
+        emails.send_email(message)
+    else:
+        mailer.send(message)
+
+
+class HealthCheck(NamedTuple):
+    """One check: how to sample it and how to judge and describe a sample."""
+
+    name: str
+    sample: Callable[[], Any]
+    is_healthy: Callable[[Any], bool]
+    subject: str  # problem statement used in alert subjects
+    describe: Callable[[Any], str]
+
+
+class CheckResult(NamedTuple):
+    name: str
+    healthy: bool
+    value: Any  # None if the check timed out or raised
+    detail: str
+    duration: float  # seconds
+
+
+# Check name -> factory returning the checks for that name (one per
+# partition for "partitions"), built from the parsed command line.
+CHECK_REGISTRY: Dict[str, Callable[[argparse.Namespace], List[HealthCheck]]] = {}
+DEFAULT_CHECKS = "cpu,disk,memory,localhost"
+
+
+def register_check(name: str):
+    """Decorator adding a check factory to CHECK_REGISTRY under name."""
+    def decorator(factory):
+        CHECK_REGISTRY[name] = factory
+        return factory
+    return decorator
+
+
+@register_check("cpu")
+def cpu_checks(args: argparse.Namespace) -> List[HealthCheck]:
+    # A one-off run has no previous sample to measure from, so it waits 1s
+    sample = sample_cpu if args.daemon else lambda: psutil.cpu_percent(interval=1)
+    return [
+        HealthCheck(
+            "cpu",
+            sample,
+            lambda v: v < args.cpu_threshold,
+            f"CPU usage is over {args.cpu_threshold:g}%",
+            lambda v: f"CPU usage {v:.1f}%",
+        )
+    ]
+
+
+def _disk_check(name: str, path: str, subject: str, threshold: float) -> HealthCheck:
+    return HealthCheck(
+        name,
+        lambda: sample_disk_free(path),
+        lambda v: v > threshold,
+        subject,
+        lambda v: f"{v:.1f}% disk space free on {path}",
+    )
+
+
+@register_check("disk")
+def disk_checks(args: argparse.Namespace) -> List[HealthCheck]:
+    return [
+        _disk_check(
+            "disk",
+            "/",
+            f"Available disk space is less than {args.disk_threshold:g}%",
+            args.disk_threshold,
+        )
+    ]
+
+
+@register_check("partitions")
+def partition_checks(args: argparse.Namespace) -> List[HealthCheck]:
+    """One free-space check per mounted (physical) partition."""
+    mountpoints = sorted({part.mountpoint for part in psutil.disk_partitions(all=False)})
+    return [
+        _disk_check(
+            f"disk:{mountpoint}",
+            mountpoint,
+            f"Available disk space on {mountpoint} is less than {args.disk_threshold:g}%",
+            args.disk_threshold,
+        )
+        for mountpoint in mountpoints
+    ]
+
+
+@register_check("memory")
+def memory_checks(args: argparse.Namespace) -> List[HealthCheck]:
+    return [
+        HealthCheck(
+            "memory",
+            sample_memory_mb,
+            lambda v: v > args.memory_threshold,
+            f"Available memory is less than {args.memory_threshold:g}MB",
+            lambda v: f"{v:.0f} MB memory available",
+        )
+    ]
+
+
+@register_check("localhost")
+def localhost_checks(args: argparse.Namespace) -> List[HealthCheck]:
+    return [
+        HealthCheck(
+            "localhost",
+            check_localhost,
+            bool,
+            "localhost cannot be resolved to 127.0.0.1",
+            lambda v: "localhost resolves to 127.0.0.1" if v else "localhost does not resolve to 127.0.0.1",
+        )
+    ]
+
+
+def build_checks(names: str, args: argparse.Namespace) -> List[HealthCheck]:
+    """Instantiate the comma-separated registry entries in names."""
+    checks = []
+    for name in (part.strip() for part in names.split(",")):
+        if name not in CHECK_REGISTRY:
+            raise ValueError(
+                f"Unknown check {name!r}; choose from: {', '.join(sorted(CHECK_REGISTRY))}"
+            )
+        checks.extend(CHECK_REGISTRY[name](args))
+    return checks
+
+
+class _CheckThread(threading.Thread):
+    """Runs one sample() call. Daemon thread, so a hung call never blocks exit."""
+
+    def __init__(self, check: HealthCheck):
+        super().__init__(name=f"health-check-{check.name}", daemon=True)
+        self.check = check
+        self.started = time.perf_counter()
+        self.value = None
+        self.error: Optional[BaseException] = None
+        self.duration = 0.0
+
+    def run(self) -> None:
+        try:
+            self.value = self.check.sample()
+        except Exception as exc:
+            self.error = exc
+        self.duration = time.perf_counter() - self.started
+
+
+class CheckRunner:
+    """Runs checks concurrently, each with the same timeout.
+
+    A check still hanging from an earlier run is not started again; its
+    old call keeps counting (and failing) until it returns.
+    """
+
+    def __init__(self, checks: List[HealthCheck], timeout: float = 5.0):
+        self.checks = checks
+        self.timeout = timeout
+        self._running: Dict[str, _CheckThread] = {}
+
+    def run(self) -> List[CheckResult]:
+        threads = []
+        for check in self.checks:
+            thread = self._running.get(check.name)
+            if thread is None or not thread.is_alive():
+                thread = self._running[check.name] = _CheckThread(check)
+                thread.start()
+            threads.append(thread)
+
+        deadline = time.perf_counter() + self.timeout
+        results = []
+        for thread in threads:
+            check = thread.check
+            thread.join(max(0.0, deadline - time.perf_counter()))
+            if thread.is_alive():
+                waited = time.perf_counter() - thread.started
+                results.append(
+                    CheckResult(check.name, False, None, f"timed out after {waited:.1f}s", waited)
+                )
+            elif thread.error is not None:
+                results.append(
+                    CheckResult(check.name, False, None, f"check failed: {thread.error}", thread.duration)
+                )
+            else:
+                healthy = bool(check.is_healthy(thread.value))
+                results.append(
+                    CheckResult(check.name, healthy, thread.value, check.describe(thread.value), thread.duration)
+                )
+        return results
+
+
+def print_results(results: List[CheckResult]) -> None:
+    """One line per check: status, name, detail and duration."""
+    width = max((len(result.name) for result in results), default=0)
+    for result in results:
+        status = "[OK]   " if result.healthy else "[ERROR]"
+        print(f"{status} {result.name:<{width}}  {result.duration * 1000:7.1f} ms  {result.detail}")
+
+
+class WindowedCheck:
+    """A check whose state changes only after `window` results agree.
+
+    For example, CPU > 80% for `window` consecutive samples makes the
+    check fail, and `window` good samples in a row make it recover.
+    """
+
+    def __init__(self, check: HealthCheck, window: int = 3):
+        self.check = check
+        self.window = window
+        self.failing = False
+        self.streak = 0  # consecutive results disagreeing with the current state
+        self.last_result: Optional[CheckResult] = None
+
+    @property
+    def name(self) -> str:
+        return self.check.name
+
+    @property
+    def subject(self) -> str:
+        return self.check.subject
+
+    def update(self, result: CheckResult) -> Optional[str]:
+        """Record a result; return "failed" or "recovered" on a state change."""
+        self.last_result = result
+        if result.healthy == (not self.failing):
+            self.streak = 0
+            return None
+        self.streak += 1
+        if self.streak < self.window:
+            return None
+        self.failing = not self.failing
+        self.streak = 0
+        return "failed" if self.failing else "recovered"
+
+
+class AlertLimiter:
+    """Deduplicates alerts per check and caps the overall alert rate."""
+
+    def __init__(self, repeat_after: float = 3600.0, max_per_hour: int = 20):
+        self.repeat_after = repeat_after
+        self.max_per_hour = max_per_hour
+        self.last_sent: Dict[str, float] = {}  # check name -> time of last alert
+        self.sent_times: deque = deque()
+        self.suppressed = 0
+        self.throttled = set()  # checks whose alert is currently held back
+
+    def due(self, name: str, now: float) -> bool:
+        """True if a failing check should (re)send its alert now."""
+        last = self.last_sent.get(name)
+        return last is None or now - last >= self.repeat_after
+
+    def acquire(self, name: str, now: float) -> bool:
+        """Take one slot of the hourly budget for an alert about name."""
+        while self.sent_times and now - self.sent_times[0] >= 3600:
+            self.sent_times.popleft()
+        if len(self.sent_times) >= self.max_per_hour:
+            self.suppressed += 1
+            self.throttled.add(name)
+            return False
+        self.throttled.discard(name)
+        self.sent_times.append(now)
+        self.last_sent[name] = now
+        return True
+
+    def resolve(self, name: str) -> bool:
+        """Forget a recovered check; True if an alert had been sent for it."""
+        self.throttled.discard(name)
+        return self.last_sent.pop(name, None) is not None
+
+
+class HealthMonitor:
+    """Runs WindowedChecks periodically and sends deduplicated alerts."""
+
+    def __init__(
+        self,
+        checks: List[WindowedCheck],
+        limiter: AlertLimiter,
+        notify: Callable[[str, str], None] = send_error,
+        timeout: float = 5.0,
+        verbose: bool = False,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.checks = checks
+        self.limiter = limiter
+        self.notify = notify
+        self.runner = CheckRunner([check.check for check in checks], timeout)
+        self.verbose = verbose
+        self.metrics = metrics
+
+    def _send(self, subject: str, body: str) -> None:
+        try:
+            self.notify(subject, body)
+        except (OSError, ValueError) as exc:
+            print(f"[ERROR] Could not send '{subject}': {exc}")
+
+    def tick(self, now: Optional[float] = None) -> List[CheckResult]:
+        """Run every check once and send whatever notices are due."""
+        results = self.runner.run()
+        now = time.monotonic() if now is None else now
+        if self.verbose:
+            print_results(results)
+        for check, result in zip(self.checks, results):
+            change = check.update(result)
+            detail = result.detail
+            if self.metrics is not None:
+                value = result.value if isinstance(result.value, (int, float)) else None
+                self.metrics.record(result.name, value, result.healthy, result.duration)
+
+            if change == "recovered":
+                print(f"[OK] {check.name} recovered: {detail}")
+                if self.limiter.resolve(check.name):
+                    if self.metrics is not None:
+                        self.metrics.record_recovery(check.name)
+                    self._send(
+                        f"Recovered - {check.subject}",
+                        f"The problem has cleared: {detail}.",
+                    )
+            elif check.failing and self.limiter.due(check.name, now):
+                reminder = change is None
+                already_throttled = check.name in self.limiter.throttled
+                if not self.limiter.acquire(check.name, now):
+                    if not already_throttled:
+                        print(f"[WARN] Alert rate limit reached; holding back '{check.subject}'.")
+                    continue
+                print(f"[ALERT] {check.name}: {detail}")
+                if self.metrics is not None:
+                    self.metrics.record_alert(check.name)
+                self._send(
+                    f"Error - {check.subject}",
+                    f"{'Still failing' if reminder else 'Failing'} for at least "
+                    f"{check.window} consecutive samples: {detail}.\n\n"
+                    "Please check your system and resolve the issue as soon as possible.",
+                )
+        return results
+
+    def run(self, interval: float, iterations: Optional[int] = None) -> None:
+        """Call tick() every `interval` seconds, on a fixed schedule."""
+        next_tick = time.monotonic()
+        done = 0
+        while iterations is None or done < iterations:
+            self.tick()
+            done += 1
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.monotonic()  # fell behind: don't burst to catch up
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Check system health and email alerts.")
+    parser.add_argument(
+        "--checks",
+        default=DEFAULT_CHECKS,
+        help=f"Comma-separated checks from: {', '.join(sorted(CHECK_REGISTRY))} (default: {DEFAULT_CHECKS})",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=5.0,
+        help="Seconds each check may take before it counts as failed (default: 5)",
+    )
+    parser.add_argument("--daemon", action="store_true", help="Keep running and sample periodically")
+    parser.add_argument("--interval", type=float, default=15.0, help="Seconds between samples (default: 15)")
+    parser.add_argument(
+        "--window",
+        type=int,
+        default=3,
+        help="Consecutive failing samples before alerting, and passing ones before recovery (default: 3)",
+    )
+    parser.add_argument(
+        "--repeat-after",
+        type=float,
+        default=3600.0,
+        help="Seconds before re-alerting about a check that is still failing (default: 3600)",
+    )
+    parser.add_argument(
+        "--max-alerts-per-hour",
+        type=int,
+        default=20,
+        help="Cap on alert emails per hour across all checks (default: 20)",
+    )
+    parser.add_argument("--cpu-threshold", type=float, default=80.0, help="Max CPU %% (default: 80)")
+    parser.add_argument("--disk-threshold", type=float, default=20.0, help="Min free disk %% (default: 20)")
+    parser.add_argument("--memory-threshold", type=float, default=100.0, help="Min available MB (default: 100)")
+    parser.add_argument("--iterations", type=int, help="Stop the daemon after N samples")
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="In daemon mode, serve Prometheus metrics on this port",
+    )
+    parser.add_argument(
+        "--metrics-address",
+        default="127.0.0.1",
+        help="Address for the metrics endpoint (default: 127.0.0.1)",
+    )
+    parser.add_argument(
+        "--history",
+        type=int,
+        default=240,
+        help="Samples kept per check in the metrics ring buffer (default: 240)",
+    )
+    parser.add_argument(
+        "--scrape-check",
+        action="store_true",
+        help="Take a few samples, scrape the metrics endpoint once and validate it",
+    )
+    parser.add_argument("--verbose", action="store_true", help="In daemon mode, print every check result")
+    parser.add_argument("--smtp-server", default="localhost", help="SMTP relay (default: localhost)")
+    parser.add_argument(
+        "--outbox",
+        metavar="DIR",
+        help="Queue alerts durably in this outbox directory instead of sending them directly",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Print emails instead of sending them")
+    return parser.parse_args()
+
+
+def print_notice(subject: str, body: Optional[str] = None) -> None:
+    print(f"[EMAIL] {subject}")
+    if body:
+        print(f"        {body.splitlines()[0]}")
+
+
+SAMPLE_LINE_RE = re.compile(r'^[a-z_]+\{check="(?:[^"\\]|\\.)*"\} (?:NaN|[+-]Inf|-?[0-9.e+-]+)$')
+
+
+def scrape_check(checks: List[HealthCheck], args: argparse.Namespace, ticks: int = 2) -> bool:
+    """Sample a few times, serve the metrics on a free port and scrape them once."""
+    metrics = MetricsRegistry(args.history)
+    monitor = HealthMonitor(
+        [WindowedCheck(check, args.window) for check in checks],
+        AlertLimiter(args.repeat_after, args.max_alerts_per_hour),
+        print_notice,
+        args.timeout,
+        metrics=metrics,
+    )
+    for _ in range(ticks):
+        monitor.tick()
+
+    server = MetricsServer(metrics, args.metrics_address, 0).start()
+    try:
+        with urllib.request.urlopen(server.url, timeout=5) as response:
+            content_type = response.headers.get("Content-Type")
+            text = response.read().decode("utf-8")
+    finally:
+        server.close()
+    print(text, end="")
+
+    problems = []
+    if content_type != CONTENT_TYPE:
+        problems.append(f"unexpected Content-Type {content_type!r}")
+    samples = [line for line in text.splitlines() if line and not line.startswith("#")]
+    problems.extend(f"malformed line: {line}" for line in samples if not SAMPLE_LINE_RE.match(line))
+    for check in checks:
+        expected = f'health_check_samples_total{{check="{check.name}"}} {ticks}'
+        if expected not in samples:
+            problems.append(f"missing {expected}")
+
+    for problem in problems:
+        print(f"[ERROR] {problem}")
+    if not problems:
+        print(f"[OK] Scraped {len(samples)} samples from {server.url}.")
+    return not problems
 
 
 def main():
-    if not check_cpu():
-        send_error("Error - CPU usage is over 80%")
-    if not check_disk():
-        send_error("Error - Available disk space is less than 20%")
-    if not check_memory():
-        send_error("Error - Available memory is less than 100MB")
-    if not check_localhost():
-        send_error("Error - localhost cannot be resolved to 127.0.0.1")
+    args = parse_args()
+    try:
+        checks = build_checks(args.checks, args)
+    except ValueError as exc:
+        print(f"[ERROR] {exc}")
+        return
+    if args.scrape_check:
+        sys.exit(0 if scrape_check(checks, args) else 1)
+
+    if args.daemon:
+        # Alerts are queued and sent by a worker over one reused connection,
+        # so a slow relay never delays the sampling loop; with --outbox the
+        # queue is on disk and survives relay outages and restarts
+        if args.outbox:
+            mailer = Outbox(args.outbox)
+            worker = OutboxWorker(
+                mailer, emails.SMTPMailer(args.smtp_server, retries=1, backoff=0.0)
+            ).start()
+        else:
+            worker = mailer = emails.BackgroundMailer(emails.SMTPMailer(args.smtp_server))
+        notify = print_notice if args.dry_run else functools.partial(send_error, mailer=mailer)
+        metrics = None
+        if args.metrics_port is not None:
+            metrics = MetricsRegistry(args.history)
+            server = MetricsServer(metrics, args.metrics_address, args.metrics_port).start()
+            print(f"[INFO] Serving metrics at {server.url}")
+        monitor = HealthMonitor(
+            [WindowedCheck(check, args.window) for check in checks],
+            AlertLimiter(args.repeat_after, args.max_alerts_per_hour),
+            notify,
+            args.timeout,
+            args.verbose,
+            metrics,
+        )
+        sample_cpu()  # prime the CPU counter so the first sample covers one interval
+        time.sleep(min(args.interval, 1.0))
+        try:
+            monitor.run(args.interval, args.iterations)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.close()
+        return
+
+    results = CheckRunner(checks, args.timeout).run()
+    print_results(results)
+    # Several failing checks share one SMTP connection, or go to the outbox
+    with Outbox(args.outbox) if args.outbox else emails.SMTPMailer(args.smtp_server) as mailer:
+        notify = print_notice if args.dry_run else functools.partial(send_error, mailer=mailer)
+        for check, result in zip(checks, results):
+            if result.healthy:
+                continue
+            try:
+                notify(
+                    f"Error - {check.subject}",
+                    f"{result.detail}.\n\n"
+                    "Please check your system and resolve the issue as soon as possible.",
+                )
+            except OSError as exc:
+                print(f"[ERROR] Could not send alert for {check.name}: {exc}")
+    if args.outbox and not args.dry_run and not all(result.healthy for result in results):
+        print(f"[INFO] Alerts queued in {args.outbox}; outbox.py --flush (or --daemon) sends them.")
 
 
 if __name__ == "__main__":
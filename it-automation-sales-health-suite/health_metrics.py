@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""health_metrics.py
+
+Keeps the raw values measured by health_check.py and serves them in the
+Prometheus text exposition format, so a monitoring stack can scrape the
+numbers instead of parsing alert emails.
+
+- every check's samples go into a fixed-size ring buffer backed by
+  array.array('d'), so memory stays constant however long the daemon runs
+- per check: latest value, healthy flag, duration, min/avg/max over the
+  buffer, and counters for samples, failures, alerts and recoveries
+- MetricsServer serves GET /metrics from a background thread
+
+    python3 health_check.py --daemon --metrics-port 9109
+    curl -s http://127.0.0.1:9109/metrics
+"""
+
+import array
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class RingBuffer:
+    """Fixed-capacity (timestamp, value) series; the oldest entry is overwritten."""
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._times = array.array("d", bytes(8 * capacity))
+        self._values = array.array("d", bytes(8 * capacity))
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, value: float) -> None:
+        self._times[self._next] = timestamp
+        self._values[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def __iter__(self) -> Iterator[Tuple[float, float]]:
+        """Entries from oldest to newest."""
+        for j in self._indices():
+            yield self._times[j], self._values[j]
+
+    def latest(self) -> Optional[Tuple[float, float]]:
+        if not self._size:
+            return None
+        j = (self._next - 1) % self.capacity
+        return self._times[j], self._values[j]
+
+    def summary(self) -> Optional[Tuple[float, float, float]]:
+        """(min, avg, max) of the values, ignoring NaN; None if there are none."""
+        values = [v for v in (self._values[j] for j in self._indices()) if not math.isnan(v)]
+        if not values:
+            return None
+        return min(values), sum(values) / len(values), max(values)
+
+    def _indices(self) -> Iterator[int]:
+        start = (self._next - self._size) % self.capacity
+        return ((start + i) % self.capacity for i in range(self._size))
+
+
+class _CheckSeries:
+    __slots__ = ("values", "durations", "healthy", "samples", "failures", "alerts", "recoveries")
+
+    def __init__(self, capacity: int):
+        self.values = RingBuffer(capacity)
+        self.durations = RingBuffer(capacity)
+        self.healthy = True
+        self.samples = 0
+        self.failures = 0
+        self.alerts = 0
+        self.recoveries = 0
+
+
+def _escape(label: str) -> str:
+    return label.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """Thread-safe store of per-check series and counters."""
+
+    def __init__(self, capacity: int = 240):
+        self.capacity = capacity
+        self._series: Dict[str, _CheckSeries] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name: str) -> _CheckSeries:
+        series = self._series.get(name)
+        if series is None:
+            series = self._series[name] = _CheckSeries(self.capacity)
+        return series
+
+    def record(
+        self,
+        name: str,
+        value: Optional[float],
+        healthy: bool,
+        duration: float,
+        timestamp: Optional[float] = None,
+    ) -> None:
+        """Add one check result; value is None when the check timed out or raised."""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            series = self._get(name)
+            series.values.append(timestamp, math.nan if value is None else float(value))
+            series.durations.append(timestamp, duration)
+            series.healthy = healthy
+            series.samples += 1
+            if not healthy:
+                series.failures += 1
+
+    def record_alert(self, name: str) -> None:
+        with self._lock:
+            self._get(name).alerts += 1
+
+    def record_recovery(self, name: str) -> None:
+        with self._lock:
+            self._get(name).recoveries += 1
+
+    def history(self, name: str) -> List[Tuple[float, float]]:
+        """(timestamp, value) samples kept for a check, oldest first."""
+        with self._lock:
+            series = self._series.get(name)
+            return list(series.values) if series else []
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            rows = []
+            for name in sorted(self._series):
+                series = self._series[name]
+                latest = series.values.latest()
+                duration = series.durations.latest()
+                rows.append(
+                    (
+                        _escape(name),
+                        latest[1] if latest else math.nan,
+                        series.values.summary(),
+                        duration[1] if duration else math.nan,
+                        series,
+                    )
+                )
+            counters = [
+                (label, series.samples, series.failures, series.alerts, series.recoveries)
+                for label, _, _, _, series in rows
+            ]
+            healthy = [(label, series.healthy) for label, _, _, _, series in rows]
+
+        lines: List[str] = []
+
+        def family(metric: str, kind: str, help_text: str, samples) -> None:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for label, value in samples:
+                lines.append(f'{metric}{{check="{label}"}} {_number(value)}')
+
+        family(
+            "health_check_value",
+            "gauge",
+            "Latest value measured by the check (NaN if it timed out or failed).",
+            [(label, value) for label, value, _, _, _ in rows],
+        )
+        for index, stat in enumerate(("min", "avg", "max")):
+            family(
+                f"health_check_value_{stat}",
+                "gauge",
+                f"{stat.capitalize()} of the values kept in the ring buffer.",
+                [(label, summary[index]) for label, _, summary, _, _ in rows if summary],
+            )
+        family(
+            "health_check_healthy",
+            "gauge",
+            "1 if the latest result of the check was healthy, else 0.",
+            [(label, 1 if ok else 0) for label, ok in healthy],
+        )
+        family(
+            "health_check_duration_seconds",
+            "gauge",
+            "Wall time of the latest run of the check.",
+            [(label, duration) for label, _, _, duration, _ in rows],
+        )
+        for index, (metric, help_text) in enumerate(
+            (
+                ("health_check_samples_total", "Check runs recorded."),
+                ("health_check_failures_total", "Check runs that were unhealthy, timed out or raised."),
+                ("health_check_alerts_total", "Alert emails sent for the check."),
+                ("health_check_recoveries_total", "Recovery notices sent for the check."),
+            ),
+            start=1,
+        ):
+            family(metric, "counter", help_text, [(row[0], row[index]) for row in counters])
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry  # set on the per-server subclass
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404, "Only /metrics is served")
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes every few seconds would flood the daemon's output
+
+
+class MetricsServer:
+    """Serves a MetricsRegistry on http://address:port/metrics in a daemon thread."""
+
+    def __init__(self, registry: MetricsRegistry, address: str = "127.0.0.1", port: int = 9109):
+        handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+        self.httpd = ThreadingHTTPServer((address, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, name="health-metrics", daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self) -> "MetricsServer":
+        self.thread.start()
+        return self
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
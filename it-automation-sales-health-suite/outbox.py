@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""outbox.py
+
+Durable on-disk outbox for the emails sent by report_email.py and
+health_check.py, so a relay outage delays mail instead of losing it and
+callers never wait on SMTP.
+
+Layout (Maildir-like):
+
+    outbox/tmp/     messages being written (never sent)
+    outbox/new/     queued messages, one .eml file each
+    outbox/failed/  messages the relay rejected permanently, or that ran
+                    out of attempts
+    outbox/.lock    held by whichever worker is draining
+
+- put() writes the message to tmp/, fsyncs it and renames it into new/,
+  so a crash never leaves a half-written message in the queue
+- a queued file's name starts with its next-attempt time and attempt
+  count (<due-ms>-<attempts>-<id>.eml); rescheduling is a rename
+- a worker drains due messages in name order over one pooled SMTP
+  connection and deletes each file only after the relay accepted it;
+  a crash between the two re-sends that message (at-least-once delivery)
+- transient failures back off exponentially per message; when the relay
+  cannot be reached at all the pass stops, leaving the rest queued
+- only one worker drains at a time (flock), so the drain can run in the
+  health_check daemon, from cron (--flush) or as its own daemon
+
+Usage examples:
+
+    python3 outbox.py --status
+    python3 outbox.py --flush --smtp-server localhost
+    python3 outbox.py --daemon --interval 10
+"""
+
+import argparse
+import email
+import email.policy
+import fcntl
+import itertools
+import os
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import emails
+
+DEFAULT_DIRECTORY = "outbox"
+STALE_TMP_SECONDS = 3600
+
+_ids = itertools.count()
+_FAILED = object()  # OutboxWorker: a drain pass raised
+
+
+class FlushResult(NamedTuple):
+    sent: int
+    deferred: int
+    failed: int
+
+
+def _fsync_directory(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _relay_unreachable(exc: Exception) -> bool:
+    """True if exc means the relay cannot be reached, not that it refused one message.
+
+    smtplib's exceptions are OSErrors too, so only the connection-level ones
+    (and non-SMTP OSErrors such as a refused connect or a timeout) count.
+    """
+    if isinstance(exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    return isinstance(exc, OSError) and not isinstance(exc, smtplib.SMTPException)
+
+
+def _parse_name(name: str) -> Tuple[int, int, str]:
+    """(due time in ms, attempts, id) from a queued file name."""
+    due, attempts, ident = name[: -len(".eml")].split("-", 2)
+    return int(due), int(attempts), ident
+
+
+class Outbox:
+    """A spool directory of queued emails (see the module docstring)."""
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_DIRECTORY,
+        max_attempts: int = 10,
+        base_backoff: float = 5.0,
+        max_backoff: float = 3600.0,
+    ):
+        self.directory = directory
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.tmp_dir = os.path.join(directory, "tmp")
+        self.new_dir = os.path.join(directory, "new")
+        self.failed_dir = os.path.join(directory, "failed")
+        for path in (self.tmp_dir, self.new_dir, self.failed_dir):
+            os.makedirs(path, exist_ok=True)
+        self._wakeup = threading.Event()
+
+    # -- queueing -----------------------------------------------------------
+
+    def _write_tmp(self, message: EmailMessage) -> str:
+        """Write message to tmp/ and fsync it; returns its id."""
+        ident = f"{time.time_ns()}.{os.getpid()}.{next(_ids)}"
+        with open(os.path.join(self.tmp_dir, f"{ident}.eml"), "wb") as f:
+            f.write(message.as_bytes(policy=email.policy.SMTP))
+            f.flush()
+            os.fsync(f.fileno())
+        return ident
+
+    def _commit(self, idents: List[str]) -> List[str]:
+        """Move written messages from tmp/ into the queue, due now."""
+        due_ms = time.time_ns() // 1_000_000
+        paths = []
+        for ident in idents:
+            path = os.path.join(self.new_dir, f"{due_ms:013d}-00-{ident}.eml")
+            os.replace(os.path.join(self.tmp_dir, f"{ident}.eml"), path)
+            paths.append(path)
+        _fsync_directory(self.new_dir)
+        self._wakeup.set()
+        return paths
+
+    def put(self, message: EmailMessage) -> str:
+        """Queue one message durably; returns the path of the queued file."""
+        return self._commit([self._write_tmp(message)])[0]
+
+    def put_many(self, messages: Iterable[EmailMessage]) -> int:
+        """Queue a burst of messages durably.
+
+        Every file is written and fsynced first, then all of them are
+        renamed into new/ with a single directory fsync.
+        """
+        idents = [self._write_tmp(message) for message in messages]
+        if idents:
+            self._commit(idents)
+        return len(idents)
+
+    # send(), send_fanout(), close() and "with" let an Outbox stand in for
+    # an SMTPMailer
+    send = put
+
+    def send_fanout(self, fanout: emails.FanOutMessage, recipients: Iterable[str]) -> List[None]:
+        """Queue one copy of fanout per recipient; queueing does not fail per message."""
+        recipients = list(recipients)
+        self.put_many(fanout.as_message(recipient) for recipient in recipients)
+        return [None] * len(recipients)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "Outbox":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+    # -- inspection ---------------------------------------------------------
+
+    def queued(self) -> List[str]:
+        """Queued file names, in the order they will be tried."""
+        return sorted(name for name in os.listdir(self.new_dir) if name.endswith(".eml"))
+
+    def status(self) -> Dict[str, int]:
+        now_ms = time.time_ns() // 1_000_000
+        names = self.queued()
+        return {
+            "queued": len(names),
+            "due": sum(1 for name in names if _parse_name(name)[0] <= now_ms),
+            "failed": len(os.listdir(self.failed_dir)),
+        }
+
+    def next_due(self) -> Optional[float]:
+        """Seconds until the earliest queued message is due (None if empty)."""
+        names = self.queued()
+        if not names:
+            return None
+        return max(0.0, _parse_name(names[0])[0] / 1000 - time.time())
+
+    def remove_stale_tmp(self, max_age: float = STALE_TMP_SECONDS) -> int:
+        """Delete tmp/ files left behind by writers that crashed mid-write."""
+        removed = 0
+        cutoff = time.time() - max_age
+        for name in os.listdir(self.tmp_dir):
+            path = os.path.join(self.tmp_dir, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    # -- draining -----------------------------------------------------------
+
+    def _backoff(self, attempts: int) -> float:
+        return min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+
+    def _fail(self, name: str, exc: Exception) -> str:
+        """Move a queued message to failed/ for good."""
+        _, attempts, ident = _parse_name(name)
+        os.replace(os.path.join(self.new_dir, name), os.path.join(self.failed_dir, f"{ident}.eml"))
+        print(f"[ERROR] Outbox: giving up on {ident} after {attempts + 1} attempt(s): {exc}")
+        return "failed"
+
+    def _reschedule(self, name: str, exc: Exception) -> str:
+        """Defer a message after a transient error, or fail it for good."""
+        _, attempts, ident = _parse_name(name)
+        attempts += 1
+        if not emails.is_transient(exc) or attempts >= self.max_attempts:
+            return self._fail(name, exc)
+        due_ms = int((time.time() + self._backoff(attempts)) * 1000)
+        os.replace(os.path.join(self.new_dir, name), os.path.join(self.new_dir, f"{due_ms:013d}-{attempts:02d}-{ident}.eml"))
+        return "deferred"
+
+    def flush(self, mailer: emails.SMTPMailer, limit: Optional[int] = None) -> Optional[FlushResult]:
+        """Send the due messages once; None if another worker is draining."""
+        lock = open(os.path.join(self.directory, ".lock"), "a")
+        try:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+            return self._flush_locked(mailer, limit)
+        finally:
+            lock.close()  # also releases the lock
+
+    def _flush_locked(self, mailer: emails.SMTPMailer, limit: Optional[int]) -> FlushResult:
+        counts = {"sent": 0, "deferred": 0, "failed": 0}
+        now_ms = time.time_ns() // 1_000_000
+        for name in self.queued()[:limit]:
+            if _parse_name(name)[0] > now_ms:
+                break  # names sort by due time, so nothing later is due either
+            path = os.path.join(self.new_dir, name)
+            try:
+                with open(path, "rb") as f:
+                    message = email.message_from_binary_file(f, policy=email.policy.default)
+            except FileNotFoundError:
+                continue
+            except Exception as exc:
+                counts[self._fail(name, exc)] += 1  # unreadable spool file
+                continue
+            try:
+                mailer.send(message)
+            except (smtplib.SMTPException, OSError) as exc:
+                counts[self._reschedule(name, exc)] += 1
+                if _relay_unreachable(exc):
+                    break  # leave the rest queued for the next pass
+                continue
+            except Exception as exc:
+                # e.g. ValueError from send_message for a message without
+                # recipients: retrying the same file cannot help
+                counts[self._fail(name, exc)] += 1
+                continue
+            os.remove(path)
+            counts["sent"] += 1
+        return FlushResult(**counts)
+
+
+class OutboxWorker:
+    """Drains an Outbox from a background thread.
+
+    The worker wakes up when a message is put() in this process, when the
+    next deferred message is due, or every `interval` seconds (to pick up
+    messages queued by other processes).
+    """
+
+    def __init__(self, outbox: Outbox, mailer: Optional[emails.SMTPMailer] = None, interval: float = 10.0):
+        self.outbox = outbox
+        # One quick reconnect for dropped pooled connections; the outbox
+        # itself handles backoff between attempts
+        self.mailer = mailer or emails.SMTPMailer(retries=1, backoff=0.0)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="outbox-worker", daemon=True)
+
+    def start(self) -> "OutboxWorker":
+        self.outbox.remove_stale_tmp()
+        self._thread.start()
+        return self
+
+    def drain_once(self) -> Optional[FlushResult]:
+        result = self.outbox.flush(self.mailer)
+        if result and (result.sent or result.deferred or result.failed):
+            print(
+                f"[INFO] Outbox: sent {result.sent}, deferred {result.deferred}, "
+                f"failed {result.failed}, {len(self.outbox.queued())} queued."
+            )
+        return result
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.outbox._wakeup.clear()
+            result = self._drain_guarded()
+            if result is _FAILED:
+                self._stop.wait(self.interval)
+                continue
+            wait = self.outbox.next_due()
+            if wait is None or (result and result.deferred and not result.sent):
+                wait = self.interval  # empty, or the relay is down: do not spin
+            self.outbox._wakeup.wait(min(max(wait, 0.05), self.interval))
+        self._drain_guarded()
+        self.mailer.close()
+
+    def _drain_guarded(self) -> object:
+        """drain_once() that logs unexpected errors instead of killing the thread.
+
+        Returns _FAILED after an error, so alerts queued later still go out
+        once whatever broke this pass is fixed.
+        """
+        try:
+            return self.drain_once()
+        except Exception as exc:
+            print(f"[ERROR] Outbox worker: drain pass failed: {exc!r}")
+            return _FAILED
+
+    def close(self) -> None:
+        """Stop the worker after one last drain pass."""
+        self._stop.set()
+        self.outbox._wakeup.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Inspect or drain the durable email outbox.")
+    parser.add_argument(
+        "--directory",
+        default=DEFAULT_DIRECTORY,
+        help=f"Outbox directory (default: {DEFAULT_DIRECTORY})",
+    )
+    parser.add_argument("--smtp-server", default="localhost", help="SMTP relay (default: localhost)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--status", action="store_true", help="Print queue counts (default)")
+    mode.add_argument("--flush", action="store_true", help="Send the due messages once (for cron)")
+    mode.add_argument("--daemon", action="store_true", help="Keep draining the outbox")
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=10.0,
+        help="In daemon mode, seconds between scans for new messages (default: 10)",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    outbox = Outbox(args.directory)
+    if args.daemon or args.flush:
+        mailer = emails.SMTPMailer(args.smtp_server, retries=1, backoff=0.0)
+        worker = OutboxWorker(outbox, mailer, args.interval)
+    if args.daemon:
+        print(f"[INFO] Draining {args.directory} via {args.smtp_server} (Ctrl+C to stop).")
+        worker.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.close()
+    elif args.flush:
+        outbox.remove_stale_tmp()
+        if worker.drain_once() is None:
+            print("[INFO] Another worker is draining the outbox.")
+        worker.mailer.close()
+
+    counts = outbox.status()
+    print(f"[SUMMARY] {counts['queued']} queued ({counts['due']} due), {counts['failed']} failed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,44 +3,299 @@
 """report_email.py
 
 Summarizes sales data, generates a PDF report, and emails it.
+
+By default only the rows appended to sales.csv since the last run are
+read: they are folded into the per-date aggregate store (sales_store.py)
+and the summary is merged from its partitions. Use --days to limit the
+report to the latest N days of sales, or --full to recompute the summary
+from the whole CSV (always done for .gz/.xz/.bz2 exports).
+
+With --segment-by region (or category), the sales are aggregated once and
+split into one report per region (or category): each region's report is
+broken down by category, each category's by product. The PDFs are
+rendered by a process pool (--workers) and each one is emailed to its
+segment's recipients (--segment-recipients). Every run prints how long
+each stage took.
 """
 
+import argparse
+import csv
+import hashlib
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
 
-from sales_summary import process_sales_data
+from sales_summary import (
+    Grouping,
+    GroupKey,
+    SalesAccumulator,
+    aggregate_sales,
+    format_summary,
+    is_compressed,
+)
+from sales_store import SalesStore
 from reports import generate_report
+from render_cache import DEFAULT_DIRECTORY, RenderCache
+from outbox import Outbox
 import emails
 
+DEFAULT_RECIPIENT = "student@example.com"  # change for your environment
+SENDER = "automation@example.com"
+SUBJECT = "Automated Sales Report"
+BODY = (
+    "Please find attached the latest sales summary report.\n\n"
+    "This report was generated automatically."
+)
 
-def main():
+# Segment dimension -> the dimension each segment's report is broken down by
+SEGMENT_DETAIL = {"region": "category", "category": "product"}
+
+RenderJob = Tuple[str, str, str, Optional[str]]  # pdf path, title, summary, cache dir
+
+
+@contextmanager
+def stage(timings: Dict[str, float], name: str) -> Iterator[None]:
+    """Record the wall time of a block under timings[name]."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start
+
+
+def aggregate(
+    args: argparse.Namespace, grouping: Grouping
+) -> Tuple[Dict[GroupKey, SalesAccumulator], str]:
+    """Groups for the reporting window, and a "Period: ..." header if limited."""
+    if args.full or is_compressed(args.csv):
+        return aggregate_sales(args.csv, [grouping])[grouping], ""
+
+    store = SalesStore(args.store)
+    added = store.refresh(args.csv)
+    print(f"[INFO] Folded {added} new sales row(s) into {args.store}.")
+    start = store.window_start(args.days) if args.days else None
+    period = f"Period: {start} to {store.latest_date}\n\n" if start else ""
+    return store.window(grouping, start=start), period
+
+
+def build_summary(args: argparse.Namespace) -> str:
+    """Return the category summary for the requested reporting window."""
+    groups, period = aggregate(args, ("category",))
+    return period + format_summary(groups, ("category",))
+
+
+def build_segment_summaries(args: argparse.Namespace) -> Dict[str, str]:
+    """One summary per segment, all split from a single aggregation."""
+    detail = SEGMENT_DETAIL[args.segment_by]
+    groups, period = aggregate(args, (args.segment_by, detail))
+    segments: Dict[str, Dict[GroupKey, SalesAccumulator]] = {}
+    for (segment, value), acc in groups.items():
+        segments.setdefault(segment, {})[(value,)] = acc
+    return {
+        segment: period + format_summary(parts, (detail,))
+        for segment, parts in sorted(segments.items())
+    }
+
+
+def segment_pdf_name(segment: str) -> str:
+    """File name for a segment's PDF.
+
+    The short hash of the raw name keeps segments whose names only differ
+    in characters the slug replaces (e.g. "A/B" and "A B") apart.
+    """
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", segment)
+    digest = hashlib.sha1(segment.encode("utf-8")).hexdigest()[:8]
+    return f"sales_report-{slug}-{digest}.pdf"
+
+
+def render_report(job: RenderJob) -> bool:
+    """Render one PDF, through the render cache unless its cache dir is None.
+
+    Runs in a worker process in segment mode; returns True on a cache hit.
+    """
+    pdf_path, title, summary, cache_dir = job
+    if cache_dir is None:
+        generate_report(pdf_path, title, summary)
+        return False
+    return RenderCache(cache_dir).render(pdf_path, generate_report, title, summary)
+
+
+def render_reports(jobs: List[RenderJob], workers: int) -> int:
+    """Render the PDFs, in parallel when workers > 1; returns the cache hits."""
+    if workers <= 1 or len(jobs) <= 1:
+        return sum(map(render_report, jobs))
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(render_report, jobs, chunksize=chunksize))
+
+
+def parse_recipients(values: Optional[List[str]]) -> List[str]:
+    recipients: List[str] = []
+    for value in values or [DEFAULT_RECIPIENT]:
+        recipients.extend(r.strip() for r in value.split(",") if r.strip())
+    return recipients
+
+
+def load_segment_recipients(path: str) -> Dict[str, List[str]]:
+    """Read a CSV with "segment" and "recipient" columns."""
+    recipients: Dict[str, List[str]] = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            recipients.setdefault(row["segment"].strip(), []).append(row["recipient"].strip())
+    return recipients
+
+
+def send_report(mailer, pdf_path: str, subject: str, recipients: List[str]) -> int:
+    """Email one PDF via an SMTPMailer or Outbox; returns the failures.
+
+    The attachment is encoded once for all recipients.
+    """
+    with emails.FanOutMessage(SENDER, subject, BODY, pdf_path) as message:
+        errors = mailer.send_fanout(message, recipients)
+    for recipient, error in zip(recipients, errors):
+        if error is not None:
+            print(f"[ERROR] Could not email {recipient}: {error}")
+    return sum(error is not None for error in errors)
+
+
+def email_company_report(args: argparse.Namespace, mailer, timings: Dict[str, float]) -> None:
     # 1) Summarize sales data
-    csv_path = "sales.csv"
-    summary_text = process_sales_data(csv_path)
+    with stage(timings, "summarize"):
+        summary_text = build_summary(args)
 
     # 2) Generate PDF
-    today = datetime.today().strftime("%Y-%m-%d")
-    title = f"Sales Summary Report - {today}"
-    pdf_path = "/tmp/sales_report.pdf"
-    generate_report(pdf_path, title, summary_text)
+    with stage(timings, "render"):
+        today = datetime.today().strftime("%Y-%m-%d")
+        title = f"Sales Summary Report - {today}"
+        pdf_path = "/tmp/sales_report.pdf"
+        cache_dir = None if args.no_cache else args.cache_dir
+        if render_report((pdf_path, title, summary_text, cache_dir)):
+            print("[INFO] Summary unchanged; reused the cached PDF.")
 
     # 3) Email the PDF
-    sender = "automation@example.com"
-    recipient = "student@example.com"  # change for your environment
-    subject = "Automated Sales Report"
-    body = (
-        "Please find attached the latest sales summary report.\n\n"
-        "This report was generated automatically."
-    )
-
-    message = emails.generate_email(
-        sender=sender,
-        recipient=recipient,
-        subject=subject,
-        body=body,
-        attachment_path=pdf_path,
-    )
-    emails.send_email(message)
-    print("Sales report emailed successfully.")
+    with stage(timings, "email"):
+        recipients = parse_recipients(args.to)
+        failed = send_report(mailer, pdf_path, SUBJECT, recipients)
+    if args.outbox:
+        print(f"[INFO] Queued {len(recipients)} email(s) in {args.outbox}; outbox.py sends them.")
+    elif failed:
+        print(f"[WARN] Sales report emailed to {len(recipients) - failed} of {len(recipients)} recipient(s).")
+    else:
+        print("Sales report emailed successfully.")
+
+
+def email_segment_reports(args: argparse.Namespace, mailer, timings: Dict[str, float]) -> None:
+    # 1) Aggregate once and split the result by segment
+    with stage(timings, "summarize"):
+        summaries = build_segment_summaries(args)
+    if not summaries:
+        print("[WARN] No sales to report.")
+        return
+
+    # 2) Render one PDF per segment in a process pool
+    with stage(timings, "render"):
+        os.makedirs(args.output_dir, exist_ok=True)
+        today = datetime.today().strftime("%Y-%m-%d")
+        cache_dir = None if args.no_cache else args.cache_dir
+        pdf_paths: Dict[str, str] = {}
+        jobs: List[RenderJob] = []
+        for segment, summary in summaries.items():
+            pdf_paths[segment] = os.path.join(args.output_dir, segment_pdf_name(segment))
+            title = f"Sales Summary Report - {segment} - {today}"
+            jobs.append((pdf_paths[segment], title, summary, cache_dir))
+        hits = render_reports(jobs, args.workers)
+    print(
+        f"[INFO] Rendered {len(jobs) - hits} PDF(s) and reused {hits} cached one(s) "
+        f"in {args.output_dir} ({args.workers} worker(s))."
+    )
+
+    # 3) Email each segment's PDF to its recipients
+    with stage(timings, "email"):
+        default_recipients = parse_recipients(args.to)
+        segment_recipients = (
+            load_segment_recipients(args.segment_recipients) if args.segment_recipients else {}
+        )
+        total = failed = 0
+        for segment, pdf_path in pdf_paths.items():
+            recipients = segment_recipients.get(segment, default_recipients)
+            failed += send_report(mailer, pdf_path, f"{SUBJECT} - {segment}", recipients)
+            total += len(recipients)
+    verb = "Queued" if args.outbox else "Emailed"
+    print(f"[INFO] {verb} {total - failed} of {total} segment report email(s).")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Email the sales summary report.")
+    parser.add_argument("--csv", default="sales.csv", help="Sales CSV (default: sales.csv)")
+    parser.add_argument(
+        "--store",
+        default="sales_aggregates",
+        help="Aggregate store directory (default: sales_aggregates)",
+    )
+    parser.add_argument("--days", type=int, help="Only report the latest N days of sales")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Recompute the summary from the whole CSV instead of using the store",
+    )
+    parser.add_argument(
+        "--to",
+        action="append",
+        help=f"Recipient; can be repeated or comma-separated (default: {DEFAULT_RECIPIENT})",
+    )
+    parser.add_argument("--smtp-server", default="localhost", help="SMTP relay (default: localhost)")
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_DIRECTORY,
+        help=f"Rendered PDF cache (default: {DEFAULT_DIRECTORY})",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Always re-render the PDF")
+    parser.add_argument(
+        "--outbox",
+        metavar="DIR",
+        help="Queue the emails durably in this outbox directory and return without sending",
+    )
+    parser.add_argument(
+        "--segment-by",
+        choices=sorted(SEGMENT_DETAIL),
+        help="Send one report per region or per category instead of one company report",
+    )
+    parser.add_argument(
+        "--segment-recipients",
+        metavar="CSV",
+        help="CSV with segment,recipient columns; other segments go to --to",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processes rendering segment PDFs (default: CPU count)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        default="/tmp/sales_reports",
+        help="Where segment PDFs are written (default: /tmp/sales_reports)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    timings: Dict[str, float] = {}
+    start = time.perf_counter()
+
+    with Outbox(args.outbox) if args.outbox else emails.SMTPMailer(args.smtp_server) as mailer:
+        if args.segment_by:
+            email_segment_reports(args, mailer, timings)
+        else:
+            email_company_report(args, mailer, timings)
+
+    stages = " | ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items())
+    print(f"[SUMMARY] {stages} | total {time.perf_counter() - start:.2f}s")
 
 
 if __name__ == "__main__":
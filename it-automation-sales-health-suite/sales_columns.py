@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""sales_columns.py
+
+Typed, columnar NumPy cache of a sales CSV, so repeat aggregations do not
+re-parse text.
+
+The cache is a directory next to the CSV (`sales.csv.cols/` by default):
+
+    meta.json                       source size + mtime, row count
+    quantity.npy, revenue_cents.npy int64 columns
+    price.npy                       float64 column (for min/max price)
+    date.npy, region.npy, ...       int32 dictionary codes per row
+    date_values.npy, ...            the distinct strings for each code
+
+Columns are memory-mapped when loaded, so a warm run only touches the
+pages it reads. The cache is rebuilt when the CSV's size or mtime change;
+compressed (.gz/.xz/.bz2) sources are streamed while building. Rows are
+validated exactly like sales_summary.aggregate_rows, so the summaries are
+identical to the text path.
+
+Usage examples:
+
+    python3 sales_columns.py --csv sales.csv.gz
+    python3 sales_columns.py --csv sales.csv --group-by region,category,month
+"""
+
+import argparse
+import array
+import csv
+import json
+import os
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from sales_summary import (
+    Aggregates,
+    Grouping,
+    SalesAccumulator,
+    format_summary,
+    open_sales_csv,
+    parse_grouping,
+)
+
+
+CACHE_VERSION = 1
+CODED_DIMENSIONS = ("date", "region", "category", "product")
+
+
+def default_cache_dir(csv_path: str) -> str:
+    return f"{csv_path}.cols"
+
+
+def _source_key(csv_path: str) -> Dict[str, int]:
+    st = os.stat(csv_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+class SalesColumns:
+    """Sales rows as flat arrays plus dictionary-encoded dimensions."""
+
+    def __init__(
+        self,
+        codes: Dict[str, np.ndarray],
+        values: Dict[str, np.ndarray],
+        quantity: np.ndarray,
+        revenue_cents: np.ndarray,
+        price: np.ndarray,
+    ):
+        self.codes = codes  # dimension -> int32 code per row
+        self.values = values  # dimension -> distinct strings
+        self.quantity = quantity
+        self.revenue_cents = revenue_cents
+        self.price = price
+
+    def __len__(self) -> int:
+        return len(self.quantity)
+
+    def _dimension(self, dim: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(codes per row, distinct values) for a dimension, deriving month."""
+        if dim != "month":
+            return self.codes[dim], self.values[dim]
+        months, date_to_month = np.unique(
+            np.array([date[:7] for date in self.values["date"]], dtype=str),
+            return_inverse=True,
+        )
+        return date_to_month.astype(np.int32)[self.codes["date"]], months
+
+    def aggregate(self, groupings: Sequence[Grouping]) -> Aggregates:
+        """Vectorized equivalent of sales_summary.aggregate_sales."""
+        results: Aggregates = {}
+        for grouping in groupings:
+            results[grouping] = self._aggregate_one(grouping)
+        return results
+
+    def _aggregate_one(self, grouping: Grouping) -> Dict[Tuple[str, ...], SalesAccumulator]:
+        if not len(self):
+            return {}
+
+        # Combine the dimension codes of each row into one int64 group key
+        dims = [self._dimension(dim) for dim in grouping]
+        key = np.zeros(len(self), dtype=np.int64)
+        for codes, values in dims:
+            key = key * len(values) + codes
+
+        order = np.argsort(key, kind="stable")
+        sorted_key = key[order]
+        starts = np.flatnonzero(np.r_[True, sorted_key[1:] != sorted_key[:-1]])
+
+        quantity = np.add.reduceat(self.quantity[order], starts)
+        revenue = np.add.reduceat(self.revenue_cents[order], starts)
+        count = np.diff(np.r_[starts, len(self)])
+        price = self.price[order]
+        low = np.minimum.reduceat(price, starts)
+        high = np.maximum.reduceat(price, starts)
+
+        # Decode the group keys back into strings, last dimension first
+        remaining = sorted_key[starts]
+        labels: List[List[str]] = []
+        for codes, values in reversed(dims):
+            labels.append(values[remaining % len(values)].tolist())
+            remaining = remaining // len(values)
+        labels.reverse()
+
+        groups = {}
+        for i, group_key in enumerate(zip(*labels)):
+            acc = SalesAccumulator()
+            acc.quantity = int(quantity[i])
+            acc.revenue_cents = int(revenue[i])
+            acc.count = int(count[i])
+            acc.min_price = float(low[i])
+            acc.max_price = float(high[i])
+            groups[group_key] = acc
+        return groups
+
+
+def parse_columns(csv_path: str) -> SalesColumns:
+    """Parse a (possibly compressed) sales CSV into columns.
+
+    Rows are skipped under the same rules as aggregate_rows; a dimension
+    missing from the header becomes "Unknown".
+    """
+    dictionaries: Dict[str, Dict[str, int]] = {dim: {} for dim in CODED_DIMENSIONS}
+    codes = {dim: array.array("i") for dim in CODED_DIMENSIONS}
+    quantity = array.array("q")
+    revenue_cents = array.array("q")
+    price = array.array("d")
+
+    with open_sales_csv(csv_path) as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        if "quantity" in header and "price" in header:
+            quantity_col = header.index("quantity")
+            price_col = header.index("price")
+            dim_cols = [
+                (header.index(dim) if dim in header else None, dictionaries[dim], codes[dim])
+                for dim in CODED_DIMENSIONS
+            ]
+            width = len(header)
+            for row in reader:
+                if len(row) < width:
+                    continue
+                try:
+                    row_quantity = int(row[quantity_col])
+                    row_price = float(row[price_col])
+                    price_cents = round(row_price * 100)
+                except (ValueError, OverflowError):
+                    continue
+                quantity.append(row_quantity)
+                revenue_cents.append(row_quantity * price_cents)
+                price.append(row_price)
+                for col, mapping, column in dim_cols:
+                    value = row[col] if col is not None else "Unknown"
+                    code = mapping.get(value)
+                    if code is None:
+                        code = mapping[value] = len(mapping)
+                    column.append(code)
+
+    return SalesColumns(
+        codes={dim: np.frombuffer(codes[dim], dtype=np.int32) for dim in CODED_DIMENSIONS},
+        values={dim: np.array(list(dictionaries[dim]), dtype=str) for dim in CODED_DIMENSIONS},
+        quantity=np.frombuffer(quantity, dtype=np.int64),
+        revenue_cents=np.frombuffer(revenue_cents, dtype=np.int64),
+        price=np.frombuffer(price, dtype=np.float64),
+    )
+
+
+def save_cache(columns: SalesColumns, cache_dir: str, source: Dict[str, int]) -> None:
+    """Write the columns as .npy files; meta.json goes last to mark completion."""
+    os.makedirs(cache_dir, exist_ok=True)
+    meta_path = os.path.join(cache_dir, "meta.json")
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    arrays = {
+        "quantity": columns.quantity,
+        "revenue_cents": columns.revenue_cents,
+        "price": columns.price,
+    }
+    for dim in CODED_DIMENSIONS:
+        arrays[dim] = columns.codes[dim]
+        arrays[f"{dim}_values"] = columns.values[dim]
+    for name, data in arrays.items():
+        np.save(os.path.join(cache_dir, f"{name}.npy"), data, allow_pickle=False)
+
+    tmp_path = f"{meta_path}.tmp{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": CACHE_VERSION, "source": source, "rows": len(columns)}, f)
+    os.replace(tmp_path, meta_path)
+
+
+def open_cache(cache_dir: str, source: Optional[Dict[str, int]] = None) -> Optional[SalesColumns]:
+    """Memory-map a cache directory; None if it is missing, partial or stale."""
+    meta_path = os.path.join(cache_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("version") != CACHE_VERSION or (source and meta.get("source") != source):
+        return None
+
+    def load(name: str, mmap: bool = True) -> np.ndarray:
+        path = os.path.join(cache_dir, f"{name}.npy")
+        return np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+
+    return SalesColumns(
+        codes={dim: load(dim) for dim in CODED_DIMENSIONS},
+        values={dim: load(f"{dim}_values", mmap=False) for dim in CODED_DIMENSIONS},
+        quantity=load("quantity"),
+        revenue_cents=load("revenue_cents"),
+        price=load("price"),
+    )
+
+
+def load_columns(
+    csv_path: str, cache_dir: Optional[str] = None, rebuild: bool = False
+) -> SalesColumns:
+    """Return the columnar cache for csv_path, building it if missing or stale."""
+    cache_dir = cache_dir or default_cache_dir(csv_path)
+    source = _source_key(csv_path)
+    if not rebuild:
+        columns = open_cache(cache_dir, source)
+        if columns is not None:
+            return columns
+
+    print(f"[INFO] Building columnar cache {cache_dir} from {csv_path}.", file=sys.stderr)
+    save_cache(parse_columns(csv_path), cache_dir, source)
+    return open_cache(cache_dir)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Summarize sales from a memory-mapped columnar cache of the CSV."
+    )
+    parser.add_argument(
+        "--csv",
+        default="sales.csv",
+        help="Sales CSV, optionally .gz/.xz/.bz2 (default: sales.csv)",
+    )
+    parser.add_argument("--cache", help="Cache directory (default: <csv>.cols)")
+    parser.add_argument(
+        "--group-by",
+        action="append",
+        type=parse_grouping,
+        help="Comma-separated dimensions; can be repeated (default: category)",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Rebuild the cache even if it is up to date",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    columns = load_columns(args.csv, args.cache, args.rebuild)
+    groupings = args.group_by or [("category",)]
+    results = columns.aggregate(groupings)
+    for grouping in groupings:
+        print(format_summary(results[grouping], grouping, details=bool(args.group_by)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""sales_store.py
+
+Materialized per-date partitions of the sales_summary aggregates, so a
+scheduled report only folds in the rows appended since the last run.
+
+Store directory layout:
+
+    meta.json        watermark: CSV path, inode, byte offset, latest date
+    2024-01-01.json  one partition per sale date, holding the totals per
+    2024-01-02.json  (region, category, product) for that day
+    undated.json     rows whose date is not YYYY-MM-DD (if any)
+
+- A refresh reads the CSV from the stored byte offset, so its cost is
+  proportional to the new rows, and only the partitions those rows touch
+  are rewritten (each one atomically)
+- A rewritten CSV (new inode, shrunk, different header, or changed bytes
+  just before the watermark) triggers a full rebuild
+- A last row without a trailing newline is folded in too; if the CSV then
+  grows without starting a new line, that row was still being written and
+  the store is rebuilt
+- meta.json is marked "pending" while partitions are written; a run that
+  dies half way is rebuilt on the next refresh instead of double counted
+- Any grouping over a date window is answered by merging the partitions
+  in the window, without reading the CSV
+
+Usage:
+
+    python3 sales_store.py --csv sales.csv --store sales_aggregates --days 7
+"""
+
+import argparse
+import csv
+import datetime
+import hashlib
+import json
+import os
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional
+
+from sales_summary import (
+    GroupKey,
+    Grouping,
+    SalesAccumulator,
+    aggregate_rows,
+    format_summary,
+    is_compressed,
+    parse_grouping,
+)
+
+
+STORE_VERSION = 2
+PARTITION_GROUPING = ("date", "region", "category", "product")
+UNDATED = "undated"
+CHECK_BYTES = 4096  # bytes before the watermark that must be unchanged
+
+
+def _atomic_write_json(path: str, data) -> None:
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _tail_hash(f, offset: int) -> str:
+    """SHA-1 of the CHECK_BYTES bytes that end at offset."""
+    start = max(0, offset - CHECK_BYTES)
+    f.seek(start)
+    return hashlib.sha1(f.read(offset - start)).hexdigest()
+
+
+def _partition_name(date: str) -> str:
+    """Partition file stem for a sale date; odd values share one partition."""
+    try:
+        return datetime.date.fromisoformat(date).isoformat()
+    except ValueError:
+        return UNDATED
+
+
+class SalesStore:
+    """Per-date partitions of sales aggregates, kept in a directory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.meta = self._load_meta()
+
+    @property
+    def meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    @property
+    def latest_date(self) -> Optional[str]:
+        """Most recent sale date folded in so far."""
+        return self.meta.get("latest_date") if self.meta else None
+
+    def _load_meta(self) -> Optional[dict]:
+        if not os.path.exists(self.meta_path):
+            return None
+        with open(self.meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != STORE_VERSION:
+            return None
+        return meta
+
+    def _partition_path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.json")
+
+    def partition_names(self) -> List[str]:
+        """Sorted partition names (dates, plus "undated" if present)."""
+        return sorted(
+            entry[:-5]
+            for entry in os.listdir(self.directory)
+            if entry.endswith(".json") and entry != "meta.json"
+        )
+
+    def read_partition(self, name: str) -> Dict[GroupKey, SalesAccumulator]:
+        """Load one partition as {(region, category, product): totals}."""
+        path = self._partition_path(name)
+        groups: Dict[GroupKey, SalesAccumulator] = {}
+        if not os.path.exists(path):
+            return groups
+        with open(path, encoding="utf-8") as f:
+            for region, category, product, qty, cents, count, low, high in json.load(f):
+                acc = SalesAccumulator()
+                acc.quantity, acc.revenue_cents, acc.count = qty, cents, count
+                acc.min_price, acc.max_price = low, high
+                groups[(region, category, product)] = acc
+        return groups
+
+    def _write_partition(self, name: str, groups: Dict[GroupKey, SalesAccumulator]) -> None:
+        _atomic_write_json(
+            self._partition_path(name),
+            [
+                [*key, acc.quantity, acc.revenue_cents, acc.count, acc.min_price, acc.max_price]
+                for key, acc in sorted(groups.items())
+            ],
+        )
+
+    def _clear(self) -> None:
+        for name in self.partition_names():
+            os.remove(self._partition_path(name))
+        self.meta = None
+
+    def _watermark(self, csv_path: str, st: os.stat_result, header: str, f) -> Optional[int]:
+        """Byte offset to resume from, or None if the store must be rebuilt."""
+        meta = self.meta
+        if (
+            not meta
+            or meta.get("pending")
+            or meta["csv"] != os.path.abspath(csv_path)
+            or meta["inode"] != st.st_ino
+            or meta["header"] != header
+            or meta["offset"] > st.st_size
+        ):
+            return None
+        if _tail_hash(f, meta["offset"]) != meta["tail_hash"]:
+            return None
+        if meta.get("unterminated") and st.st_size > meta["offset"]:
+            f.seek(meta["offset"])
+            if f.read(1) not in (b"\n", b"\r"):
+                return None  # the unterminated last row was only partly written
+        return meta["offset"]
+
+    def refresh(self, csv_path: str) -> int:
+        """Fold rows appended to csv_path since the last refresh into the store.
+
+        Returns the number of valid sales rows added.
+        """
+        if is_compressed(csv_path):
+            raise ValueError(f"{csv_path}: the aggregate store needs a plain, append-only CSV")
+        st = os.stat(csv_path)
+        with open(csv_path, "rb") as f:
+            header_line = f.readline()
+            header_text = header_line.decode("utf-8")
+            offset = self._watermark(csv_path, st, header_text, f)
+            unterminated = bool(self.meta and self.meta.get("unterminated"))
+            if offset is None:
+                if self.meta is not None or self.partition_names():
+                    print(f"[INFO] {csv_path} changed; rebuilding {self.directory}.")
+                self._clear()
+                offset = len(header_line)
+                unterminated = False
+
+            def new_lines() -> Iterator[str]:
+                nonlocal offset, unterminated
+                f.seek(offset)
+                for raw in f:
+                    offset += len(raw)
+                    unterminated = not raw.endswith(b"\n")
+                    yield raw.decode("utf-8", "replace" if unterminated else "strict")
+
+            header = next(csv.reader([header_text]), [])
+            new = aggregate_rows(csv.reader(new_lines()), header, [PARTITION_GROUPING])
+            tail_hash = _tail_hash(f, offset)
+
+        by_partition: Dict[str, Dict[GroupKey, SalesAccumulator]] = defaultdict(dict)
+        latest = self.latest_date
+        added = 0
+        for (date, *key), acc in new[PARTITION_GROUPING].items():
+            name = _partition_name(date)
+            if name != UNDATED and (latest is None or name > latest):
+                latest = name
+            groups = by_partition[name]
+            if tuple(key) in groups:
+                groups[tuple(key)].merge(acc)
+            else:
+                groups[tuple(key)] = acc
+            added += acc.count
+
+        meta = {
+            "version": STORE_VERSION,
+            "csv": os.path.abspath(csv_path),
+            "inode": st.st_ino,
+            "header": header_text,
+            "offset": offset,
+            "tail_hash": tail_hash,
+            "unterminated": unterminated,
+            "latest_date": latest,
+        }
+        if by_partition:
+            _atomic_write_json(self.meta_path, {**(self.meta or meta), "pending": True})
+            for name, groups in by_partition.items():
+                existing = self.read_partition(name)
+                for key, acc in groups.items():
+                    if key in existing:
+                        existing[key].merge(acc)
+                    else:
+                        existing[key] = acc
+                self._write_partition(name, existing)
+        _atomic_write_json(self.meta_path, meta)
+        self.meta = meta
+        return added
+
+    def window(
+        self,
+        grouping: Grouping,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> Dict[GroupKey, SalesAccumulator]:
+        """Merge the partitions dated start..end (inclusive) into one grouping.
+
+        Undated rows are only included when the window is unbounded.
+        """
+        result: Dict[GroupKey, SalesAccumulator] = {}
+        for name in self.partition_names():
+            if name == UNDATED:
+                if start or end:
+                    continue
+            elif (start and name < start) or (end and name > end):
+                continue
+            for (region, category, product), acc in self.read_partition(name).items():
+                fields = {
+                    "date": name,
+                    "month": name[:7],
+                    "region": region,
+                    "category": category,
+                    "product": product,
+                }
+                key = tuple(fields[dim] for dim in grouping)
+                if key in result:
+                    result[key].merge(acc)
+                else:
+                    result[key] = acc
+        return result
+
+    def window_start(self, days: int) -> Optional[str]:
+        """First date of a window covering the latest `days` days of sales."""
+        if self.latest_date is None:
+            return None
+        latest = datetime.date.fromisoformat(self.latest_date)
+        return (latest - datetime.timedelta(days=days - 1)).isoformat()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Update and query the sales aggregate store.")
+    parser.add_argument("--csv", default="sales.csv", help="Sales CSV (default: sales.csv)")
+    parser.add_argument(
+        "--store",
+        default="sales_aggregates",
+        help="Aggregate store directory (default: sales_aggregates)",
+    )
+    parser.add_argument("--days", type=int, help="Only report the latest N days of sales")
+    parser.add_argument(
+        "--group-by",
+        type=parse_grouping,
+        default=("category",),
+        help="Comma-separated dimensions to report (default: category)",
+    )
+    args = parser.parse_args(argv)
+
+    store = SalesStore(args.store)
+    added = store.refresh(args.csv)
+    print(f"[INFO] Folded {added} new sales row(s) into {args.store}.")
+    start = store.window_start(args.days) if args.days else None
+    print(format_summary(store.window(args.group_by, start=start), args.group_by, details=True))
+
+
+if __name__ == "__main__":
+    main()
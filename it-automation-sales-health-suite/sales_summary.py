@@ -1,4 +1,3 @@
-
 #!/usr/bin/env python3
 """sales_summary.py
 
@@ -7,49 +6,382 @@ Reads a sales CSV file and summarizes sales by category:
 - Total revenue per category
 
 Outputs a formatted text summary that can be used in a PDF or email.
+
+Other cuts (region, product, date, month and any combination) come from
+the same single pass over the file via aggregate_sales():
+
+    python3 sales_summary.py --group-by region,category,month --group-by product
+
+Large or many CSVs (e.g. a glob of daily files) can be split into
+line-aligned byte ranges and aggregated by a process pool:
+
+    python3 sales_summary.py --csv "exports/sales-*.csv" --workers 8
+
+Revenue is summed in integer cents, so totals are exact and identical
+whatever the number of workers or the order partial results are merged in.
+
+Inputs ending in .gz, .xz or .bz2 are decompressed on the fly while
+reading (a compressed file cannot be split, so it is one task per file).
 """
 
+import argparse
+import bz2
 import csv
-from collections import defaultdict
-from typing import Dict, Tuple
+import glob
+import gzip
+import lzma
+import os
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 
-def process_sales_data(csv_path: str) -> str:
-    """Process the sales CSV and return a formatted summary string.
+# Dimensions that can be grouped on; "month" is derived from "date" (YYYY-MM)
+DIMENSIONS = ("date", "month", "region", "category", "product")
+
+Grouping = Tuple[str, ...]
+GroupKey = Tuple[str, ...]
+Aggregates = Dict[Grouping, Dict[GroupKey, "SalesAccumulator"]]
+
+COMPRESSED_OPENERS = {".gz": gzip.open, ".xz": lzma.open, ".bz2": bz2.open}
+
+
+def is_compressed(csv_path: str) -> bool:
+    return os.path.splitext(csv_path)[1].lower() in COMPRESSED_OPENERS
+
+
+def open_sales_csv(csv_path: str):
+    """Open a sales CSV as text, streaming through gzip/xz/bz2 if compressed."""
+    opener = COMPRESSED_OPENERS.get(os.path.splitext(csv_path)[1].lower(), open)
+    return opener(csv_path, "rt", newline="", encoding="utf-8")
+
+
+class SalesAccumulator:
+    """Running totals for one group.
+
+    Revenue is kept in integer cents; each row's price is rounded to the
+    cent before it is multiplied by the quantity.
+    """
+
+    __slots__ = ("quantity", "revenue_cents", "count", "min_price", "max_price")
+
+    def __init__(self):
+        self.quantity = 0
+        self.revenue_cents = 0
+        self.count = 0
+        self.min_price = float("inf")
+        self.max_price = float("-inf")
+
+    def add(self, quantity: int, price: float, price_cents: int) -> None:
+        self.quantity += quantity
+        self.revenue_cents += quantity * price_cents
+        self.count += 1
+        if price < self.min_price:
+            self.min_price = price
+        if price > self.max_price:
+            self.max_price = price
+
+    def merge(self, other: "SalesAccumulator") -> None:
+        """Fold another group's totals into this one."""
+        self.quantity += other.quantity
+        self.revenue_cents += other.revenue_cents
+        self.count += other.count
+        if other.min_price < self.min_price:
+            self.min_price = other.min_price
+        if other.max_price > self.max_price:
+            self.max_price = other.max_price
+
+    @property
+    def revenue(self) -> float:
+        return self.revenue_cents / 100
+
+
+def parse_grouping(spec: str) -> Grouping:
+    """Parse a comma-separated grouping such as "region,category,month"."""
+    grouping = tuple(part.strip() for part in spec.split(",") if part.strip())
+    unknown = [dim for dim in grouping if dim not in DIMENSIONS]
+    if not grouping or unknown:
+        raise ValueError(
+            f"Invalid grouping {spec!r}; choose from: {', '.join(DIMENSIONS)}"
+        )
+    return grouping
+
+
+def aggregate_rows(
+    rows: Iterable[List[str]],
+    header: List[str],
+    groupings: Sequence[Grouping],
+) -> Aggregates:
+    """Aggregate raw CSV rows (after the header) for every grouping at once.
+
+    Rows with a non-numeric quantity or price are skipped, as are short
+    rows. A dimension missing from the header groups as "Unknown".
+    """
+    results: Aggregates = {grouping: {} for grouping in groupings}
+    if "quantity" not in header or "price" not in header:
+        return results
+
+    columns = list(header)
+    quantity_col = columns.index("quantity")
+    price_col = columns.index("price")
+
+    # Missing dimension columns and the derived month go after the real ones
+    extra: List[str] = []
+    for dim in DIMENSIONS:
+        if dim not in columns:
+            columns.append(dim)
+            extra.append(dim)
+    derive_month = "month" in extra and "date" in header
+    date_col = header.index("date") if derive_month else None
+    width = len(header)
+
+    key_getters = []
+    for grouping in groupings:
+        getter = itemgetter(*(columns.index(dim) for dim in grouping))
+        if len(grouping) == 1:
+            # itemgetter with one index returns a scalar; keep keys as tuples
+            getter = (lambda single: lambda row: (single(row),))(getter)
+        key_getters.append(getter)
+
+    tables = [(key_getters[i], results[grouping]) for i, grouping in enumerate(groupings)]
+    fill = ["Unknown"] * len(extra)
+
+    for row in rows:
+        if len(row) < width:
+            continue
+        try:
+            quantity = int(row[quantity_col])
+            price = float(row[price_col])
+            price_cents = round(price * 100)
+        except (ValueError, OverflowError):
+            continue
+
+        if extra:
+            row = row + fill
+            if derive_month:
+                row[-len(extra) + extra.index("month")] = row[date_col][:7]
+
+        for get_key, table in tables:
+            key = get_key(row)
+            acc = table.get(key)
+            if acc is None:
+                acc = table[key] = SalesAccumulator()
+            acc.add(quantity, price, price_cents)
+
+    return results
+
+
+def aggregate_sales(csv_path: str, groupings: Sequence[Grouping]) -> Aggregates:
+    """Compute every requested grouping in one streaming pass over csv_path.
 
     Args:
         csv_path: Path to the sales CSV file.
+        groupings: Tuples of dimension names, e.g. [("category",),
+            ("region", "category", "month")].
 
     Returns:
-        A multi-line string summarizing sales by category.
+        {grouping: {group key tuple: SalesAccumulator}}
     """
-    stats: Dict[str, Tuple[int, float]] = defaultdict(lambda: (0, 0.0))
+    with open_sales_csv(csv_path) as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        return aggregate_rows(reader, header, groupings)
 
-    with open(csv_path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            category = row.get("category", "Unknown")
-            try:
-                quantity = int(row.get("quantity", 0))
-                price = float(row.get("price", 0.0))
-            except ValueError:
+
+def merge_aggregates(partials: Iterable[Aggregates]) -> Aggregates:
+    """Reduce partial aggregates (same groupings) into one result.
+
+    The accumulators of the first partial are reused, not copied.
+    """
+    merged: Aggregates = {}
+    for partial in partials:
+        for grouping, groups in partial.items():
+            target = merged.setdefault(grouping, {})
+            for key, acc in groups.items():
+                existing = target.get(key)
+                if existing is None:
+                    target[key] = acc
+                else:
+                    existing.merge(acc)
+    return merged
+
+
+def expand_inputs(patterns: Iterable[str]) -> List[str]:
+    """Expand glob patterns into a sorted, de-duplicated list of paths.
+
+    A pattern that matches nothing is kept as is, so opening it reports
+    the missing file.
+    """
+    paths: List[str] = []
+    for pattern in patterns:
+        paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    return list(dict.fromkeys(paths))
+
+
+def split_byte_ranges(csv_path: str, parts: int) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """Split the data rows of a CSV into about `parts` line-aligned byte ranges.
+
+    Each boundary is moved forward to just after the next newline, so no
+    line is split between ranges. Assumes fields do not contain embedded
+    newlines (true for the sales export format).
+
+    Returns:
+        (parsed header, [(start, end), ...] in file order)
+    """
+    size = os.path.getsize(csv_path)
+    with open(csv_path, "rb") as f:
+        header_line = f.readline()
+        header = next(csv.reader([header_line.decode("utf-8")]), [])
+        data_start = len(header_line)
+
+        boundaries = [data_start]
+        step = max(1, (size - data_start) // max(parts, 1))
+        for i in range(1, parts):
+            target = data_start + i * step
+            if target <= boundaries[-1] or target >= size:
                 continue
+            f.seek(target - 1)
+            f.readline()
+            aligned = f.tell()
+            if boundaries[-1] < aligned < size:
+                boundaries.append(aligned)
+        boundaries.append(size)
+
+    return header, list(zip(boundaries[:-1], boundaries[1:]))
+
 
-            total_qty, total_rev = stats[category]
-            total_qty += quantity
-            total_rev += quantity * price
-            stats[category] = (total_qty, total_rev)
+def _read_byte_range(csv_path: str, start: int, end: int) -> Iterator[str]:
+    """Yield the decoded lines of csv_path between two line-aligned offsets."""
+    with open(csv_path, "rb") as f:
+        f.seek(start)
+        position = start
+        for raw in f:
+            if position >= end:
+                break
+            position += len(raw)
+            yield raw.decode("utf-8")
 
+
+def _aggregate_byte_range(
+    csv_path: str,
+    start: int,
+    end: int,
+    header: List[str],
+    groupings: Sequence[Grouping],
+) -> Aggregates:
+    """Worker: aggregate one byte range of one CSV."""
+    return aggregate_rows(csv.reader(_read_byte_range(csv_path, start, end)), header, groupings)
+
+
+def aggregate_sales_parallel(
+    csv_paths: Sequence[str],
+    groupings: Sequence[Grouping],
+    workers: int,
+) -> Aggregates:
+    """Aggregate several (or very large) CSVs with a process pool.
+
+    Every plain file is split into line-aligned byte ranges, about four
+    per worker across all files for load balancing; compressed files are
+    one task each. Workers return partial
+    aggregates that are reduced with merge_aggregates(); with revenue in
+    integer cents the result does not depend on the worker count.
+    """
+    total_size = sum(os.path.getsize(path) for path in csv_paths) or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for path in csv_paths:
+            if is_compressed(path):
+                futures.append(executor.submit(aggregate_sales, path, groupings))
+                continue
+            parts = max(1, round(workers * 4 * os.path.getsize(path) / total_size))
+            header, ranges = split_byte_ranges(path, parts)
+            futures.extend(
+                executor.submit(_aggregate_byte_range, path, start, end, header, groupings)
+                for start, end in ranges
+            )
+        results = merge_aggregates(future.result() for future in futures)
+    for grouping in groupings:
+        results.setdefault(grouping, {})
+    return results
+
+
+def aggregate_inputs(
+    csv_paths: Sequence[str],
+    groupings: Sequence[Grouping],
+    workers: int = 1,
+) -> Aggregates:
+    """Aggregate one or more CSVs, in parallel when workers > 1."""
+    if workers > 1:
+        return aggregate_sales_parallel(csv_paths, groupings, workers)
+    results = merge_aggregates(aggregate_sales(path, groupings) for path in csv_paths)
+    for grouping in groupings:
+        results.setdefault(grouping, {})
+    return results
+
+
+def format_summary(
+    groups: Dict[GroupKey, SalesAccumulator],
+    grouping: Grouping,
+    details: bool = False,
+) -> str:
+    """Render one grouping as the multi-line text summary.
+
+    With details=True, each group also shows its row count and price range.
+    """
+    labels = [dim.capitalize() for dim in grouping]
     lines = []
-    lines.append("Sales Summary by Category\n")
-    for category, (qty, rev) in sorted(stats.items()):
-        lines.append(f"Category: {category}")
-        lines.append(f"  Total Quantity: {qty}")
-        lines.append(f"  Total Revenue: ${rev:,.2f}")
+    lines.append(f"Sales Summary by {' x '.join(labels)}\n")
+    for key, acc in sorted(groups.items()):
+        lines.append(" | ".join(f"{label}: {value}" for label, value in zip(labels, key)))
+        lines.append(f"  Total Quantity: {acc.quantity}")
+        lines.append(f"  Total Revenue: ${acc.revenue:,.2f}")
+        if details:
+            lines.append(f"  Sales Rows: {acc.count}")
+            lines.append(f"  Price Range: ${acc.min_price:,.2f} - ${acc.max_price:,.2f}")
         lines.append("")
     return "\n".join(lines)
 
 
+def process_sales_data(csv_path: str) -> str:
+    """Process the sales CSV and return a formatted summary string.
+
+    Args:
+        csv_path: Path to the sales CSV file (optionally .gz, .xz or .bz2).
+
+    Returns:
+        A multi-line string summarizing sales by category.
+    """
+    results = aggregate_sales(csv_path, [("category",)])
+    return format_summary(results[("category",)], ("category",))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Summarize a sales CSV.")
+    parser.add_argument(
+        "--csv",
+        action="append",
+        help="Sales CSV or glob of CSVs; can be repeated (default: sales.csv)",
+    )
+    parser.add_argument(
+        "--group-by",
+        action="append",
+        type=parse_grouping,
+        help=f"Comma-separated dimensions ({', '.join(DIMENSIONS)}); can be repeated",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes to split the input between (default: 1)",
+    )
+    args = parser.parse_args(argv)
+
+    csv_paths = expand_inputs(args.csv or ["sales.csv"])
+    groupings = args.group_by or [("category",)]
+    results = aggregate_inputs(csv_paths, groupings, args.workers)
+    for grouping in groupings:
+        print(format_summary(results[grouping], grouping, details=bool(args.group_by)))
+
+
 if __name__ == "__main__":
-    summary = process_sales_data("sales.csv")
-    print(summary)
+    main()
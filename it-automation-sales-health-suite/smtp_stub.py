@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""smtp_stub.py
+
+A tiny in-process SMTP stand-in, so the mail helpers in emails.py can be
+tried and checked without a real relay.
+
+- Speaks enough SMTP for smtplib: EHLO/HELO, MAIL, RCPT, DATA, RSET,
+  NOOP and QUIT
+- Keeps every received message (envelope sender, recipients, raw data)
+  and counts connections
+- Optional artificial latency per reply, to mimic a remote relay
+- Optional --drop-every N: the server hangs up on a connection after N
+  messages, to exercise reconnects
+
+Usage examples:
+
+    python3 smtp_stub.py --port 8025
+    python3 smtp_stub.py --self-check --messages 200 --delay 0.002
+"""
+
+import argparse
+import asyncio
+import smtplib
+import socketserver
+import threading
+import time
+from email.message import EmailMessage
+from typing import List, NamedTuple, Tuple
+
+import emails
+
+
+class ReceivedMessage(NamedTuple):
+    mail_from: str
+    rcpt_to: List[str]
+    data: bytes
+
+
+class SMTPStubHandler(socketserver.StreamRequestHandler):
+    # Replies are small and the client waits for each one; without this,
+    # Nagle's algorithm and delayed ACKs add ~40 ms to multi-line replies.
+    disable_nagle_algorithm = True
+
+    def _reply(self, line: str) -> None:
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def _read_data(self) -> bytes:
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line == b".\r\n":
+                break
+            if line.startswith(b".."):
+                line = line[1:]  # undo dot-stuffing
+            lines.append(line)
+        return b"".join(lines)
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self._reply("220 localhost SMTP stub ready")
+        mail_from, rcpt_to, delivered = "", [], 0
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", "replace").rstrip("\r\n")
+            verb = command[:4].upper()
+
+            if verb == "EHLO":
+                self._reply("250-localhost\r\n250-8BITMIME\r\n250 SMTPUTF8")
+            elif verb == "HELO":
+                self._reply("250 localhost")
+            elif verb == "MAIL":
+                if server.drop_every and delivered >= server.drop_every:
+                    return  # hang up without a reply, like a relay going away
+                mail_from, rcpt_to = command[10:].strip(" <>"), []
+                self._reply("250 OK")
+            elif verb == "RCPT":
+                rcpt_to.append(command[8:].strip(" <>"))
+                self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                data = self._read_data()
+                with server.lock:
+                    server.messages.append(ReceivedMessage(mail_from, rcpt_to, data))
+                delivered += 1
+                self._reply("250 OK: queued")
+            elif verb in ("RSET", "NOOP"):
+                self._reply("250 OK")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class SMTPStubServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: Tuple[str, int], delay: float = 0.0, drop_every: int = 0):
+        super().__init__(address, SMTPStubHandler)
+        self.delay = delay
+        self.drop_every = drop_every
+        self.connections = 0
+        self.messages: List[ReceivedMessage] = []
+        self.lock = threading.Lock()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+
+def start_in_thread(
+    host: str = "127.0.0.1", port: int = 0, delay: float = 0.0, drop_every: int = 0
+) -> SMTPStubServer:
+    """Start an SMTPStubServer on a background thread (port 0 picks a free port)."""
+    server = SMTPStubServer((host, port), delay=delay, drop_every=drop_every)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def _messages(count: int, tag: str) -> List[EmailMessage]:
+    return [
+        emails.generate_email(
+            "automation@example.com",
+            "student@example.com",
+            f"{tag} alert {i}",
+            "Please check your system and resolve the issue as soon as possible.",
+        )
+        for i in range(count)
+    ]
+
+
+def self_check(count: int, delay: float) -> bool:
+    """Send `count` messages three ways through a stub and compare them."""
+    ok = True
+
+    def report(label: str, server: SMTPStubServer, tag: str, elapsed: float) -> None:
+        nonlocal ok
+        received = sum(1 for m in server.messages if f"Subject: {tag} alert".encode() in m.data)
+        status = "[OK]" if received == count else "[ERROR]"
+        ok &= received == count
+        print(
+            f"{status} {label:<28} {received}/{count} delivered, "
+            f"{server.connections} connection(s), {elapsed:.2f}s"
+        )
+
+    # 1) A new connection per message, as send_email() does
+    server = start_in_thread(delay=delay)
+    messages = _messages(count, "single")
+    start = time.perf_counter()
+    for message in messages:
+        with smtplib.SMTP("127.0.0.1", server.port) as smtp:
+            smtp.send_message(message)
+    report("connection per message", server, "single", time.perf_counter() - start)
+    server.shutdown()
+
+    # 2) One pooled connection; the stub hangs up every 50 messages
+    server = start_in_thread(delay=delay, drop_every=50)
+    messages = _messages(count, "pooled")
+    start = time.perf_counter()
+    with emails.SMTPMailer("127.0.0.1", server.port, backoff=0.01) as mailer:
+        errors = mailer.send_many(messages)
+    report("SMTPMailer (drops every 50)", server, "pooled", time.perf_counter() - start)
+    ok &= not any(errors)
+    server.shutdown()
+
+    # 3) Background queue: submitting does not wait for the server
+    server = start_in_thread(delay=delay)
+    messages = _messages(count, "queued")
+    start = time.perf_counter()
+    with emails.BackgroundMailer(emails.SMTPMailer("127.0.0.1", server.port)) as mailer:
+        futures = [mailer.send(message) for message in messages]
+        submitted = time.perf_counter() - start
+        mailer.flush()
+    report("BackgroundMailer", server, "queued", time.perf_counter() - start)
+    print(f"       (all {count} send() calls returned after {submitted * 1000:.1f} ms)")
+    ok &= all(future.exception() is None for future in futures)
+    server.shutdown()
+
+    # 4) The same queue awaited from asyncio code
+    server = start_in_thread(delay=delay)
+    messages = _messages(count, "async")
+
+    async def send_all() -> None:
+        with emails.BackgroundMailer(emails.SMTPMailer("127.0.0.1", server.port)) as mailer:
+            await asyncio.gather(*(mailer.send_async(message) for message in messages))
+
+    start = time.perf_counter()
+    asyncio.run(send_all())
+    report("BackgroundMailer.send_async", server, "async", time.perf_counter() - start)
+    server.shutdown()
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local SMTP stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before each reply")
+    parser.add_argument(
+        "--drop-every",
+        type=int,
+        default=0,
+        help="Hang up on a connection after N messages (default: never)",
+    )
+    parser.add_argument(
+        "--self-check",
+        action="store_true",
+        help="Send messages through emails.py against an in-process stub and report",
+    )
+    parser.add_argument("--messages", type=int, default=100, help="Messages per self-check mode")
+    args = parser.parse_args()
+
+    if args.self_check:
+        raise SystemExit(0 if self_check(args.messages, args.delay) else 1)
+
+    server = SMTPStubServer((args.host, args.port), delay=args.delay, drop_every=args.drop_every)
+    print(f"[INFO] SMTP stub listening on {args.host}:{server.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"[INFO] Received {len(server.messages)} message(s) over {server.connections} connection(s).")
+
+
+if __name__ == "__main__":
+    main()
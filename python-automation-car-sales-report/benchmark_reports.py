@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""benchmark_reports.py
+
+Compares the two table rendering paths of reports.generate on synthetic
+car sales tables: the single ReportLab Table used for small reports and
+the page-by-page path used for large ones.
+
+Every render runs in a fresh process, so the peak memory (max RSS) shown
+belongs to that render alone. The paged path repeats the header row on
+every page, so it can need a few more pages than the single table.
+
+Usage:
+
+    python3 benchmark_reports.py
+    python3 benchmark_reports.py --rows 1000 10000 100000 --single-max-rows 10000
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import re
+import resource
+import tempfile
+import time
+
+import reports
+
+MAKES = ["Ford", "Acura", "Toyota", "Chevrolet", "BMW", "Mazda", "Volvo", "Kia"]
+
+
+def synthetic_table(rows, seed=42):
+    """Rows shaped like cars.cars_dict_to_table output."""
+    rng = random.Random(seed)
+    table_data = [["ID", "Car", "Price", "Total Sales"]]
+    for i in range(1, rows + 1):
+        car = f"{rng.choice(MAKES)} Model {rng.randrange(1000)} ({rng.randint(1990, 2020)})"
+        table_data.append([i, car, f"${rng.randint(1000, 99999) / 100:.2f}", rng.randint(1, 999)])
+    return table_data
+
+
+def render(rows, paginate, pdf_path):
+    """Runs in a child process: (seconds, peak RSS in MB, pages)."""
+    table_data = synthetic_table(rows)
+    start = time.perf_counter()
+    reports.generate(pdf_path, "Sales summary", "Synthetic benchmark data", table_data, paginate)
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    with open(pdf_path, "rb") as f:
+        pages = len(re.findall(rb"/Type /Page[^s]", f.read()))
+    return elapsed, peak_mb, pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF table rendering.")
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="Table sizes to render (default: 1000 10000 100000)",
+    )
+    parser.add_argument(
+        "--single-max-rows",
+        type=int,
+        default=100000,
+        help="Skip the single-table path above this many rows (default: 100000)",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        pdf_path = os.path.join(directory, "bench.pdf")
+        for rows in args.rows:
+            results = {}
+            for label, paginate in (("single", False), ("paged", True)):
+                if not paginate and rows > args.single_max_rows:
+                    print(f"[BENCH] rows={rows:<7} {label:<6} skipped (--single-max-rows)")
+                    continue
+                with multiprocessing.Pool(1) as pool:
+                    elapsed, peak_mb, pages = pool.apply(render, (rows, paginate, pdf_path))
+                results[label] = elapsed
+                print(
+                    f"[BENCH] rows={rows:<7} {label:<6} {elapsed:8.2f}s  "
+                    f"{rows / elapsed:>9,.0f} rows/s  peak={peak_mb:7.1f} MB  pages={pages}"
+                )
+            if len(results) == 2:
+                print(f"[BENCH] rows={rows:<7} speedup={results['single'] / results['paged']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,23 +4,32 @@
 Project 3 – Automatically Generate a PDF and Send it by Email.
 
 - Loads monthly car sales data from car_sales.json
-- Computes:
+- Computes, in one streaming pass over the file:
     * Car that generated the most revenue
     * Car with the most total sales
     * Most popular sales year across all cars
-- Generates a PDF report (/tmp/cars.pdf) with a summary and table
+- Generates a PDF report (/tmp/cars.pdf) with a summary and table,
+  reusing a cached render when the data has not changed
 - Emails the PDF report to the configured recipient
 
 This implementation closely follows the Google IT Automation with Python lab.
 """
 
 import json
-import locale
+import re
 import sys
 import os
 
 import reports
 import emails
+from render_cache import RenderCache
+
+
+# "$5179.39" or "$1,234.56"; commas are only accepted as thousands separators
+PRICE_RE = re.compile(r"\$?(-?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d*)?)")
+WHITESPACE_RE = re.compile(r"[ \t\r\n]*")
+# What can still follow a decoded number that was cut off ("1." of "1.5e3")
+NUMBER_TAIL_RE = re.compile(r"[0-9.eE+-]+")
 
 
 def load_data(filename):
@@ -30,6 +39,86 @@ def load_data(filename):
     return data
 
 
+def iter_json_array(f, chunk_size=64 * 1024):
+    """Yields the elements of the top-level JSON array in file f one by one.
+
+    Only the element being decoded (plus one read chunk) is held in memory.
+    More is only read when a decoding error is at the end of the buffer, so
+    malformed input fails at the first bad element instead of at EOF.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    # What may come next: "[" at the start, then a value or "]", then
+    # "," or "]" after each value
+    expect = "["
+
+    while True:
+        pos = WHITESPACE_RE.match(buffer, pos).end()
+        if pos == len(buffer):
+            if eof:
+                raise ValueError("unexpected end of JSON array")
+            chunk = f.read(chunk_size)
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            continue
+
+        char = buffer[pos]
+        if expect == "[":
+            if char != "[":
+                raise ValueError("expected a JSON array")
+            pos += 1
+            expect = "value or ]"
+            continue
+        if char == "]" and expect != "value":
+            return
+        if expect == ", or ]":
+            if char != ",":
+                raise ValueError(f"expected ',' or ']' at {buffer[pos:pos + 40]!r}")
+            pos += 1
+            expect = "value"
+            continue
+
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            end = None
+            # An unterminated string, or an error in the last few characters
+            # (a partial literal or \u escape), may just be cut off
+            cut_off = e.msg.startswith("Unterminated string") or e.pos + 6 >= len(buffer)
+        else:
+            # A number cut off by the end of a chunk ("1." of "1.5") still
+            # decodes, so an element only counts once something other than
+            # the rest of a number follows it
+            following = WHITESPACE_RE.match(buffer, end).end()
+            cut_off = following == len(buffer) or NUMBER_TAIL_RE.fullmatch(buffer, end)
+        if end is None or (cut_off and not eof):
+            if eof or not cut_off:
+                raise ValueError(f"invalid JSON array element at {buffer[pos:pos + 40]!r}")
+            # Read at least as much as is buffered, so a large element is
+            # re-decoded only a logarithmic number of times
+            chunk = f.read(max(chunk_size, len(buffer) - pos))
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            continue
+        yield item
+        pos = end
+        expect = ", or ]"
+
+
+def iter_cars(filename):
+    """Yields the cars in a JSON file without loading the whole file."""
+    with open(filename) as f:
+        yield from iter_json_array(f)
+
+
+def parse_price(text):
+    """Parses a price like "$1,234.56" without depending on the locale."""
+    match = PRICE_RE.fullmatch(text.strip())
+    if match is None:
+        raise ValueError(f"invalid price: {text!r}")
+    return float(match.group(1).replace(",", ""))
+
+
 def format_car(car):
     """Given a car dictionary, returns a nicely formatted name.
 
@@ -40,21 +129,21 @@ def format_car(car):
 
 
 def process_data(data):
-    """Analyzes the data, looking for maximums.
+    """Analyzes the data, looking for maximums, in a single pass.
+
+    data can be any iterable of cars, such as iter_cars(filename).
 
     Returns a list of summary lines:
     - The <car> generated the most revenue: $X
     - The <car> had the most sales: Y
     - The most popular year was <year> with <total sales> sales.
     """
-    locale.setlocale(locale.LC_ALL, "en_US.UTF-8")
-
     max_revenue = {"car": None, "revenue": 0}
     max_sales = {"car": None, "total_sales": 0}
     sales_by_year = {}
 
     for item in data:
-        price = locale.atof(item["price"].strip("$"))
+        price = parse_price(item["price"])
         revenue = price * item["total_sales"]
 
         # Most revenue
@@ -71,7 +160,7 @@ def process_data(data):
         year = item["car"]["car_year"]
         sales_by_year[year] = sales_by_year.get(year, 0) + item["total_sales"]
 
-    # Determine most popular year
+    # Determine most popular year (one entry per model year, not per car)
     popular_year = None
     popular_year_sales = 0
     for year, year_sales in sales_by_year.items():
@@ -108,20 +197,20 @@ def cars_dict_to_table(data):
 
 
 def main(argv):
-    data = load_data("car_sales.json")
-
-    # Process data to get summary lines
-    summary = process_data(data)
+    # Process data to get summary lines, streaming the file
+    summary = process_data(iter_cars("car_sales.json"))
     # Summary as text for email
     summary_text = "\n".join(summary)
     # Summary with <br/> for PDF
     summary_html = "<br/>".join(summary)
 
-    # Generate PDF report
+    # Generate PDF report (copied from the render cache if nothing changed)
     pdf_path = "/tmp/cars.pdf"
     title = "Sales summary for last month"
-    table_data = cars_dict_to_table(data)
-    reports.generate(pdf_path, title, summary_html, table_data)
+    # The table is built in memory (one short row per car): the PDF layout
+    # and the render cache key both need every row
+    table_data = cars_dict_to_table(iter_cars("car_sales.json"))
+    RenderCache().render(pdf_path, reports.generate, title, summary_html, table_data)
 
     # Generate and send email with attachment
     sender = "automation@example.com"
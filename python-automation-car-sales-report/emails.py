@@ -5,12 +5,32 @@ Helper functions to create and send emails with an attachment.
 API compatible with the Google lab:
     generate(sender, recipient, subject, body, attachment_path)
     send(message)
+
+send() opens a new connection per message. To send many messages over one
+connection (reconnecting if the server drops it), use SMTPMailer; to hand
+messages to a worker thread and return at once, use BackgroundMailer
+(send_async() awaits the same queue from asyncio code).
+
+To send the same report to many recipients, build a FanOutMessage once and
+pass it to SMTPMailer.send_fanout(): the attachment is encoded a single
+time and streamed from disk, and only the To header differs per recipient.
 """
 
+import asyncio
+import binascii
+import email
 import email.message
+import email.policy
+import functools
 import mimetypes
 import os.path
+import queue
+import re
 import smtplib
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
 
 
 def generate(sender, recipient, subject, body, attachment_path):
@@ -45,3 +65,322 @@ def send(message):
     mail_server = smtplib.SMTP("localhost")
     mail_server.send_message(message)
     mail_server.quit()
+
+
+# 57 input bytes encode to one full 76-character base64 line
+_ENCODE_BLOCK = 57 * 1024
+_READ_BLOCK = 64 * 1024
+_PLACEHOLDER = "@@FANOUT-ATTACHMENT@@"
+_LEADING_DOT = re.compile(rb"(?m)^\.")
+
+
+class FanOutMessage:
+    """An email with an attachment, serialized once for many recipients.
+
+    The attachment is read in blocks and base64-encoded once; encoded
+    attachments over memory_limit bytes are kept in a temporary file
+    rather than in memory. Call close() (or use "with") to remove it.
+    """
+
+    def __init__(self, sender, subject, body, attachment_path, memory_limit=8 * 1024 * 1024):
+        self.sender = sender
+        template = email.message.EmailMessage()
+        template["From"] = sender
+        template["Subject"] = subject
+        template.set_content(body)
+
+        mime_type, _ = mimetypes.guess_type(attachment_path)
+        if mime_type is None:
+            mime_type = "application/octet-stream"
+        maintype, mime_subtype = mime_type.split("/", 1)
+        template.add_attachment(
+            b"",
+            maintype=maintype,
+            subtype=mime_subtype,
+            filename=os.path.basename(attachment_path),
+        )
+        # Serialize a marker where the encoded file will be streamed in
+        template.get_payload()[-1].set_payload(_PLACEHOLDER)
+
+        raw = template.as_bytes(policy=email.policy.SMTP)
+        headers, _, rest = raw.partition(b"\r\n\r\n")
+        self._headers = headers + b"\r\n"
+        head, _, tail = (b"\r\n" + rest).partition(_PLACEHOLDER.encode("ascii"))
+        # The shared bytes go out as-is in DATA, so dot-stuff them once
+        self._head = _LEADING_DOT.sub(b"..", head)
+        self._tail = _LEADING_DOT.sub(b"..", tail)
+
+        self._encoded = None
+        self._spool_path = None
+        self._encode(attachment_path, memory_limit)
+
+    def _encode(self, attachment_path, memory_limit):
+        chunks = []
+        size = 0
+        spool = None
+        with open(attachment_path, "rb") as ap:
+            for block in iter(functools.partial(ap.read, _ENCODE_BLOCK), b""):
+                encoded = binascii.b2a_base64(block, newline=False)
+                lines = [encoded[i:i + 76] for i in range(0, len(encoded), 76)]
+                chunk = b"\r\n".join(lines) + b"\r\n"
+                size += len(chunk)
+                if spool is None and size > memory_limit:
+                    fd, self._spool_path = tempfile.mkstemp(prefix="fanout-", suffix=".b64")
+                    spool = os.fdopen(fd, "wb")
+                    spool.writelines(chunks)
+                    chunks = []
+                if spool is None:
+                    chunks.append(chunk)
+                else:
+                    spool.write(chunk)
+        if spool is None:
+            self._encoded = b"".join(chunks)
+        else:
+            spool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._spool_path:
+            os.remove(self._spool_path)
+            self._spool_path = None
+
+    def _attachment_chunks(self):
+        if self._encoded is not None:
+            yield self._encoded
+        else:
+            with open(self._spool_path, "rb") as spool:
+                yield from iter(functools.partial(spool.read, _READ_BLOCK), b"")
+
+    def data_chunks(self, recipient):
+        """Yields the dot-stuffed DATA for one recipient, in blocks."""
+        to_header = email.policy.SMTP.fold("To", recipient).encode("ascii")
+        yield _LEADING_DOT.sub(b"..", to_header + self._headers)
+        yield self._head
+        yield from self._attachment_chunks()
+        yield self._tail
+
+    def as_bytes(self, recipient):
+        """Returns the complete message for one recipient."""
+        data = b"".join(self.data_chunks(recipient))
+        return re.sub(rb"(?m)^\.\.", b".", data)
+
+
+def _send_data(smtp, sender, recipient, chunks):
+    """Runs one SMTP transaction, writing already dot-stuffed DATA in blocks."""
+    smtp.ehlo_or_helo_if_needed()
+    code, response = smtp.mail(sender)
+    if code != 250:
+        smtp.rset()
+        raise smtplib.SMTPSenderRefused(code, response, sender)
+    code, response = smtp.rcpt(recipient)
+    if code not in (250, 251):
+        smtp.rset()
+        raise smtplib.SMTPRecipientsRefused({recipient: (code, response)})
+    code, response = smtp.docmd("data")
+    if code != 354:
+        smtp.rset()
+        raise smtplib.SMTPDataError(code, response)
+    # Coalesce small blocks: separate tiny writes (e.g. the final ".")
+    # stall on Nagle's algorithm and delayed ACKs for ~40 ms per message
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) >= _READ_BLOCK:
+            smtp.send(bytes(buffer))
+            buffer.clear()
+    buffer += b".\r\n"
+    smtp.send(bytes(buffer))
+    code, response = smtp.getreply()
+    if code != 250:
+        smtp.rset()
+        raise smtplib.SMTPDataError(code, response)
+
+
+def _is_transient(exc):
+    """Dropped connections, timeouts and 4xx replies are worth a retry."""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return False
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    return isinstance(exc, OSError)
+
+
+class SMTPMailer:
+    """Sends many messages over one SMTP connection.
+
+    The connection is opened on first use and re-opened after a transient
+    failure (with exponential backoff), after idle_timeout seconds unused,
+    or after max_per_connection messages.
+    """
+
+    def __init__(self, smtp_server="localhost", port=0, timeout=30.0, retries=2,
+                 backoff=0.5, max_per_connection=100, idle_timeout=30.0):
+        self.smtp_server = smtp_server
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_per_connection = max_per_connection
+        self.idle_timeout = idle_timeout
+        self.connections = 0
+        self.sent = 0
+        self._smtp = None
+        self._count = 0
+        self._last_used = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _connection(self):
+        stale = (self._count >= self.max_per_connection
+                 or time.monotonic() - self._last_used > self.idle_timeout)
+        if self._smtp is not None and stale:
+            self.close()
+        if self._smtp is None:
+            self._smtp = smtplib.SMTP(self.smtp_server, self.port, timeout=self.timeout)
+            self.connections += 1
+            self._count = 0
+        return self._smtp
+
+    def send(self, message):
+        """Sends one message, reconnecting and retrying on transient errors."""
+        self._deliver(lambda smtp: smtp.send_message(message))
+
+    def send_to(self, fanout, recipient):
+        """Sends a FanOutMessage to one recipient."""
+        self._deliver(
+            lambda smtp: _send_data(smtp, fanout.sender, recipient, fanout.data_chunks(recipient))
+        )
+
+    def send_fanout(self, fanout, recipients):
+        """Sends a FanOutMessage to each recipient in its own envelope.
+
+        Returns None or the exception for each recipient, in order.
+        """
+        errors = []
+        for recipient in recipients:
+            try:
+                self.send_to(fanout, recipient)
+                errors.append(None)
+            except (smtplib.SMTPException, OSError) as exc:
+                errors.append(exc)
+        return errors
+
+    def _deliver(self, transaction):
+        for attempt in range(self.retries + 1):
+            try:
+                transaction(self._connection())
+            except Exception as exc:
+                if not _is_transient(exc):
+                    raise
+                self.close()
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+            self._count += 1
+            self.sent += 1
+            self._last_used = time.monotonic()
+            return
+
+    def send_many(self, messages):
+        """Sends messages in order; returns None or the exception for each."""
+        errors = []
+        for message in messages:
+            try:
+                self.send(message)
+                errors.append(None)
+            except (smtplib.SMTPException, OSError) as exc:
+                errors.append(exc)
+        return errors
+
+    def close(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        finally:
+            self._smtp = None
+
+
+class BackgroundMailer:
+    """Queues messages and sends them from a worker thread via an SMTPMailer.
+
+    send() returns a concurrent.futures.Future immediately. The connection
+    is closed whenever the queue stays empty for the mailer's idle_timeout.
+    """
+
+    def __init__(self, mailer=None, max_queue=10000):
+        self.mailer = mailer or SMTPMailer()
+        self._queue = queue.Queue(max_queue)
+        self._thread = threading.Thread(target=self._run, name="smtp-mailer", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def send(self, message):
+        return self._submit(functools.partial(self.mailer.send, message), message["Subject"])
+
+    def send_fanout(self, fanout, recipients):
+        """Queues a FanOutMessage for each recipient; returns their futures."""
+        return [
+            self._submit(functools.partial(self.mailer.send_to, fanout, recipient),
+                         f"message to {recipient}")
+            for recipient in recipients
+        ]
+
+    def _submit(self, job, label):
+        future = Future()
+        self._queue.put((job, label, future))
+        return future
+
+    async def send_async(self, message):
+        await asyncio.wrap_future(self.send(message))
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.mailer.idle_timeout)
+            except queue.Empty:
+                self.mailer.close()
+                continue
+            try:
+                if item is None:
+                    break
+                job, label, future = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    job()
+                except Exception as exc:
+                    print(f"[ERROR] Could not send '{label}': {exc}")
+                    future.set_exception(exc)
+                else:
+                    future.set_result(None)
+            finally:
+                self._queue.task_done()
+        self.mailer.close()
+
+    def flush(self):
+        """Blocks until every queued message has been handled."""
+        self._queue.join()
+
+    def close(self):
+        """Sends what is queued, then stops the worker."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""render_cache.py
+
+Content-addressed cache for rendered PDF reports, so an unchanged report
+is copied instead of being re-rendered with ReportLab.
+
+- the key is a SHA-256 over the renderer (its module, name and source
+  file), the ReportLab version and every input (title, body, table rows)
+- entries are <key>.pdf files in the cache directory; a hit refreshes the
+  entry's mtime, and the least recently used entries are evicted once
+  the directory grows past max_bytes
+- renders go to a temporary file that is renamed into place, and hits
+  are copied to a temporary file next to the output and renamed too, so
+  concurrent runs never see a half-written PDF
+
+    cache = RenderCache()
+    hit = cache.render("/tmp/cars.pdf", reports.generate, title, info, table_data)
+
+Usage examples:
+
+    python3 render_cache.py --status
+    python3 render_cache.py --clear
+"""
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+
+import reportlab
+
+DEFAULT_DIRECTORY = "/tmp/report_cache"
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+STALE_TMP_SECONDS = 3600
+
+
+def _source_digest(renderer):
+    """Digest of the file defining renderer, so layout changes miss."""
+    try:
+        path = inspect.getsourcefile(renderer)
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except (OSError, TypeError):
+        return ""
+
+
+class RenderCache:
+    """A directory of rendered PDFs keyed by a hash of their inputs."""
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, renderer, *inputs):
+        digest = hashlib.sha256()
+        digest.update(f"{renderer.__module__}.{renderer.__qualname__}\n".encode())
+        digest.update(f"{_source_digest(renderer)}\nreportlab {reportlab.Version}\n".encode())
+        for index, value in enumerate(inputs):
+            if isinstance(value, list):
+                # Tables are hashed row by row instead of as one huge string
+                digest.update(f"{index}:list:{len(value)}\n".encode())
+                for row in value:
+                    digest.update(json.dumps(row, default=str).encode() + b"\n")
+            else:
+                digest.update(f"{index}:{json.dumps(value, default=str)}\n".encode())
+        return digest.hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def _tmp_path(self, directory):
+        return os.path.join(directory, f".tmp-{os.getpid()}-{time.time_ns()}.pdf")
+
+    def get(self, key, output_path):
+        """Copies the entry for key to output_path; False if there is none."""
+        entry = self._entry(key)
+        tmp_path = self._tmp_path(os.path.dirname(os.path.abspath(output_path)))
+        try:
+            shutil.copyfile(entry, tmp_path)
+        except FileNotFoundError:
+            return False  # never stored, or evicted by another run
+        os.replace(tmp_path, output_path)
+        try:
+            os.utime(entry)  # mark as recently used
+        except FileNotFoundError:
+            pass
+        return True
+
+    def put(self, key, rendered_path):
+        """Moves a finished render into the cache and evict old entries."""
+        entry = self._entry(key)
+        os.replace(rendered_path, entry)
+        self.evict(keep=entry)
+        return entry
+
+    def render(self, output_path, renderer, *inputs):
+        """Writes renderer(output_path, *inputs) to output_path, from cache if possible.
+
+        Returns True on a cache hit.
+        """
+        key = self.key(renderer, *inputs)
+        if self.get(key, output_path):
+            return True
+        tmp_path = self._tmp_path(self.directory)
+        try:
+            renderer(tmp_path, *inputs)
+            self.put(key, tmp_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        if not self.get(key, output_path):
+            # Evicted at once (e.g. larger than max_bytes): render directly
+            renderer(output_path, *inputs)
+        return False
+
+    def _entries(self):
+        return [
+            e for e in os.scandir(self.directory)
+            if e.name.endswith(".pdf") and not e.name.startswith(".tmp-")
+        ]
+
+    def status(self):
+        entries = self._entries()
+        return {"entries": len(entries), "bytes": sum(e.stat().st_size for e in entries)}
+
+    def evict(self, keep=None):
+        """Deletes least recently used entries until the cache fits max_bytes."""
+        entries = []
+        now = time.time()
+        for e in os.scandir(self.directory):
+            try:
+                st = e.stat()
+            except FileNotFoundError:
+                continue
+            if e.name.startswith(".tmp-"):
+                if now - st.st_mtime > STALE_TMP_SECONDS:
+                    os.remove(e.path)  # left behind by a crashed render
+                continue
+            if e.name.endswith(".pdf"):
+                entries.append((st.st_mtime, st.st_size, e.path))
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if keep and path == keep and size <= self.max_bytes:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        entries = self._entries()
+        for e in entries:
+            os.remove(e.path)
+        return len(entries)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Inspect or clear the PDF render cache.")
+    parser.add_argument(
+        "--directory",
+        default=DEFAULT_DIRECTORY,
+        help=f"Cache directory (default: {DEFAULT_DIRECTORY})",
+    )
+    parser.add_argument("--clear", action="store_true", help="Delete every cached PDF")
+    parser.add_argument("--status", action="store_true", help="Print entry count and size (default)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    cache = RenderCache(args.directory)
+    if args.clear:
+        print(f"[INFO] Removed {cache.clear()} cached PDF(s) from {args.directory}.")
+    counts = cache.status()
+    print(f"[SUMMARY] {counts['entries']} cached PDF(s), {counts['bytes'] / 1024:.1f} KB in {args.directory}.")
+
+
+if __name__ == "__main__":
+    main()
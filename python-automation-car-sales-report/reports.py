@@ -4,23 +4,163 @@
 Generate a PDF report using ReportLab.
 API compatible with the Google lab:
     generate(filename, title, additional_info, table_data)
+
+Tables with more than LARGE_TABLE_ROWS rows are rendered page by page:
+column widths and row heights (one line per row, more for cells with
+newlines) are measured once, the rows are cut into page-sized tables that
+repeat the header row, and each page's Table is only built while that
+page is laid out, so render time grows linearly with the row count and
+memory stays bounded.
 """
 
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
+from reportlab.platypus.flowables import Flowable
+from reportlab.platypus.frames import Frame
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib import colors
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+LARGE_TABLE_ROWS = 500
+
+# ReportLab's default table cell: 10pt Helvetica, 12pt leading, padding
+# of 6pt left/right and 3pt top/bottom
+FONT_SIZE = 10
+LEADING = 12
+ROW_HEIGHT = LEADING + 3 + 3
+CELL_PADDING = 6 + 6
+
+TABLE_STYLE = [
+    ("GRID", (0, 0), (-1, -1), 1, colors.black),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+]
+
+
+def measure_table(table_data):
+    """Column widths and row heights that fit every cell, in one pass.
+
+    A cell with newlines is as wide as its longest line and makes its row
+    one LEADING taller per extra line, as ReportLab lays it out.
+    """
+    widths = [0.0] * len(table_data[0])
+    heights = []
+    for index, row in enumerate(table_data):
+        font = "Helvetica-Bold" if index == 0 else "Helvetica"
+        lines = 1
+        for col, cell in enumerate(row):
+            text = str(cell)
+            if "\n" in text:
+                parts = text.split("\n")
+                lines = max(lines, len(parts))
+                width = max(stringWidth(part, font, FONT_SIZE) for part in parts)
+            else:
+                width = stringWidth(text, font, FONT_SIZE)
+            if width > widths[col]:
+                widths[col] = width
+        heights.append(ROW_HEIGHT + (lines - 1) * LEADING)
+    return [width + CELL_PADDING for width in widths], heights
+
+
+class PageTable(Flowable):
+    """A page-sized slice of a large table.
+
+    The real Table (and its per-cell styles) is created when the slice is
+    laid out and dropped once it has been drawn.
+    """
+
+    def __init__(self, rows, col_widths, row_heights):
+        super().__init__()
+        self.rows = rows
+        self.col_widths = col_widths
+        self.row_heights = row_heights
+        self.hAlign = "LEFT"
+        self._table = None
 
+    def _get_table(self):
+        if self._table is None:
+            self._table = Table(
+                self.rows,
+                colWidths=self.col_widths,
+                rowHeights=self.row_heights,
+                style=TABLE_STYLE,
+                repeatRows=1,
+                hAlign="LEFT",
+            )
+        return self._table
 
-def generate(filename, title, additional_info, table_data):
+    def wrap(self, availWidth, availHeight):
+        self.width, self.height = self._get_table().wrap(availWidth, availHeight)
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        return self._get_table().split(availWidth, availHeight)
+
+    def drawOn(self, canvas, x, y, _sW=0):
+        self._get_table().drawOn(canvas, x, y, _sW)
+        self._table = None
+
+
+def paginate_table(table_data, first_page_height, page_height):
+    """Cuts table_data into PageTables of one page each, header repeated.
+
+    Each page takes as many rows as fit under the header; a row taller
+    than a whole page still gets a page of its own.
+    """
+    header = table_data[0]
+    col_widths, heights = measure_table(table_data)
+    header_height = heights[0]
+
+    tables = []
+    start = 1
+    available = first_page_height
+    while start < len(table_data):
+        end = start
+        used = header_height
+        while end < len(table_data) and used + heights[end] <= available:
+            used += heights[end]
+            end += 1
+        if end == start and available == page_height:
+            end += 1  # taller than a page: let ReportLab report it
+        if end > start:
+            tables.append(PageTable(
+                [header] + table_data[start:end], col_widths, [header_height] + heights[start:end]
+            ))
+        start = end
+        available = page_height
+    return tables
+
+
+def generate(filename, title, additional_info, table_data, paginate=None):
+    """Builds the PDF report.
+
+    paginate: render the table page by page; by default only tables with
+    more than LARGE_TABLE_ROWS rows are.
+    """
     styles = getSampleStyleSheet()
     report = SimpleDocTemplate(filename)
     report_title = Paragraph(title, styles["h1"])
     report_info = Paragraph(additional_info, styles["BodyText"])
-    table_style = [
-        ("GRID", (0, 0), (-1, -1), 1, colors.black),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-    ]
-    report_table = Table(data=table_data, style=table_style, hAlign="LEFT")
     empty_line = Spacer(1, 20)
-    report.build([report_title, empty_line, report_info, empty_line, report_table])
+    elements = [report_title, empty_line, report_info, empty_line]
+
+    if paginate is None:
+        paginate = len(table_data) > LARGE_TABLE_ROWS
+    if not paginate or len(table_data) < 2:
+        elements.append(Table(data=table_data, style=TABLE_STYLE, hAlign="LEFT"))
+        report.build(elements)
+        return
+
+    # The height SimpleDocTemplate's frame leaves inside its padding.
+    # Counting every space before and after overestimates what the heading
+    # uses, so the first PageTable fits and no page after it needs to be
+    # split
+    frame = Frame(report.leftMargin, report.bottomMargin, report.width, report.height)
+    page_height = report.height - frame.topPadding - frame.bottomPadding
+    used = sum(
+        element.wrap(report.width, page_height)[1]
+        + element.getSpaceBefore()
+        + element.getSpaceAfter()
+        for element in elements
+    )
+    elements.extend(paginate_table(table_data, page_height - used, page_height))
+    report.build(elements)